@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+多账号凭据池 - 在多个X账号之间分配时间线请求
+- 账号来自 config.json 的 authentication（主账号）和 accounts 列表，或环境变量 X_AUTH_TOKEN_2/X_CT0_TOKEN_2...
+- 每个账号独立的HTTP会话、每小时请求额度（滑动窗口）、429冷却和健康状态
+- 请求分配给负载最低（窗口内已用额度比例最小）的可用账号，总吞吐随账号数线性增长
+- 时间线cursor属于发出它的账号，翻页时优先沿用同一账号
+"""
+
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# 连续429时的冷却时间（秒），按次数翻倍，最多15分钟
+RATE_LIMIT_COOLDOWN = 60
+MAX_COOLDOWN = 900
+# 网络错误/服务端错误后的冷却时间（秒），按连续失败次数递增
+ERROR_COOLDOWN = 10
+
+
+def _is_placeholder(value: Any) -> bool:
+    return not value or 'YOUR_' in str(value).upper()
+
+
+class Account:
+    def __init__(self, name: str, auth_config: Dict[str, Any], session: 'requests.Session', requests_per_hour: int):
+        self.name = name
+        self.auth_config = auth_config
+        self.session = session
+        self.requests_per_hour = requests_per_hour
+        self.request_times: deque = deque()
+        self.cooldown_until = 0.0
+        self.rate_limited_count = 0
+        self.failure_count = 0
+        self.healthy = True
+        self.total_requests = 0
+        self.last_used = 0.0
+
+    def _trim(self, now: float):
+        while self.request_times and now - self.request_times[0] >= 3600:
+            self.request_times.popleft()
+
+    def remaining(self, now: float) -> int:
+        """当前小时窗口内剩余的请求额度"""
+        self._trim(now)
+        return self.requests_per_hour - len(self.request_times)
+
+    def load(self, now: float) -> float:
+        """已用额度比例"""
+        self._trim(now)
+        return len(self.request_times) / max(self.requests_per_hour, 1)
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy and now >= self.cooldown_until and self.remaining(now) > 0
+
+    def ready_at(self, now: float) -> float:
+        """最早可再次使用的时间"""
+        self._trim(now)
+        ready = self.cooldown_until
+        if len(self.request_times) >= self.requests_per_hour:
+            ready = max(ready, self.request_times[0] + 3600)
+        return max(ready, now)
+
+
+class CredentialPool:
+    def __init__(self, accounts: List[Account]):
+        self.accounts = accounts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any],
+                    session_factory: Callable[[Dict[str, Any]], 'requests.Session']) -> 'CredentialPool':
+        """从配置创建凭据池
+
+        Args:
+            config: ConfigLoader 的配置，authentication 为主账号，accounts 为额外账号列表
+                    （每项: name, cookies, headers, 可选 requests_per_hour）
+            session_factory: 认证配置 -> 已设置好认证的HTTP会话
+        """
+        default_rate = config.get('settings', {}).get('requests_per_hour', 400)
+        primary = config.get('authentication', {})
+        primary_headers = primary.get('headers', {})
+
+        candidates = [dict(primary, name='default')] + list(config.get('accounts') or [])
+        accounts, seen_tokens = [], set()
+        for index, candidate in enumerate(candidates, 1):
+            cookies = candidate.get('cookies', {})
+            auth_token = cookies.get('auth_token')
+            if _is_placeholder(auth_token) or _is_placeholder(cookies.get('ct0')) or auth_token in seen_tokens:
+                continue
+            seen_tokens.add(auth_token)
+
+            # Bearer是网页端公共token，额外账号未配置时沿用主账号；X-Csrf-Token与ct0一致
+            headers = dict(candidate.get('headers', {}))
+            if _is_placeholder(headers.get('Authorization')) and not _is_placeholder(primary_headers.get('Authorization')):
+                headers['Authorization'] = primary_headers['Authorization']
+            if _is_placeholder(headers.get('X-Csrf-Token')):
+                headers['X-Csrf-Token'] = cookies['ct0']
+
+            auth_config = {"cookies": cookies, "headers": headers}
+            accounts.append(Account(
+                name=candidate.get('name') or f"account{index}",
+                auth_config=auth_config,
+                session=session_factory(auth_config),
+                requests_per_hour=candidate.get('requests_per_hour', default_rate)
+            ))
+        return cls(accounts)
+
+    @property
+    def total_budget(self) -> int:
+        """所有健康账号每小时的请求额度之和"""
+        return sum(account.requests_per_hour for account in self.accounts if account.healthy)
+
+    def acquire(self, preferred: Optional[Account] = None,
+                stop_event: Optional[threading.Event] = None) -> Optional[Account]:
+        """选择一个账号并占用一次请求额度，全部账号暂不可用时等待
+
+        Args:
+            preferred: 优先使用的账号（翻页时为发出cursor的账号）
+            stop_event: 等待期间设置该事件时立即返回None（常驻服务收到停止信号）
+
+        Returns:
+            选中的账号；所有账号都已失效或收到停止信号时返回None
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                if preferred is not None and preferred.is_available(now):
+                    account = preferred
+                else:
+                    available = [account for account in self.accounts if account.is_available(now)]
+                    account = min(available, key=lambda a: (a.load(now), a.last_used)) if available else None
+
+                if account is not None:
+                    account.request_times.append(now)
+                    account.total_requests += 1
+                    account.last_used = now
+                    return account
+
+                healthy = [account for account in self.accounts if account.healthy]
+                if not healthy:
+                    return None
+                wait_time = min(account.ready_at(now) for account in healthy) - now
+
+            print(f"⏰ 所有账号暂不可用（额度用尽或冷却中），等待 {wait_time:.0f} 秒...")
+            if stop_event is None:
+                time.sleep(max(wait_time, 1))
+            elif stop_event.wait(max(wait_time, 1)):
+                return None
+
+    def record(self, account: Account, status_code: Optional[int], response: Optional['requests.Response'] = None):
+        """记录请求结果，更新账号的冷却和健康状态
+
+        Args:
+            account: 发出请求的账号
+            status_code: HTTP状态码，请求异常时为None
+            response: 原始响应，用于读取限流重置时间
+        """
+        with self._lock:
+            now = time.time()
+            if status_code == 200:
+                account.rate_limited_count = 0
+                account.failure_count = 0
+            elif status_code == 429:
+                account.rate_limited_count += 1
+                cooldown = min(RATE_LIMIT_COOLDOWN * 2 ** (account.rate_limited_count - 1), MAX_COOLDOWN)
+                reset = response.headers.get('x-rate-limit-reset') if response is not None else None
+                if reset and reset.isdigit() and int(reset) > now:
+                    cooldown = min(int(reset) - now, MAX_COOLDOWN * 4)
+                account.cooldown_until = now + cooldown
+                print(f"⚠️ 账号 {account.name} 触发限流，冷却 {cooldown:.0f} 秒")
+            elif status_code in (401, 403):
+                account.healthy = False
+                print(f"❌ 账号 {account.name} 认证失效 (HTTP {status_code})，已停用")
+            else:
+                account.failure_count += 1
+                account.cooldown_until = now + ERROR_COOLDOWN * account.failure_count
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [{
+                "name": account.name,
+                "healthy": account.healthy,
+                "requests": account.total_requests,
+                "remaining": account.remaining(now),
+                "requests_per_hour": account.requests_per_hour,
+                "cooldown_seconds": round(max(account.cooldown_until - now, 0))
+            } for account in self.accounts]
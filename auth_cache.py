@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+认证缓存 - 保存浏览器提取的认证信息及其过期时间，用轻量请求验证是否仍然有效
+- 缓存 cookies/headers、cookie的过期时间、提取时间和最近一次验证结果
+- 验证使用 account/settings 接口（不消耗时间线配额），结果在 probe_ttl 内复用
+- 只有认证确实失效（缺失、已过期或接口返回401/403）时才需要重新启动浏览器
+- 网络错误、限流等无法判断的情况视为有效，避免误触发浏览器登录
+
+用法:
+    python auth_cache.py          # 检查当前认证是否有效
+    python auth_cache.py --probe  # 忽略缓存的验证结果，重新请求验证
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+PROBE_URL = "https://x.com/i/api/1.1/account/settings.json"
+PROBE_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+REQUIRED_COOKIES = ("auth_token", "ct0")
+
+
+def is_complete(auth: Optional[Dict[str, Any]]) -> bool:
+    """认证信息是否包含 auth_token、ct0 和 Authorization（排除模板占位值）"""
+    if not auth:
+        return False
+    cookies = auth.get('cookies', {})
+    headers = {key.lower(): value for key, value in auth.get('headers', {}).items()}
+    values = [cookies.get(name) for name in REQUIRED_COOKIES] + [headers.get('authorization')]
+    return all(value and 'YOUR_' not in str(value).upper() for value in values)
+
+
+def probe_auth(auth: Dict[str, Any], proxies: Optional[Dict[str, str]] = None,
+               timeout: float = 10.0) -> Tuple[Optional[bool], str]:
+    """发起一次轻量认证请求
+
+    Returns:
+        (是否有效, 说明)；无法判断（网络错误、限流、服务端错误）时为 (None, 原因)
+    """
+    import requests
+
+    cookies = auth.get('cookies', {})
+    headers = {key.lower(): value for key, value in auth.get('headers', {}).items()}
+    request_headers = {
+        'User-Agent': PROBE_USER_AGENT,
+        'Authorization': headers.get('authorization', ''),
+        'X-Csrf-Token': headers.get('x-csrf-token') or cookies.get('ct0', ''),
+        'X-Twitter-Auth-Type': 'OAuth2Session',
+        'Referer': 'https://x.com/home',
+    }
+
+    try:
+        response = requests.get(
+            PROBE_URL,
+            headers=request_headers,
+            cookies={name: cookies[name] for name in REQUIRED_COOKIES if cookies.get(name)},
+            proxies=proxies,
+            timeout=timeout
+        )
+    except requests.RequestException as e:
+        return None, f"请求异常: {e}"
+
+    if response.status_code == 200:
+        try:
+            screen_name = response.json().get('screen_name')
+        except ValueError:
+            screen_name = None
+        return True, f"@{screen_name}" if screen_name else "HTTP 200"
+    if response.status_code in (401, 403):
+        return False, f"HTTP {response.status_code}"
+    return None, f"HTTP {response.status_code}"
+
+
+class AuthCache:
+    def __init__(self, cache_file: Optional[str] = None, probe_ttl: float = 3600, expiry_margin: float = 600):
+        """
+        初始化认证缓存
+
+        Args:
+            cache_file: 缓存文件路径，默认 $AUTH_CACHE_FILE 或 auth_cache.json（包含凭据，不要提交到仓库）
+            probe_ttl: 验证结果的有效期（秒），期间不重复请求
+            expiry_margin: cookie距离过期不足该秒数时视为已过期
+        """
+        self.cache_file = Path(cache_file or os.getenv('AUTH_CACHE_FILE', 'auth_cache.json'))
+        self.probe_ttl = probe_ttl
+        self.expiry_margin = expiry_margin
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """读取缓存条目，不存在或损坏时返回None"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def _write(self, entry: Dict[str, Any]):
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.cache_file)
+        try:
+            os.chmod(self.cache_file, 0o600)
+        except OSError:
+            pass
+
+    def save(self, auth: Dict[str, Any], cookie_expires: Optional[Dict[str, float]] = None,
+             validated: bool = False):
+        """保存新提取的认证信息
+
+        Args:
+            auth: {"cookies": {...}, "headers": {...}}
+            cookie_expires: cookie名 -> 过期时间戳（Playwright中会话cookie为-1，不记录）
+            validated: 是否已确认有效（浏览器中刚登录成功时为True）
+        """
+        now = time.time()
+        self._write({
+            "cookies": auth.get('cookies', {}),
+            "headers": auth.get('headers', {}),
+            "cookie_expires": {
+                name: expires for name, expires in (cookie_expires or {}).items()
+                if expires and expires > 0
+            },
+            "captured_at": now,
+            "validated_at": now if validated else None,
+            "probe_result": "浏览器提取" if validated else None
+        })
+
+    def expires_at(self, entry: Dict[str, Any]) -> Optional[float]:
+        """必需cookie中最早的过期时间"""
+        expires = [entry.get('cookie_expires', {}).get(name) for name in REQUIRED_COOKIES]
+        expires = [value for value in expires if value]
+        return min(expires) if expires else None
+
+    def is_expired(self, entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        expires_at = self.expires_at(entry)
+        return expires_at is not None and expires_at - self.expiry_margin <= (now or time.time())
+
+    def _same_credentials(self, entry: Dict[str, Any], auth: Dict[str, Any]) -> bool:
+        return all(entry.get('cookies', {}).get(name) == auth.get('cookies', {}).get(name) for name in REQUIRED_COOKIES)
+
+    def validate(self, auth: Optional[Dict[str, Any]] = None, proxies: Optional[Dict[str, str]] = None,
+                 force_probe: bool = False) -> Tuple[bool, str]:
+        """检查认证是否仍然可用
+
+        Args:
+            auth: 待检查的认证信息，默认使用缓存中的
+            proxies: 验证请求使用的代理
+            force_probe: 忽略缓存的验证结果，重新请求
+
+        Returns:
+            (是否可用, 说明)
+        """
+        entry = self.load()
+        if auth is None:
+            auth = entry
+        elif entry and not self._same_credentials(entry, auth):
+            # 配置中的凭据与缓存不一致（如手动更新了.env），缓存的过期时间和验证结果不适用
+            entry = None
+
+        if not is_complete(auth):
+            return False, "认证信息缺失"
+        if entry and self.is_expired(entry):
+            return False, f"cookie已于 {time.strftime('%Y-%m-%d %H:%M', time.localtime(self.expires_at(entry)))} 过期"
+
+        now = time.time()
+        validated_at = (entry or {}).get('validated_at')
+        if not force_probe and validated_at and now - validated_at < self.probe_ttl:
+            return True, f"{int(now - validated_at)}秒前已验证 ({entry.get('probe_result')})"
+
+        valid, detail = probe_auth(auth, proxies=proxies)
+        if valid is False:
+            return False, f"认证已失效 ({detail})"
+
+        if valid:
+            if entry is None:
+                entry = {"cookies": auth.get('cookies', {}), "headers": auth.get('headers', {}),
+                         "cookie_expires": {}, "captured_at": None}
+            entry.update(validated_at=now, probe_result=detail)
+            self._write(entry)
+            return True, f"验证通过 ({detail})"
+        return True, f"无法验证，沿用现有认证 ({detail})"
+
+
+def main():
+    from config_loader import ConfigLoader
+
+    loader = ConfigLoader()
+    cache = AuthCache()
+    auth = loader.get('authentication')
+    if not is_complete(auth):
+        auth = None
+
+    valid, detail = cache.validate(auth, proxies=loader.get_proxy_settings(), force_probe='--probe' in sys.argv)
+    print(f"{'✅' if valid else '❌'} 认证{'可用' if valid else '不可用'}: {detail}")
+    if not valid:
+        print("💡 运行 python auth_setup.py 重新登录提取")
+    sys.exit(0 if valid else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,22 @@
 """
 基于analyzer.py成功经验的认证提取工具
 使用launch_persistent_context保持登录状态
+已有认证仍然有效时直接复用（见 auth_cache.py），不启动浏览器；--force 强制重新提取
 """
 
 import json
 import asyncio
 import os
+import sys
 from pathlib import Path
-from playwright.async_api import async_playwright
+
+from auth_cache import AuthCache, is_complete
 
 async def extract_auth_like_analyzer():
     """使用和analyzer.py相同的方式提取认证信息"""
+    # 只有需要重新登录时才加载Playwright
+    from playwright.async_api import async_playwright
+
     print("🎯 使用analyzer.py的成功方法")
     print("这种方式已经验证可以正常登录Google账号")
     
@@ -35,7 +41,7 @@ async def extract_auth_like_analyzer():
             page = await context.new_page()
         
         # 存储认证信息
-        auth_info = {'cookies': {}, 'headers': {}}
+        auth_info = {'cookies': {}, 'headers': {}, 'expires': {}}
         
         # 监听请求获取认证信息
         async def handle_request(request):
@@ -73,6 +79,7 @@ async def extract_auth_like_analyzer():
                 for cookie in cookies:
                     if cookie['name'] in ['auth_token', 'ct0']:
                         auth_info['cookies'][cookie['name']] = cookie['value']
+                        auth_info['expires'][cookie['name']] = cookie.get('expires')
                         if cookie['name'] == 'auth_token':
                             print(f"✅ 获取到 auth_token")
                         if cookie['name'] == 'ct0':
@@ -162,6 +169,11 @@ async def extract_auth_like_analyzer():
                     json.dump(config, f, ensure_ascii=False, indent=2)
                 saved_files.append('config.json')
 
+                # 3. 记录cookie过期时间，下次运行时有效则跳过浏览器
+                auth_cache = AuthCache()
+                auth_cache.save(config['authentication'], cookie_expires=auth_info['expires'], validated=True)
+                saved_files.append(str(auth_cache.cache_file))
+
                 print("\n🎉 认证配置完成!")
                 print(f"💾 已保存到: {', '.join(saved_files)}")
                 print("\n🚀 现在可以运行:")
@@ -192,10 +204,36 @@ async def extract_auth_like_analyzer():
                 pass
             await context.close()
 
+def check_existing_auth() -> bool:
+    """检查 .env/config.json 或认证缓存中的认证是否仍然有效"""
+    from config_loader import ConfigLoader
+
+    loader = ConfigLoader()
+    auth = loader.get('authentication')
+    if not is_complete(auth):
+        auth = None
+
+    auth_cache = AuthCache()
+    valid, detail = auth_cache.validate(auth, proxies=loader.get_proxy_settings())
+    if valid:
+        print(f"✅ 现有认证可用: {detail}")
+        if auth is None:
+            # 配置文件中没有认证，从缓存恢复
+            cached = auth_cache.load()
+            loader.save_section('authentication', {"cookies": cached['cookies'], "headers": cached['headers']})
+        print("💡 无需重新登录；如需强制重新提取请使用 --force")
+    else:
+        print(f"🔄 需要重新提取认证: {detail}")
+    return valid
+
+
 if __name__ == "__main__":
     print("🔑 X认证提取工具 - 基于analyzer.py成功经验")
     print("使用和分析工具相同的浏览器配置，支持Google登录")
-    
+
+    if '--force' not in sys.argv and check_existing_auth():
+        sys.exit(0)
+
     try:
         asyncio.run(extract_auth_like_analyzer())
     except KeyboardInterrupt:
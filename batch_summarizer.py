@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+批量总结模块 - 使用OpenAI兼容的Batch API提交夜间用户总结
+所有prompt打包为一个JSONL批任务提交，轮询完成后统一写回总结文件
+适合对延迟不敏感的每日总结，吞吐更高、单价更低
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# Batch API 需要直连支持批处理的服务（OpenRouter不支持）
+DEFAULT_BATCH_BASE_URL = "https://api.openai.com/v1"
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# 批任务的终止状态
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchSummaryRunner:
+    def __init__(self, summarizer, client=None, poll_interval: int = 30, max_wait: int = 24 * 3600,
+                 batch_dir: Optional[str] = None, stop_event: Optional[threading.Event] = None):
+        """
+        初始化批量总结器
+
+        Args:
+            summarizer: TwitterSummarizer 实例，用于生成prompt和读取LLM配置
+            client: OpenAI兼容客户端（需支持files/batches接口），None时按环境变量创建
+            poll_interval: 轮询间隔（秒）
+            max_wait: 最长等待时间（秒），超时后取消批任务
+            batch_dir: 批任务输入/输出文件目录
+            stop_event: 设置后停止轮询并取消批任务（常驻服务收到停止信号时）
+        """
+        self.summarizer = summarizer
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        self.batch_dir = Path(batch_dir) if batch_dir else data_dir / "batches"
+        self._client = client
+        self.stop_event = stop_event
+
+    @property
+    def client(self):
+        """延迟创建批处理客户端"""
+        if self._client is None:
+            from llm_client import get_llm_client
+            # 不沿用总结器的密钥：那通常是OpenRouter密钥，发给Batch服务只会认证失败
+            api_key = os.getenv('LLM_BATCH_API_KEY') or os.getenv('OPENAI_API_KEY')
+            if not api_key:
+                raise RuntimeError("Batch API需要单独的密钥（OpenRouter密钥不可用），请设置 LLM_BATCH_API_KEY 或 OPENAI_API_KEY")
+            base_url = os.getenv('LLM_BATCH_BASE_URL') or DEFAULT_BATCH_BASE_URL
+            self._client = get_llm_client(api_key, base_url)
+        return self._client
+
+    def get_batch_model(self) -> str:
+        """批处理使用的模型：LLM_BATCH_MODEL > 总结器模型（去掉OpenRouter的供应商前缀）"""
+        model = os.getenv('LLM_BATCH_MODEL') or self.summarizer.custom_model or self.summarizer.llm_config["default_model"]
+        if model.startswith("openai/"):
+            model = model[len("openai/"):]
+        return model
+
+    def build_request_lines(self, jobs: Dict[str, str],
+                            messages: Optional[Dict[str, List[Dict[str, str]]]] = None) -> List[Dict[str, Any]]:
+        """把 {custom_id: prompt} 转换为Batch API的JSONL请求行
+
+        Args:
+            messages: {custom_id: 拆分后的消息}，提供时使用固定指令+可变数据的消息格式（可命中前缀缓存）
+        """
+        model = self.get_batch_model()
+        messages = messages or {}
+        lines = []
+        for custom_id, prompt in jobs.items():
+            lines.append({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": messages.get(custom_id) or [{"role": "user", "content": prompt}],
+                    "max_tokens": self.summarizer.llm_config["max_tokens"],
+                    "temperature": self.summarizer.llm_config["temperature"]
+                }
+            })
+        return lines
+
+    def submit(self, jobs: Dict[str, str], messages: Optional[Dict[str, List[Dict[str, str]]]] = None) -> str:
+        """写入JSONL并提交批任务，返回batch id"""
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        input_file = self.batch_dir / f"{timestamp}_input.jsonl"
+
+        with open(input_file, 'w', encoding='utf-8') as f:
+            for line in self.build_request_lines(jobs, messages):
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+        with open(input_file, 'rb') as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"description": f"user summaries {timestamp}"}
+        )
+        print(f"📦 批任务已提交: {batch.id} ({len(jobs)} 个请求, 输入文件: {input_file.name})")
+        return batch.id
+
+    def cancel(self, batch):
+        """取消未完成的批任务，避免调用方降级为同步调用后供应商仍继续处理（重复计费）"""
+        try:
+            return self.client.batches.cancel(batch.id)
+        except Exception as e:
+            print(f"⚠️ 取消批任务失败: {e}")
+            return batch
+
+    def wait_for_completion(self, batch_id: str):
+        """轮询批任务直到结束、超时或收到停止信号（超时和停止时取消批任务）"""
+        start_time = time.time()
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            counts = getattr(batch, 'request_counts', None)
+            progress = f" ({counts.completed}/{counts.total})" if counts else ""
+            print(f"⏳ 批任务状态: {batch.status}{progress}")
+
+            if batch.status in TERMINAL_STATUSES:
+                return batch
+
+            if time.time() - start_time >= self.max_wait:
+                print(f"⏰ 等待超过 {self.max_wait} 秒，取消批任务 {batch_id}")
+                return self.cancel(batch)
+
+            if self.stop_event is None:
+                time.sleep(self.poll_interval)
+            elif self.stop_event.wait(self.poll_interval):
+                print(f"🛑 收到停止信号，取消批任务 {batch_id}")
+                return self.cancel(batch)
+
+    def fetch_results(self, batch) -> Dict[str, Optional[str]]:
+        """下载批任务输出，返回 {custom_id: 总结内容}，失败的请求为None"""
+        results: Dict[str, Optional[str]] = {}
+
+        for file_id in (getattr(batch, 'output_file_id', None), getattr(batch, 'error_file_id', None)):
+            if not file_id:
+                continue
+            content = self.client.files.content(file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                custom_id = item.get('custom_id')
+                response = item.get('response') or {}
+                if response.get('status_code') == 200:
+                    choices = response.get('body', {}).get('choices', [])
+                    results[custom_id] = choices[0]['message']['content'] if choices else None
+                else:
+                    error = item.get('error') or response.get('body', {}).get('error')
+                    print(f"  ⚠️ 请求 {custom_id} 失败: {error}")
+                    results.setdefault(custom_id, None)
+
+        return results
+
+    def run(self, jobs: Dict[str, str], messages: Optional[Dict[str, List[Dict[str, str]]]] = None) -> Dict[str, Optional[str]]:
+        """提交、等待并获取结果"""
+        if not jobs:
+            return {}
+        batch_id = self.submit(jobs, messages)
+        batch = self.wait_for_completion(batch_id)
+        if batch.status not in TERMINAL_STATUSES:
+            # 已取消或仍在运行的批任务还没有输出文件
+            print(f"❌ 批任务未完成: {batch.status}")
+            return {}
+        if batch.status != "completed":
+            print(f"❌ 批任务未完成: {batch.status}")
+        results = self.fetch_results(batch)
+        print(f"✅ 批任务返回 {sum(1 for v in results.values() if v)}/{len(jobs)} 个结果")
+        return results
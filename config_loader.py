@@ -7,15 +7,25 @@
 import os
 import json
 from pathlib import Path
-from dotenv import load_dotenv
 
-# 加载.env文件
-load_dotenv()
+_env_loaded = False
+
+
+def load_env():
+    """加载.env文件（进程内只加载一次；导入模块时不做任何I/O）"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
 
 class ConfigLoader:
     """统一的配置管理器"""
 
     def __init__(self, config_file="config.json"):
+        load_env()
         self.config_file = Path(config_file)
         self.config = self._load_config()
 
@@ -27,6 +37,8 @@ class ConfigLoader:
                 "cookies": {},
                 "headers": {}
             },
+            # 额外的X账号（多账号轮换请求），每项: name, cookies, headers, 可选 requests_per_hour
+            "accounts": [],
             "settings": {
                 "requests_per_hour": 400,
                 "retry_attempts": 3,
@@ -64,6 +76,24 @@ class ConfigLoader:
         if os.getenv('X_CSRF_TOKEN'):
             config['authentication']['headers']['X-Csrf-Token'] = os.getenv('X_CSRF_TOKEN')
 
+        # 额外账号: X_AUTH_TOKEN_2 / X_CT0_TOKEN_2 / X_CSRF_TOKEN_2 / X_BEARER_TOKEN_2 ...
+        index = 2
+        while os.getenv(f'X_AUTH_TOKEN_{index}') and os.getenv(f'X_CT0_TOKEN_{index}'):
+            account = {
+                "name": f"account{index}",
+                "cookies": {
+                    "auth_token": os.getenv(f'X_AUTH_TOKEN_{index}'),
+                    "ct0": os.getenv(f'X_CT0_TOKEN_{index}')
+                },
+                "headers": {}
+            }
+            if os.getenv(f'X_BEARER_TOKEN_{index}'):
+                account['headers']['Authorization'] = os.getenv(f'X_BEARER_TOKEN_{index}')
+            if os.getenv(f'X_CSRF_TOKEN_{index}'):
+                account['headers']['X-Csrf-Token'] = os.getenv(f'X_CSRF_TOKEN_{index}')
+            config['accounts'].append(account)
+            index += 1
+
         # LLM配置
         if os.getenv('OPENROUTER_API_KEY'):
             config['llm']['api_key'] = os.getenv('OPENROUTER_API_KEY')
@@ -118,6 +148,23 @@ class ConfigLoader:
             json.dump(self.config, f, ensure_ascii=False, indent=2)
         print(f"✅ 配置已保存到: {output_file}")
 
+    def save_section(self, key, value):
+        """只更新配置文件中的一个顶层字段
+
+        与 save_to_json 不同，不会把.env提供的值（密钥、额外账号等）和默认值写入文件
+        """
+        file_config = {}
+        if self.config_file.exists():
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                file_config = json.load(f)
+        file_config[key] = value
+        tmp_file = self.config_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(file_config, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.config_file)
+        self.config[key] = value
+        print(f"✅ 已更新 {self.config_file} 中的 {key}")
+
     def validate(self):
         """验证必要的配置是否存在"""
         errors = []
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+常驻服务模式 - 进程内调度抓取和总结任务，替代每次冷启动的定时任务
+- 复用同一个爬虫实例：HTTP会话和TLS连接、账号额度与冷却状态、结构基线、推文索引、总结器都保持加载
+- 抓取按固定间隔运行，间隔带随机抖动；用户总结每天在指定时间后运行一次
+- SIGTERM/SIGINT 时停止调度，正在进行的抓取在当前页结束后保存已获取的数据再退出；再次发送信号立即退出
+- 运行状态写入 DATA_DIR/service_state.json，供 run_crawler.py status 查看
+"""
+
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class ScheduledJob:
+    def __init__(self, name: str, func: Callable[[], Any], next_time: Callable[[float], float],
+                 first_run: Optional[float] = None):
+        """
+        Args:
+            name: 任务名
+            func: 任务函数
+            next_time: 上次运行结束时间 -> 下次运行时间
+            first_run: 首次运行时间，默认立即运行
+        """
+        self.name = name
+        self.func = func
+        self.next_time = next_time
+        self.next_run = first_run if first_run is not None else time.time()
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_result: Optional[str] = None
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat(timespec='seconds'),
+            "last_run": datetime.fromtimestamp(self.last_run).isoformat(timespec='seconds') if self.last_run else None,
+            "last_duration_seconds": round(self.last_duration, 1) if self.last_duration is not None else None,
+            "last_result": self.last_result,
+            "runs": self.runs,
+            "failures": self.failures
+        }
+
+
+class CrawlService:
+    def __init__(self, crawl_interval: float = 7200, jitter: float = 0.1, tweet_count: Optional[int] = None,
+                 timeline_type: str = "recommended", max_pages: Optional[int] = None,
+                 summary_hour: Optional[int] = 9, batch_mode: bool = False, digest: bool = False):
+        """
+        初始化常驻服务
+
+        Args:
+            crawl_interval: 抓取间隔（秒）
+            jitter: 间隔随机抖动比例，0.1 表示 ±10%；每日总结在指定时间后随机延迟最多 jitter 小时
+            tweet_count: 每次抓取的推文数，默认使用配置中的 daily_tweet_count
+            timeline_type: 时间线类型
+            max_pages: 每次抓取的最大页数
+            summary_hour: 每天生成昨天用户总结的时间（本地时间的小时），None 表示不生成
+            batch_mode: 用户总结使用Batch API
+            digest: 用户总结完成后生成全局日报
+        """
+        from crawler import XCrawler
+
+        self.crawler = XCrawler()
+        self.stop_event = threading.Event()
+        self.crawler.stop_event = self.stop_event
+        self.crawl_interval = crawl_interval
+        self.jitter = jitter
+        self.tweet_count = tweet_count
+        self.timeline_type = timeline_type
+        self.max_pages = max_pages
+        self.summary_hour = summary_hour
+        self.batch_mode = batch_mode
+        self.digest = digest
+        self.state_file = self.crawler.data_dir / "service_state.json"
+        self.started_at = time.time()
+        # 按天记录见过的推文id（只保留今天和昨天），用于统计每次抓取真正新增的推文
+        self.seen_ids: Dict[str, Set[str]] = {}
+        self._signal_count = 0
+
+        self.jobs: List[ScheduledJob] = [
+            ScheduledJob("crawl", self.run_crawl, self._next_crawl_time)
+        ]
+        if summary_hour is not None:
+            # 启动时已过当天的总结时间则在首次抓取后补跑（总结清单会跳过已生成的用户）
+            today_run = datetime.now().replace(hour=summary_hour, minute=0, second=0, microsecond=0).timestamp()
+            first_run = time.time() if time.time() >= today_run else self._next_summary_time(time.time())
+            self.jobs.append(ScheduledJob("summaries", self.run_summaries, self._next_summary_time, first_run))
+
+    def _next_crawl_time(self, now: float) -> float:
+        return now + self.crawl_interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _next_summary_time(self, now: float) -> float:
+        next_day = datetime.fromtimestamp(now).replace(hour=self.summary_hour, minute=0, second=0, microsecond=0)
+        if next_day.timestamp() <= now:
+            next_day += timedelta(days=1)
+        return next_day.timestamp() + random.uniform(0, self.jitter * 3600)
+
+    def run_crawl(self) -> str:
+        tweets = self.crawler.crawl_daily_posts(
+            timeline_type=self.timeline_type,
+            target_count=self.tweet_count,
+            max_pages=self.max_pages
+        )
+        tweet_ids = {tweet.get('id') for tweet in tweets}
+        new_count = len(tweet_ids.difference(*self.seen_ids.values()))
+        self.remember_ids(tweet_ids)
+        self.crawler.cleanup_old_raw_responses(days_to_keep=3)
+        return f"{len(tweets)} 条推文 (近两天首次出现: {new_count} 条)"
+
+    def remember_ids(self, tweet_ids: Set[str], now: Optional[datetime] = None):
+        """记录本次抓取的推文id，丢弃昨天之前的记录，避免常驻进程内存持续增长"""
+        now = now or datetime.now()
+        today = now.strftime('%Y%m%d')
+        yesterday = (now - timedelta(days=1)).strftime('%Y%m%d')
+        self.seen_ids.setdefault(today, set()).update(tweet_ids)
+        self.seen_ids = {day: ids for day, ids in self.seen_ids.items() if day >= yesterday}
+
+    def run_summaries(self) -> str:
+        self.crawler.generate_user_summaries_for_yesterday(batch_mode=self.batch_mode)
+        if self.digest and not self.stop_event.is_set():
+            self.crawler.generate_daily_digest()
+        return "完成"
+
+    def request_stop(self, signum=None, frame=None):
+        """信号处理：第一次优雅停止，第二次立即退出"""
+        self._signal_count += 1
+        name = signal.Signals(signum).name if signum else "stop"
+        if self._signal_count > 1:
+            # 不在任意位置抛出异常打断正在执行的代码，直接结束进程（已保存的数据不受影响）
+            print(f"\n⛔ 再次收到 {name}，立即退出")
+            sys.stdout.flush()
+            os._exit(128 + (signum or signal.SIGINT))
+        print(f"\n🛑 收到 {name}，当前任务结束后停止服务（再次发送信号立即退出）")
+        self.stop_event.set()
+
+    def save_state(self):
+        state = {
+            "pid": os.getpid(),
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            "updated_at": datetime.now().isoformat(timespec='seconds'),
+            "running": not self.stop_event.is_set(),
+            "requests": self.crawler.request_count,
+            "jobs": {job.name: job.state() for job in self.jobs}
+        }
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            print(f"⚠️ 保存服务状态失败: {e}")
+
+    def run_job(self, job: ScheduledJob):
+        print(f"\n⏱️ [{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始任务: {job.name}")
+        start_time = time.time()
+        try:
+            job.last_result = job.func()
+        except Exception as e:
+            # 单次任务失败不影响后续调度
+            job.failures += 1
+            job.last_result = f"失败: {e}"
+            print(f"❌ 任务 {job.name} 失败: {e}")
+        job.runs += 1
+        job.last_run = start_time
+        job.last_duration = time.time() - start_time
+        job.next_run = job.next_time(time.time())
+        print(f"✅ 任务 {job.name} 结束 ({job.last_duration:.1f}秒): {job.last_result}")
+        print(f"📅 下次 {job.name}: {datetime.fromtimestamp(job.next_run).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.save_state()
+
+    def run(self):
+        """运行调度循环直到收到停止信号"""
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        print(f"🛰️ 常驻服务已启动 (pid {os.getpid()})")
+        print(f"  抓取间隔: {self.crawl_interval / 60:.0f}分钟 (±{self.jitter:.0%})")
+        if self.summary_hour is not None:
+            print(f"  用户总结: 每天 {self.summary_hour}:00 后{' (Batch API)' if self.batch_mode else ''}{' + 全局日报' if self.digest else ''}")
+
+        try:
+            while not self.stop_event.is_set():
+                job = min(self.jobs, key=lambda j: j.next_run)
+                wait_time = job.next_run - time.time()
+                if wait_time > 0:
+                    # 等待期间收到信号立即醒来
+                    if self.stop_event.wait(wait_time):
+                        break
+                self.run_job(job)
+        finally:
+            self.stop_event.set()
+            self.save_state()
+            print("👋 服务已停止")
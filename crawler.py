@@ -9,31 +9,34 @@ X HTTP爬虫 - 基于深度分析结果实现
 """
 
 import json
-import requests
 import time
 import os
 import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import TYPE_CHECKING, List, Dict, Optional, Any
 import random
-from config_loader import ConfigLoader
+from config_loader import ConfigLoader, load_env
+from tweet_index import TweetIndex
+from tweet_parser import parse_tweet, extract_tweets_from_response
+from schema_drift import SchemaDriftDetector, save_drift_report
+from account_pool import CredentialPool
+
+if TYPE_CHECKING:
+    import requests
 
 class XCrawler:
     def __init__(self, data_dir="crawler_data", config_file="config.json"):
-        # 使用环境变量或默认值
+        # 使用环境变量（含.env中的DATA_DIR）或默认值；数据目录在写入时才创建
+        load_env()
         self.data_dir = Path(os.getenv('DATA_DIR', data_dir))
-        self.data_dir.mkdir(exist_ok=True)
-
-        # 创建数据存储目录
-        for subdir in ["daily_posts", "users_daily", "raw_responses", "user_summaries", "prompts"]:
-            (self.data_dir / subdir).mkdir(exist_ok=True)
 
         # 使用新的配置加载器
         self.config_loader = ConfigLoader(config_file)
         self.config = self.config_loader.config
-        self.session = requests.Session()
-        self.setup_session()
+        # HTTP会话和账号池在第一次请求时才创建（只生成总结时不需要加载requests）
+        self._account_pool: Optional[CredentialPool] = None
+        self.session = None
         
         # API端点 - 基于分析结果
         self.api_endpoints = {
@@ -44,16 +47,67 @@ class XCrawler:
         # 基础URL
         self.base_url = "https://x.com/i/api/graphql"
         
-        # 请求计数和限流
+        # 请求计数（每个账号的额度由凭据池管理）
         self.request_count = 0
-        self.last_request_time = 0
-        self.rate_limit = self.config.get('settings', {}).get('requests_per_hour', 400)
-    
+        # 常驻服务设置的停止信号（threading.Event），置位后抓取和总结在当前步骤结束后停止
+        self.stop_event = None
+        self._summarizer = None
+        # 发出当前cursor的账号，翻页时优先沿用
+        self.cursor_account = None
+
+        # 推文关键词倒排索引（保存推文时增量更新）
+        self.tweet_index = TweetIndex(str(self.data_dir / "index"))
+
+        # 响应结构漂移检测（基线首次使用时从raw_responses构建）
+        self.schema_detector = SchemaDriftDetector(
+            baseline_file=str(self.data_dir / "schema_baseline.json"),
+            raw_responses_dir=str(self.data_dir / "raw_responses")
+        )
+
+    @property
+    def account_pool(self) -> CredentialPool:
+        if self._account_pool is None:
+            self.setup_session()
+        return self._account_pool
+
+    @property
+    def summarizer(self):
+        """总结器（同一爬虫实例内复用，常驻服务中保持模板、模型路由等状态）"""
+        if self._summarizer is None:
+            from summarizer import TwitterSummarizer
+            self._summarizer = TwitterSummarizer()
+        return self._summarizer
+
+    def _stop_requested(self) -> bool:
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    @property
+    def rate_limit(self) -> int:
+        """所有账号每小时的总请求额度"""
+        return self.account_pool.total_budget or self.config.get('settings', {}).get('requests_per_hour', 400)
         
     def setup_session(self):
-        """设置HTTP会话"""
+        """设置HTTP会话 - 每个账号一个会话，由凭据池分配请求"""
+        proxy_settings = self.config_loader.get_proxy_settings()
+        if proxy_settings:
+            print(f"🌐 使用代理: {proxy_settings}")
+
+        self._account_pool = CredentialPool.from_config(self.config, session_factory=self.create_session)
+        if self._account_pool.accounts:
+            self.session = self._account_pool.accounts[0].session
+            if len(self._account_pool.accounts) > 1:
+                print(f"👥 已加载 {len(self._account_pool.accounts)} 个账号，请求将在账号间负载均衡")
+        else:
+            # 没有可用账号时保留未认证会话，以便给出配置提示
+            self.session = self.create_session(self.config.get('authentication', {}))
+
+    def create_session(self, auth_config: Dict[str, Any]) -> 'requests.Session':
+        """创建一个带浏览器headers、代理和认证信息的HTTP会话"""
+        import requests
+
+        session = requests.Session()
         # 基础headers - 模拟真实浏览器
-        self.session.headers.update({
+        session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': '*/*',
             'Accept-Language': 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7',
@@ -67,32 +121,29 @@ class XCrawler:
         })
 
         # 确保requests会自动处理gzip解压
-        self.session.trust_env = False
+        session.trust_env = False
 
         # 设置代理（如果配置了）
         proxy_settings = self.config_loader.get_proxy_settings()
         if proxy_settings:
-            self.session.proxies = proxy_settings
-            print(f"🌐 使用代理: {proxy_settings}")
+            session.proxies = proxy_settings
 
-        # 从配置文件加载认证信息
-        self.load_authentication()
+        self.load_authentication(session, auth_config)
+        return session
     
-    def load_authentication(self):
-        """从配置文件加载认证信息"""
-        auth_config = self.config.get('authentication', {})
-        
+    def load_authentication(self, session: 'requests.Session', auth_config: Dict[str, Any]):
+        """把账号的认证信息加载到会话"""
         # 加载cookies
         cookies = auth_config.get('cookies', {})
         for key, value in cookies.items():
             if value and value != f"YOUR_{key.upper()}_HERE":
-                self.session.cookies.set(key, value)
+                session.cookies.set(key, value)
         
         # 加载headers
         headers = auth_config.get('headers', {})
         for key, value in headers.items():
             if value and not value.startswith("YOUR_"):
-                self.session.headers[key] = value
+                session.headers[key] = value
         
         # 检查认证是否配置
         has_auth = any(
@@ -105,27 +156,12 @@ class XCrawler:
             print("请复制 config_template.json 为 config.json 并填入正确的认证信息")
     
     def rate_limit_check(self):
-        """检查和执行限流"""
-        current_time = time.time()
-        
-        # 每小时重置计数
-        if current_time - self.last_request_time > 3600:
-            self.request_count = 0
-        
-        # 检查限流
-        if self.request_count >= self.rate_limit:
-            wait_time = 3600 - (current_time - self.last_request_time)
-            if wait_time > 0:
-                print(f"⏰ 达到限流上限，等待 {wait_time:.0f} 秒...")
-                time.sleep(wait_time)
-                self.request_count = 0
-        
+        """请求前的随机延迟（每小时额度由凭据池按账号控制）"""
         # 随机延迟防止检测
         delay = random.uniform(1.0, 3.0)
         time.sleep(delay)
         
         self.request_count += 1
-        self.last_request_time = current_time
     
     def get_timeline_params(self, timeline_type: str = "recommended", cursor: Optional[str] = None) -> Dict:
         """获取时间线请求参数"""
@@ -183,7 +219,34 @@ class XCrawler:
         }
     
     def make_timeline_request(self, timeline_type: str = "recommended", cursor: Optional[str] = None) -> Optional[Dict]:
-        """发起时间线请求"""
+        """发起时间线请求 - 由凭据池选择账号，账号限流或认证失效时换其他账号重试"""
+        for attempt in range(max(len(self.account_pool.accounts), 1)):
+            account = None
+            if self.account_pool.accounts:
+                account = self.account_pool.acquire(preferred=self.cursor_account if cursor else None,
+                                                    stop_event=self.stop_event)
+                if account is None:
+                    if self._stop_requested():
+                        print("🛑 收到停止信号，停止等待账号额度")
+                    else:
+                        print("❌ 所有账号认证均已失效，请运行 python auth_setup.py 更新认证")
+                    return None
+                if cursor and account is not self.cursor_account:
+                    # cursor只对发出它的账号有效，换账号后从时间线顶部开始（重复推文会被去重）
+                    print(f"🔀 切换到账号 {account.name}，从时间线顶部继续")
+                    cursor = None
+                self.session = account.session
+
+            response_data, status_code = self._request_timeline_page(timeline_type, cursor, account)
+            if response_data is not None:
+                self.cursor_account = account
+                return response_data
+            if status_code not in (429, 401, 403):
+                return None
+        return None
+
+    def _request_timeline_page(self, timeline_type: str, cursor: Optional[str], account=None):
+        """用当前会话请求一页时间线，返回 (响应数据, HTTP状态码)"""
         self.rate_limit_check()
         
         endpoint = self.api_endpoints[timeline_type]
@@ -191,8 +254,11 @@ class XCrawler:
         params = self.get_timeline_params(timeline_type, cursor)
         
         try:
-            print(f"🔄 请求 {timeline_type} 时间线...")
+            account_label = f" (账号 {account.name})" if account is not None and len(self.account_pool.accounts) > 1 else ""
+            print(f"🔄 请求 {timeline_type} 时间线{account_label}...")
             response = self.session.get(url, params=params, timeout=30)
+            if account is not None:
+                self.account_pool.record(account, response.status_code, response)
 
             if response.status_code == 200:
                 # 检查响应内容类型和编码
@@ -240,33 +306,35 @@ class XCrawler:
                             print("✅ 成功解压并解析JSON")
                         except Exception as decomp_e:
                             print(f"❌ 解压失败: {decomp_e}")
-                            return None
+                            return None, response.status_code
                     else:
                         print(f"📝 响应前100字符: {repr(response.text[:100])}")
-                        return None
+                        return None, response.status_code
 
                 # 保存原始API响应用于分析
                 self.save_raw_response(response, url, params, timeline_type)
 
-                return response_data
+                return response_data, response.status_code
             elif response.status_code == 429:
-                print("⚠️ 触发限流，等待后重试...")
-                time.sleep(60)
-                return None
+                # 凭据池已为该账号设置冷却，由调用方换账号重试
+                print("⚠️ 触发限流")
+                return None, response.status_code
             else:
                 print(f"❌ 请求失败: {response.status_code} - {response.text[:200]}")
-                return None
+                return None, response.status_code
                 
         except Exception as e:
             print(f"❌ 请求异常: {e}")
-            return None
+            if account is not None:
+                self.account_pool.record(account, None)
+            return None, None
     
     def save_raw_response(self, response, url: str, params: dict, timeline_type: str):
         """保存原始API响应用于分析"""
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
             raw_dir = self.data_dir / "raw_responses"
-            raw_dir.mkdir(exist_ok=True)
+            raw_dir.mkdir(parents=True, exist_ok=True)
 
             filename = f"{timestamp}_{timeline_type}_response.json"
             filepath = raw_dir / filename
@@ -327,167 +395,16 @@ class XCrawler:
             print(f"⚠️ 清理raw_responses失败: {e}")
     
     def parse_tweet(self, tweet_data: Dict) -> Optional[Dict]:
-        """解析推文数据 - 基于分析结果的完整实现"""
-        try:
-            # 基础推文信息
-            tweet = {
-                'id': tweet_data.get('rest_id'),
-                'text': '',
-                'created_at': tweet_data.get('legacy', {}).get('created_at'),
-                'lang': tweet_data.get('legacy', {}).get('lang'),
-                'media': [],
-                'retweet': None,
-                'quoted': None,
-                'user': None,
-                'stats': {
-                    'retweet_count': tweet_data.get('legacy', {}).get('retweet_count', 0),
-                    'favorite_count': tweet_data.get('legacy', {}).get('favorite_count', 0),
-                    'reply_count': tweet_data.get('legacy', {}).get('reply_count', 0),
-                    'quote_count': tweet_data.get('legacy', {}).get('quote_count', 0)
-                }
-            }
-            
-            # 提取文本内容 - 处理长文推文和普通推文
-            if 'note_tweet' in tweet_data:
-                # 长文推文
-                note_tweet_result = tweet_data.get('note_tweet', {}).get('note_tweet_results', {}).get('result', {})
-                if note_tweet_result:
-                    tweet['text'] = note_tweet_result.get('text', '')
-            
-            if not tweet['text']:
-                # 普通推文 - 使用 legacy.full_text
-                tweet['text'] = tweet_data.get('legacy', {}).get('full_text', '')
-            
-            # 解析用户信息 - 修正字段路径
-            user_results = tweet_data.get('core', {}).get('user_results', {}).get('result', {})
-            if user_results:
-                tweet['user'] = {
-                    'id': user_results.get('rest_id'),
-                    'name': user_results.get('core', {}).get('name'),  # 修正：从core获取
-                    'screen_name': user_results.get('core', {}).get('screen_name'),  # 修正：从core获取
-                    'description': user_results.get('legacy', {}).get('description'),
-                    'followers_count': user_results.get('legacy', {}).get('followers_count', 0),
-                    'friends_count': user_results.get('legacy', {}).get('friends_count', 0),
-                    'verified': user_results.get('verification', {}).get('verified', False),  # 修正路径
-                    'is_blue_verified': user_results.get('is_blue_verified', False)
-                }
-            
-            # 解析媒体文件 - 基于分析结果
-            extended_entities = tweet_data.get('legacy', {}).get('extended_entities', {})
-            if 'media' in extended_entities:
-                for media_item in extended_entities['media']:
-                    media_entry = {
-                        'type': media_item.get('type'),
-                        'id': media_item.get('id_str'),
-                        'url': None
-                    }
-                    
-                    if media_item['type'] == 'video':
-                        # 视频处理 - 选择最高质量
-                        variants = media_item.get('video_info', {}).get('variants', [])
-                        best_variant = None
-                        highest_bitrate = 0
-                        
-                        for variant in variants:
-                            if variant.get('content_type') == 'video/mp4':
-                                bitrate = variant.get('bitrate', 0)
-                                if bitrate > highest_bitrate:
-                                    highest_bitrate = bitrate
-                                    best_variant = variant
-                        
-                        if best_variant:
-                            media_entry['url'] = best_variant['url']
-                            media_entry['bitrate'] = best_variant.get('bitrate')
-                    
-                    elif media_item['type'] in ['photo', 'animated_gif']:
-                        # 图片处理
-                        media_entry['url'] = media_item.get('media_url_https')
-                    
-                    if media_entry['url']:
-                        tweet['media'].append(media_entry)
-            
-            # 处理转推 - 基于分析结果，支持TweetWithVisibilityResults结构
-            if 'retweeted_status_result' in tweet_data.get('legacy', {}):
-                retweet_result = tweet_data['legacy']['retweeted_status_result'].get('result')
-                if retweet_result:
-                    # 处理TweetWithVisibilityResults结构
-                    if retweet_result.get('__typename') == 'TweetWithVisibilityResults':
-                        # 数据嵌套在tweet字段中
-                        actual_tweet = retweet_result.get('tweet')
-                        if actual_tweet:
-                            tweet['retweet'] = self.parse_tweet(actual_tweet)
-                    else:
-                        # 普通Tweet结构
-                        tweet['retweet'] = self.parse_tweet(retweet_result)
-            
-            # 处理引用推文
-            if 'quoted_status_result' in tweet_data:
-                quoted_result = tweet_data['quoted_status_result'].get('result')
-                if quoted_result:
-                    tweet['quoted'] = self.parse_tweet(quoted_result)
-            
-            return tweet
-            
-        except Exception as e:
-            print(f"❌ 解析推文失败: {e}")
-            return None
+        """解析推文数据（实现见 tweet_parser.parse_tweet）"""
+        return parse_tweet(tweet_data)
     
     def extract_tweets_from_response(self, data: Dict) -> List[Dict]:
-        """从响应中提取推文数据 - 基于分析结果"""
-        tweets = []
-        
-        try:
-            # 基于分析结果的数据路径
-            home_timeline = data.get('data', {}).get('home', {}).get('home_timeline_urt', {})
-            instructions = home_timeline.get('instructions', [])
-            
-            for instruction in instructions:
-                if instruction.get('type') == 'TimelineAddEntries':
-                    entries = instruction.get('entries', [])
-                    
-                    for entry in entries:
-                        entry_id = entry.get('entryId', '')
-                        
-                        # 推文条目 - 排除promoted-tweet广告
-                        if entry_id.startswith('tweet-'):
-                            content = entry.get('content', {})
-                            item_content = content.get('itemContent', {})
-                            tweet_results = item_content.get('tweet_results', {})
-                            tweet_data = tweet_results.get('result', {})
-                            
-                            if tweet_data.get('__typename') == 'Tweet':
-                                parsed_tweet = self.parse_tweet(tweet_data)
-                                if parsed_tweet:
-                                    tweets.append(parsed_tweet)
-                        
-                        # 对话模块 - 包含多条相关推文
-                        elif entry_id.startswith('home-conversation-'):
-                            content = entry.get('content', {})
-                            if content.get('entryType') == 'TimelineTimelineModule':
-                                items = content.get('items', [])
-                                for item in items:
-                                    item_content = item.get('item', {}).get('itemContent', {})
-                                    if item_content.get('itemType') == 'TimelineTweet':
-                                        tweet_results = item_content.get('tweet_results', {})
-                                        tweet_data = tweet_results.get('result', {})
-                                        
-                                        if tweet_data.get('__typename') == 'Tweet':
-                                            parsed_tweet = self.parse_tweet(tweet_data)
-                                            if parsed_tweet:
-                                                tweets.append(parsed_tweet)
-                        
-                        # 游标处理 - 用于分页
-                        elif 'cursor-' in entry_id:
-                            cursor_content = entry.get('content', {})
-                            if cursor_content.get('cursorType') == 'Bottom':
-                                cursor_value = cursor_content.get('value')
-                                # 保存cursor用于下次请求
-                                self.last_cursor = cursor_value
-                                print(f"🔗 找到下一页cursor: {cursor_value[:50]}...")
-        
-        except Exception as e:
-            print(f"❌ 提取推文数据失败: {e}")
-        
+        """从响应中提取推文数据，并记录下一页cursor"""
+        tweets, cursor = extract_tweets_from_response(data)
+        if cursor:
+            # 保存cursor用于下次请求
+            self.last_cursor = cursor
+            print(f"🔗 找到下一页cursor: {cursor[:50]}...")
         return tweets
     
     def crawl_daily_posts(self, timeline_type: str = "recommended", max_pages: int = None, target_count: Optional[int] = None) -> List[Dict]:
@@ -502,18 +419,52 @@ class XCrawler:
         unique_tweets = {}
         cursor = None
         page = 0
+        # 请求开销统计，用于在结构变化时报告浪费的请求和时间
+        crawl_start = time.time()
+        unparsed_pages = 0
+        unparsed_seconds = 0.0
 
         # 如果指定了max_pages就使用，否则无限制直到达到target_count或无更多数据
         while max_pages is None or page < max_pages:
+            if self._stop_requested():
+                print("🛑 收到停止信号，保存已获取的推文")
+                break
             page += 1
             print(f"📄 爬取第 {page} 页...")
 
+            page_start = time.time()
             response_data = self.make_timeline_request(timeline_type, cursor)
             if not response_data:
                 print("❌ 请求失败，停止爬取")
                 break
 
+            drift = self.schema_detector.check(response_data)
+            for line in self.schema_detector.format_report(drift):
+                print(f"🧬 {line}")
+
             tweets = self.extract_tweets_from_response(response_data)
+            if drift["critical"]:
+                unparsed_pages += 1
+                unparsed_seconds += time.time() - page_start
+                crawl_stats = {
+                    "timeline_type": timeline_type,
+                    "page": page,
+                    "requests": self.request_count,
+                    "hourly_request_budget": self.rate_limit,
+                    "elapsed_seconds": round(time.time() - crawl_start, 1),
+                    "unparsed_pages": unparsed_pages,
+                    "unparsed_seconds": round(unparsed_seconds, 1),
+                    "tweets_on_page": len(tweets)
+                }
+                if unparsed_pages == 1:
+                    report_file = save_drift_report(drift, crawl_stats, str(self.data_dir))
+                    print(f"🧬 响应结构已变化，解析器依赖的字段缺失 (报告: {report_file})")
+                print(f"💸 本次共请求 {page} 页, 用时 {crawl_stats['elapsed_seconds']}秒, 其中 {unparsed_pages} 页无法正确解析 ({crawl_stats['unparsed_seconds']}秒)")
+                print(f"💸 本小时已用请求额度: {self.request_count}/{self.rate_limit}")
+                if not tweets:
+                    print("🛑 停止爬取以免继续消耗请求额度，请更新 tweet_parser 后重试")
+                    break
+
             if not tweets:
                 print("⚠️ 未找到推文数据，可能需要检查认证状态")
                 break
@@ -553,6 +504,9 @@ class XCrawler:
             # 按用户分组保存当天数据
             self.save_by_user_daily(all_tweets)
 
+        # 记录本次见到的新结构，同一变化只报告一次
+        self.schema_detector.save()
+
         print(f"🎉 总共爬取 {len(all_tweets)} 条唯一推文")
         return all_tweets
     
@@ -602,6 +556,7 @@ class XCrawler:
             "tweets": sorted_tweets
         }
 
+        filepath.parent.mkdir(parents=True, exist_ok=True)
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
@@ -633,6 +588,7 @@ class XCrawler:
         import os
         
         users_dir = self.data_dir / "users_daily"
+        users_dir.mkdir(parents=True, exist_ok=True)
         
         print(f"\n👥 按用户和日期分组保存推文...")
         
@@ -670,11 +626,13 @@ class XCrawler:
         print(f"👤 涉及用户数: {total_users} 个")
         print(f"📂 将生成文件数: {total_files} 个")
         
-        # 为每个用户的每个日期保存数据
+        # 为每个用户的每个日期保存数据，同时增量更新关键词索引
         for screen_name, date_tweets in user_date_tweets.items():
             for date_str, user_tweet_list in date_tweets.items():
                 self._save_user_tweets_by_date(screen_name, date_str, user_tweet_list, users_dir)
+                self.tweet_index.add_tweets(user_tweet_list, screen_name)
         
+        self.tweet_index.save()
         print(f"✅ 用户分组保存完成")
     
     def _save_user_tweets(self, screen_name: str, new_tweets: List[Dict], users_dir: Path):
@@ -820,161 +778,222 @@ class XCrawler:
         action = "更新" if existing_tweets else "创建"
         print(f"  📄 {action} @{screen_name}[{date_str}]: {len(sorted_tweets)} 条推文 -> {filename}")
     
-    def generate_user_summaries_for_yesterday(self, force_overwrite: bool = False):
-        """生成昨天所有用户的个人推文总结"""
-        from datetime import datetime, timedelta
-        from summarizer import TwitterSummarizer
-        
-        # 计算昨天日期
-        yesterday = datetime.now() - timedelta(days=1)
-        yesterday_str = yesterday.strftime('%Y%m%d')
-        
-        print(f"\n🤖 开始生成昨天({yesterday_str})的用户总结...")
-        
-        users_dir = self.data_dir / "users_daily"
+    def generate_user_summaries_for_yesterday(self, force_overwrite: bool = False, batch_mode: bool = False):
+        """生成昨天所有用户的个人推文总结
+
+        Args:
+            force_overwrite: 强制覆盖已存在的总结
+            batch_mode: 使用Batch API一次性提交所有用户的总结请求
+        """
+        from datetime import timedelta
+
+        yesterday_str = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+        self.generate_user_summaries_for_date(yesterday_str, force_overwrite=force_overwrite, batch_mode=batch_mode)
+
+    @staticmethod
+    def _username_from_daily_file(user_file: Path, date_str: str) -> str:
+        """从 username_YYYYMMDD.json 解析用户名（用户名本身可能包含下划线）"""
+        username, file_date = user_file.stem.rsplit('_', 1)
+        return username if file_date == date_str else user_file.stem
+
+    def _collect_pending_summaries(self, summarizer, manifest, user_files: List[Path], date_str: str,
+                                   force_overwrite: bool = False) -> List[Dict[str, Any]]:
+        """对比总结清单中的输入指纹，返回需要(重新)生成的用户"""
         summaries_dir = self.data_dir / "user_summaries"
-        summaries_dir.mkdir(exist_ok=True)
-        
-        # 查找昨天的所有用户文件
-        yesterday_files = list(users_dir.glob(f"*_{yesterday_str}.json"))
-        
-        if not yesterday_files:
-            print(f"📭 未找到昨天({yesterday_str})的用户数据文件")
-            return
-        
-        print(f"📂 发现 {len(yesterday_files)} 个用户文件")
-        
-        # 初始化总结器
-        summarizer = TwitterSummarizer()
-        summarized_count = 0
+        model = summarizer.custom_model or summarizer.llm_config["default_model"]
+        pending = []
         skipped_count = 0
-        
-        for user_file in yesterday_files:
+
+        for user_file in user_files:
+            username = self._username_from_daily_file(user_file, date_str)
             try:
-                # 解析文件名获取用户名
-                username = user_file.stem.replace(f"_{yesterday_str}", "")
-                summary_filename = f"{username}_{yesterday_str}_summary.json"
-                summary_filepath = summaries_dir / summary_filename
-                
-                # 检查总结文件是否已存在
-                if summary_filepath.exists() and not force_overwrite:
-                    print(f"  ⏭️  跳过 @{username}: 总结已存在")
-                    skipped_count += 1
-                    continue
-                # 读取用户推文数据
                 with open(user_file, 'r', encoding='utf-8') as f:
                     user_data = json.load(f)
-                
-                tweets = user_data.get('tweets', [])
-                user_info = user_data.get('user', {})
-                
-                if summary_filepath.exists() and force_overwrite:
-                    print(f"  🔄 强制覆盖 @{username} 总结 ({len(tweets)}条推文)...")
-                else:
-                    print(f"  🔄 生成 @{username} 总结 ({len(tweets)}条推文)...")
-                
-                if not tweets:
-                    print(f"  ⚠️  跳过 @{username}: 无推文数据")
+            except Exception as e:
+                print(f"  ❌ 读取 {user_file.name} 失败: {e}")
+                continue
+
+            tweets = user_data.get('tweets', [])
+            user_info = user_data.get('user', {})
+            if not tweets:
+                print(f"  ⚠️  跳过 @{username}: 无推文数据")
+                continue
+
+            md_filepath = summaries_dir / f"{username}_{date_str}_summary.md"
+            fingerprint = manifest.fingerprint(tweets, summarizer.get_user_template(username), model, summarizer.backend.name)
+            changed = manifest.changed_fields(username, date_str, fingerprint)
+
+            if not force_overwrite and md_filepath.exists():
+                if not changed:
+                    print(f"  ⏭️  跳过 @{username}: 输入未变化")
+                    skipped_count += 1
+                    continue
+                if changed == ['new']:
+                    # 清单建立之前生成的总结：记录当前指纹，之后按变化重算
+                    manifest.record(username, date_str, fingerprint, len(tweets), md_filepath.name)
+                    print(f"  ⏭️  跳过 @{username}: 总结已存在 (已记录输入指纹)")
+                    skipped_count += 1
                     continue
-                
-                # 生成个人总结
-                summary_result = summarizer.generate_summary(tweets, f"user_daily", user_info)
-                
-                # 直接保存大模型的回复为markdown文件
-                md_filename = f"{username}_{yesterday_str}_summary.md"
-                md_filepath = summaries_dir / md_filename
 
-                # 判断是覆盖还是创建
-                was_existing = md_filepath.exists()
+            reason = "强制覆盖" if force_overwrite else ("新用户" if changed == ['new'] else f"输入变化: {', '.join(changed)}")
+            print(f"  🔄 待生成 @{username} ({len(tweets)}条推文, {reason})")
+            pending.append({
+                "username": username,
+                "tweets": tweets,
+                "user_info": user_info,
+                "fingerprint": fingerprint,
+                "md_filepath": md_filepath
+            })
 
-                # 直接保存大模型的总结内容
-                with open(md_filepath, 'w', encoding='utf-8') as f:
-                    f.write(summary_result.get('summary', '暂无总结内容'))
-                
-                action = "覆盖" if (was_existing and force_overwrite) else "创建"
-                print(f"  ✅ {action}完成 @{username}: {md_filename}")
-                summarized_count += 1
-                
+        manifest.save()
+        print(f"📋 需要生成 {len(pending)} 个, 跳过 {skipped_count} 个")
+        return pending
+
+    def _write_user_summary(self, manifest, job: Dict[str, Any], date_str: str, summary_text: Optional[str]):
+        """写入总结文件并更新清单"""
+        md_filepath = job["md_filepath"]
+        was_existing = md_filepath.exists()
+        with open(md_filepath, 'w', encoding='utf-8') as f:
+            f.write(summary_text or '暂无总结内容')
+        manifest.record(job["username"], date_str, job["fingerprint"], len(job["tweets"]), md_filepath.name)
+        manifest.save()
+
+        action = "覆盖" if was_existing else "创建"
+        print(f"  ✅ {action}完成 @{job['username']}: {md_filepath.name}")
+
+    def _generate_user_summaries_batch(self, summarizer, manifest, pending: List[Dict[str, Any]], date_str: str) -> int:
+        """批量模式：收集所有用户的prompt，作为一个批任务提交后统一写回总结
+
+        超出单块预算的重度用户不进批任务，改为同步分层(map-reduce)总结；收到停止信号时剩余用户留待下次生成
+        """
+        from batch_summarizer import BatchSummaryRunner
+
+        jobs = {}
+        job_messages = {}
+        oversized = []
+        for job in pending:
+            selected = summarizer.select_prompt_tweets(job["tweets"])
+            messages = summarizer.generate_prompt_messages(selected, job["user_info"], preselected=True)
+            prompt = summarizer.messages_to_prompt(messages)
+            summarizer.save_prompt_to_file(prompt, "user_daily", job["tweets"], job["user_info"])
+            if summarizer.backend.supports_map_reduce and summarizer.map_reduce.needs_map_reduce(prompt):
+                oversized.append((job, selected))
+                continue
+            jobs[job["username"]] = prompt
+            job_messages[job["username"]] = messages
+
+        if oversized:
+            print(f"🧩 {len(oversized)} 个用户超出单次请求预算，不进批任务，改为分层总结")
+
+        results = {}
+        if jobs:
+            print(f"\n📦 批量模式: 提交 {len(jobs)} 个用户的总结请求...")
+            try:
+                if summarizer.backend.name == "openrouter":
+                    results = BatchSummaryRunner(summarizer, stop_event=self.stop_event).run(jobs, job_messages)
+                else:
+                    # 本地后端没有Batch API，直接在本进程内批量生成
+                    results = dict(zip(jobs, summarizer.backend.generate_batch(list(jobs.values()))))
             except Exception as e:
-                print(f"  ❌ 处理 {user_file.name} 失败: {e}")
-        
-        print(f"\n📊 用户总结完成:")
-        print(f"  ✅ 新生成: {summarized_count} 个")
-        print(f"  ⏭️  已跳过: {skipped_count} 个")
-        print(f"  📁 总结目录: {summaries_dir}")
-    
-    def generate_user_summaries_for_date(self, date_str: str, force_overwrite: bool = False):
-        """为指定日期的用户数据生成总结"""
-        from summarizer import TwitterSummarizer
-        
-        print(f"\n🤖 开始生成指定日期({date_str})的用户总结...")
-        
+                print(f"❌ 批任务失败，改为逐个生成: {e}")
+
+        fallback_count = 0
+        summarized_count = 0
+        for job in pending:
+            if job["username"] not in jobs:
+                continue
+            summary_text = results.get(job["username"])
+            if not summary_text:
+                if self._stop_requested():
+                    print("🛑 收到停止信号，剩余用户留待下次生成")
+                    return summarized_count
+                # 批任务中失败的请求降级为同步调用
+                print(f"  🔄 @{job['username']} 批处理无结果，改为同步生成...")
+                fallback_count += 1
+                try:
+                    summary_text = summarizer.call_llm_api(jobs[job["username"]], messages=job_messages[job["username"]])
+                except Exception as e:
+                    print(f"  ❌ @{job['username']} 处理失败: {e}")
+                    continue
+            self._write_user_summary(manifest, job, date_str, summary_text)
+            summarized_count += 1
+        print(f"  🔁 其中同步降级: {fallback_count} 个")
+
+        for job, selected in oversized:
+            if self._stop_requested():
+                print("🛑 收到停止信号，剩余用户留待下次生成")
+                break
+            try:
+                summary_text = summarizer.map_reduce.summarize(selected, job["user_info"])
+            except Exception as e:
+                print(f"  ❌ @{job['username']} 处理失败: {e}")
+                continue
+            self._write_user_summary(manifest, job, date_str, summary_text)
+            summarized_count += 1
+
+        return summarized_count
+
+    def generate_user_summaries_for_date(self, date_str: str, force_overwrite: bool = False, batch_mode: bool = False):
+        """为指定日期的用户数据生成总结（按总结清单只重算输入变化的用户）
+
+        Args:
+            date_str: 日期 (YYYYMMDD)
+            force_overwrite: 忽略清单，强制重新生成所有用户
+            batch_mode: 使用Batch API一次性提交所有用户的总结请求
+        """
+        from summary_manifest import SummaryManifest
+
+        print(f"\n🤖 开始生成 {date_str} 的用户总结...")
+
         users_dir = self.data_dir / "users_daily"
         summaries_dir = self.data_dir / "user_summaries"
-        summaries_dir.mkdir(exist_ok=True)
-        
-        # 查找指定日期的所有用户文件
-        date_files = list(users_dir.glob(f"*_{date_str}.json"))
-        
+        summaries_dir.mkdir(parents=True, exist_ok=True)
+
+        date_files = sorted(users_dir.glob(f"*_{date_str}.json"))
         if not date_files:
-            print(f"📭 未找到指定日期({date_str})的用户数据文件")
+            print(f"📭 未找到 {date_str} 的用户数据文件")
             print(f"🔍 检查目录: {users_dir}")
             return
-        
-        print(f"📁 找到 {len(date_files)} 个用户数据文件")
-        
-        # 创建总结器
-        summarizer = TwitterSummarizer()
-        
-        processed_count = 0
-        skipped_count = 0
-        
-        for user_file in date_files:
-            try:
-                # 提取用户名
-                user_name = user_file.stem.split('_')[0]  # filename: username_YYYYMMDD.json
-                
-                # 生成总结文件路径（改为markdown格式）
-                summary_filename = f"{user_name}_{date_str}_summary.md"
-                summary_path = summaries_dir / summary_filename
-                
-                # 检查是否已存在且不强制覆盖
-                if summary_path.exists() and not force_overwrite:
-                    print(f"  ⏭️  跳过 @{user_name} - 总结已存在")
-                    skipped_count += 1
-                    continue
-                
-                # 加载用户数据
-                with open(user_file, 'r', encoding='utf-8') as f:
-                    user_data = json.load(f)
-                
-                tweets = user_data.get('tweets', [])
-                user_info = user_data.get('user', {})
-                
-                if not tweets:
-                    print(f"  ⚠️   @{user_name} - 无推文数据")
-                    continue
-                
-                # 生成总结
-                print(f"  🔄 处理 @{user_name} ({len(tweets)} 条推文)")
-                summary_result = summarizer.generate_summary(tweets, 'user_daily', user_info)
-                
-                # 直接保存大模型的总结内容
-                with open(summary_path, 'w', encoding='utf-8') as f:
-                    f.write(summary_result.get('summary', '暂无总结内容'))
-                
-                print(f"  ✅ @{user_name} 总结完成")
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"  ❌ @{user_name} 处理失败: {e}")
-                continue
-        
-        print(f"\n📊 用户总结生成完成:")
-        print(f"  ✅ 已处理: {processed_count} 个")
-        print(f"  ⏭️  已跳过: {skipped_count} 个")
+
+        print(f"📂 发现 {len(date_files)} 个用户文件")
+
+        summarizer = self.summarizer
+        manifest = SummaryManifest(str(summaries_dir / "manifest.json"))
+        pending = self._collect_pending_summaries(summarizer, manifest, date_files, date_str, force_overwrite)
+
+        if not pending:
+            print(f"📭 没有需要生成的总结")
+            return
+
+        if batch_mode:
+            summarized_count = self._generate_user_summaries_batch(summarizer, manifest, pending, date_str)
+        else:
+            summarized_count = 0
+            for job in pending:
+                if self._stop_requested():
+                    print("🛑 收到停止信号，剩余用户留待下次生成")
+                    break
+                try:
+                    summary_result = summarizer.generate_summary(job["tweets"], "user_daily", job["user_info"])
+                    self._write_user_summary(manifest, job, date_str, summary_result.get('summary'))
+                    summarized_count += 1
+                except Exception as e:
+                    print(f"  ❌ @{job['username']} 处理失败: {e}")
+
+        print(f"\n📊 用户总结完成:")
+        print(f"  ✅ 新生成: {summarized_count} 个")
         print(f"  📁 总结目录: {summaries_dir}")
 
+        if summarizer.backend.name == "openrouter":
+            from model_router import get_model_router
+            get_model_router().print_health_report()
+
+    def generate_daily_digest(self, date_str: Optional[str] = None, force_overwrite: bool = False):
+        """基于某天（默认昨天）已生成的用户总结合成全局日报"""
+        from daily_digest import DailyDigestBuilder
+        return DailyDigestBuilder(data_dir=str(self.data_dir)).generate(date_str, force_overwrite=force_overwrite)
+
+
 def main():
     """主函数"""
     print("🤖 X HTTP爬虫启动")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+每日全局日报 - 基于当天已生成的用户总结合成
+不再把全天原始推文重新发给LLM，而是把各用户的 *_summary.md 汇总为一个
+reduce 式的prompt，一次小规模调用生成全局日报
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from map_reduce_summarizer import estimate_tokens, get_context_window
+
+DIGEST_PROMPT = """以下是 {date} 当天 {user_count} 位关注用户的个人推文总结（每位用户一段）。
+请基于这些总结撰写一份全局日报（Markdown）：
+1. 今日要闻：跨用户归纳最重要的事件和话题，注明相关用户
+2. 主题分组：按领域（如AI、科技、商业、时政）归类要点
+3. 值得关注：有分歧的观点、新出现的趋势或需要跟进的事项
+保留具体的名称、数字和链接，不要逐个复述用户总结。
+
+{summaries}"""
+
+
+class DailyDigestBuilder:
+    def __init__(self, summarizer=None, data_dir: Optional[str] = None, context_ratio: float = 0.5):
+        """
+        初始化全局日报生成器
+
+        Args:
+            summarizer: TwitterSummarizer 实例，None时按需创建
+            data_dir: 数据目录，默认 DATA_DIR
+            context_ratio: 用户总结最多占用模型上下文窗口的比例，超出时按比例截断每段总结
+        """
+        self.data_dir = Path(data_dir or os.getenv('DATA_DIR', 'crawler_data'))
+        self.summaries_dir = self.data_dir / "user_summaries"
+        self.reports_dir = self.data_dir / "daily_reports"
+        self.context_ratio = context_ratio
+        self._summarizer = summarizer
+
+    @property
+    def summarizer(self):
+        if self._summarizer is None:
+            from summarizer import TwitterSummarizer
+            self._summarizer = TwitterSummarizer()
+        return self._summarizer
+
+    def report_path(self, date_str: str) -> Path:
+        return self.reports_dir / f"{date_str}_digest.md"
+
+    def collect_user_summaries(self, date_str: str) -> Dict[str, Path]:
+        """收集某天的用户总结文件: 用户名 -> 文件路径"""
+        suffix = f"_{date_str}_summary"
+        return {
+            summary_file.stem[:-len(suffix)]: summary_file
+            for summary_file in sorted(self.summaries_dir.glob(f"*{suffix}.md"))
+        }
+
+    def is_up_to_date(self, date_str: str, summary_files: Dict[str, Path]) -> bool:
+        """日报比所有用户总结都新时无需重新生成"""
+        report_file = self.report_path(date_str)
+        if not report_file.exists():
+            return False
+        newest_summary = max(f.stat().st_mtime for f in summary_files.values())
+        return report_file.stat().st_mtime >= newest_summary
+
+    def build_prompt(self, date_str: str, summaries: Dict[str, str]) -> str:
+        """把用户总结拼成reduce prompt，超出预算时按比例截断每段"""
+        # 与分层总结相同的上下文窗口（本地模型按加载时的上下文长度）
+        budget = int(get_context_window(self.summarizer) * self.context_ratio)
+        total_tokens = sum(estimate_tokens(text) for text in summaries.values())
+        keep_ratio = min(1.0, budget / total_tokens) if total_tokens else 1.0
+        if keep_ratio < 1.0:
+            print(f"✂️ 用户总结共约 {total_tokens} tokens，超出预算 {budget}，每段保留 {keep_ratio:.0%}")
+
+        sections = []
+        for username, text in summaries.items():
+            text = text.strip()
+            if keep_ratio < 1.0:
+                text = text[:int(len(text) * keep_ratio)] + "\n..."
+            sections.append(f"### @{username}\n{text}")
+
+        formatted_date = datetime.strptime(date_str, '%Y%m%d').strftime('%Y-%m-%d')
+        return DIGEST_PROMPT.format(date=formatted_date, user_count=len(summaries), summaries="\n\n".join(sections))
+
+    def generate(self, date_str: Optional[str] = None, force_overwrite: bool = False) -> Optional[Path]:
+        """生成某天（默认昨天）的全局日报，返回日报文件路径"""
+        date_str = date_str or (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+        print(f"\n📰 开始生成 {date_str} 的全局日报...")
+
+        summary_files = self.collect_user_summaries(date_str)
+        if not summary_files:
+            print(f"📭 未找到 {date_str} 的用户总结，请先运行 --user-summaries")
+            return None
+
+        report_file = self.report_path(date_str)
+        if not force_overwrite and self.is_up_to_date(date_str, summary_files):
+            print(f"⏭️  跳过: 日报已是最新 ({report_file})")
+            return report_file
+
+        summaries = {}
+        for username, summary_file in summary_files.items():
+            summaries[username] = summary_file.read_text(encoding='utf-8')
+        print(f"📂 汇总 {len(summaries)} 位用户的总结")
+
+        prompt = self.build_prompt(date_str, summaries)
+        self.summarizer.prompt_archive.store(
+            prompt,
+            user="all_users",
+            summary_type="daily_digest",
+            model=self.summarizer.custom_model or self.summarizer.llm_config["default_model"],
+            date=date_str
+        )
+        try:
+            digest = self.summarizer.call_llm_api(prompt)
+        except RuntimeError as e:
+            print(f"❌ 全局日报生成失败: {e}")
+            return None
+
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(digest or '暂无日报内容')
+
+        print(f"✅ 全局日报已生成: {report_file}")
+        return report_file
+
+
+def main():
+    """全局日报命令行工具"""
+    parser = argparse.ArgumentParser(description='基于用户总结生成全局日报')
+    parser.add_argument('--date', help='日期 (YYYYMMDD)，默认昨天')
+    parser.add_argument('--force', action='store_true', help='强制重新生成')
+    args = parser.parse_args()
+
+    DailyDigestBuilder().generate(args.date, force_overwrite=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+推文去重 - 在构建prompt前折叠重复内容
+同一个故事常以多种形式出现：同一原帖的多次转推、只转发不评论的引用链、复制粘贴的文本。
+聚类规则：
+1. 转推按原帖id归并（原帖本身也在列表中时一并归并）
+2. 评论很短的引用推文按被引用原帖id归并
+3. 正文按SimHash(64位，字符3-gram)做近重复检测，汉明距离不超过阈值即归并
+每个簇只保留一个代表推文，并用 duplicate_count 记录簇大小
+"""
+
+import hashlib
+import re
+from typing import Dict, List
+
+import numpy as np
+
+URL_PATTERN = re.compile(r'https?://\S+')
+RT_PREFIX_PATTERN = re.compile(r'^rt @\w+:\s*')
+MENTION_PATTERN = re.compile(r'@\w+')
+NON_WORD_PATTERN = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：小写，去掉RT前缀、链接、@提及和标点空白"""
+    text = (text or '').lower()
+    text = RT_PREFIX_PATTERN.sub('', text)
+    text = URL_PATTERN.sub('', text)
+    text = MENTION_PATTERN.sub('', text)
+    return NON_WORD_PATTERN.sub('', text)
+
+
+def simhash(text: str) -> int:
+    """基于字符3-gram的64位SimHash（中英文通用，无需分词）"""
+    shingles = {text[i:i + 3] for i in range(max(1, len(text) - 2))}
+    digests = b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles)
+    # 每个shingle的哈希展开为64个比特，按位投票（大端：第0列为最高位）
+    bit_matrix = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+    votes = bit_matrix.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), 'big')
+
+
+class TweetDeduplicator:
+    def __init__(self, max_distance: int = 3, min_text_length: int = 20, quote_comment_length: int = 20):
+        """
+        初始化去重器
+
+        Args:
+            max_distance: SimHash判定为近重复的最大汉明距离
+            min_text_length: 参与近重复检测的最短归一化文本长度（过短的文本容易误判）
+            quote_comment_length: 引用推文的评论短于该长度时视为纯转发
+        """
+        self.max_distance = max_distance
+        self.min_text_length = min_text_length
+        self.quote_comment_length = quote_comment_length
+        # 64位分成 max_distance+1 段：汉明距离不超过阈值的两个指纹至少有一段完全相同
+        self.band_count = max_distance + 1
+        self.band_bits = 64 // self.band_count
+
+    @staticmethod
+    def content_text(tweet: Dict) -> str:
+        """推文的实际内容：转推取原文，否则取正文"""
+        if tweet.get('retweet'):
+            return tweet['retweet'].get('text', '')
+        return tweet.get('text', '') or tweet.get('full_text', '')
+
+    def canonical_ids(self, tweet: Dict) -> List[str]:
+        """推文对应的原帖id（自身、转推原帖、纯转发引用的原帖）"""
+        ids = [tweet.get('id')]
+        if tweet.get('retweet'):
+            ids.append(tweet['retweet'].get('id'))
+        elif tweet.get('quoted') and len(normalize_text(tweet.get('text', ''))) < self.quote_comment_length:
+            ids.append(tweet['quoted'].get('id'))
+        return [i for i in ids if i]
+
+    def _bands(self, fingerprint: int) -> List[tuple]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.band_count)]
+
+    def cluster(self, tweets: List[Dict]) -> List[List[int]]:
+        """返回按首次出现顺序排列的簇（每个簇是推文下标列表）"""
+        parent = list(range(len(tweets)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a: int, b: int):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        # 1-2. 按原帖id归并
+        owner_by_id: Dict[str, int] = {}
+        for i, tweet in enumerate(tweets):
+            for canonical_id in self.canonical_ids(tweet):
+                if canonical_id in owner_by_id:
+                    union(i, owner_by_id[canonical_id])
+                else:
+                    owner_by_id[canonical_id] = i
+
+        # 3. SimHash近重复：用分段桶找候选对，避免两两比较
+        fingerprints: Dict[int, int] = {}
+        buckets: Dict[tuple, List[int]] = {}
+        for i, tweet in enumerate(tweets):
+            text = normalize_text(self.content_text(tweet))
+            if len(text) < self.min_text_length:
+                continue
+            fingerprint = simhash(text)
+            fingerprints[i] = fingerprint
+            for band in self._bands(fingerprint):
+                for j in buckets.get(band, []):
+                    if bin(fingerprint ^ fingerprints[j]).count('1') <= self.max_distance:
+                        union(i, j)
+                buckets.setdefault(band, []).append(i)
+
+        clusters: Dict[int, List[int]] = {}
+        for i in range(len(tweets)):
+            clusters.setdefault(find(i), []).append(i)
+        return sorted(clusters.values(), key=lambda members: members[0])
+
+    @staticmethod
+    def _engagement(tweet: Dict) -> int:
+        stats = tweet.get('stats') or {}
+        return sum(stats.get(field, 0) or 0 for field in ('favorite_count', 'retweet_count', 'reply_count', 'quote_count'))
+
+    def pick_representative(self, members: List[Dict]) -> Dict:
+        """簇代表：优先原创推文（非转推），其次互动最高的"""
+        originals = [t for t in members if not t.get('retweet')]
+        candidates = originals or members
+        return max(candidates, key=self._engagement)
+
+    def collapse(self, tweets: List[Dict]) -> List[Dict]:
+        """折叠重复推文，返回代表推文列表（保持原有顺序）"""
+        if len(tweets) < 2:
+            return tweets
+
+        collapsed = []
+        for members in self.cluster(tweets):
+            member_tweets = [tweets[i] for i in members]
+            representative = self.pick_representative(member_tweets)
+            if len(members) > 1:
+                representative = dict(representative)
+                representative['duplicate_count'] = len(members)
+            collapsed.append(representative)
+
+        removed = len(tweets) - len(collapsed)
+        if removed:
+            print(f"🧹 折叠重复推文: {len(tweets)} -> {len(collapsed)} 条 (合并 {removed} 条)")
+        return collapsed
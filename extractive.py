@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+抽取式总结 - 不调用LLM，直接从推文中挑选最有代表性的句子
+- 词项沿用倒排索引的切分规则（英文单词 + 中文bigram）
+- TF-IDF 矩阵用NumPy构建，句子按TextRank（相似度图上的PageRank）打分
+- 句子数、词项数和每个句子的相似邻居数都有上限，内存不随推文量平方增长
+可作为离线总结后端；ExtractivePreSummarizer 则在构建prompt前按token预算筛选推文
+"""
+
+import json
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from map_reduce_summarizer import estimate_tokens
+from tweet_index import tokenize, tweet_search_text
+
+SENTENCE_PATTERN = re.compile(r'[^。！？!?\n]+[。！？!?]?')
+URL_PATTERN = re.compile(r'https?://\S+')
+
+
+def split_sentences(text: str, min_length: int = 8) -> List[str]:
+    """按中英文句末标点和换行切句，丢弃过短的片段"""
+    text = URL_PATTERN.sub('', text or '')
+    return [s.strip() for s in SENTENCE_PATTERN.findall(text) if len(s.strip()) >= min_length]
+
+
+# 参与打分的句子数上限：超出时每条推文优先保留靠前的句子，其余句子得分为0
+MAX_RANKED_SENTENCES = 2000
+# TF-IDF 词项数上限：只保留在至少两个句子中出现、文档频率最高的词项
+MAX_FEATURES = 4096
+# 相似度图中每个句子只保留最相似的k个邻居（稀疏存储）
+TOP_K_SIMILAR = 20
+
+
+def tfidf_matrix(docs: List[str], max_features: int = MAX_FEATURES) -> np.ndarray:
+    """构建行归一化的TF-IDF矩阵（文档 x 词项）
+
+    只出现在一个句子中的词项不影响句子间的相似度，不占用列
+    """
+    token_sets = [tokenize(doc) for doc in docs]
+    document_frequency = Counter(token for tokens in token_sets for token in tokens)
+    shared = sorted((token for token, df in document_frequency.items() if df > 1),
+                    key=lambda token: -document_frequency[token])[:max_features]
+    vocabulary = {token: column for column, token in enumerate(shared)}
+
+    matrix = np.zeros((len(docs), max(1, len(vocabulary))), dtype=np.float32)
+    for row, tokens in enumerate(token_sets):
+        columns = [vocabulary[t] for t in tokens if t in vocabulary]
+        if columns:
+            matrix[row, columns] = 1.0
+
+    idf = np.array([document_frequency[token] for token in shared] or [len(docs)], dtype=np.float32)
+    matrix *= np.log((1 + len(docs)) / (1 + idf)) + 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def top_k_similarity(matrix: np.ndarray, k: int = TOP_K_SIMILAR, block_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """分块计算余弦相似度，每行只保留最相似的k个邻居
+
+    Returns:
+        (邻居下标 n x k, 相似度 n x k)，不足k个正相似度的位置权重为0
+    """
+    n = len(matrix)
+    k = min(k, n - 1)
+    neighbors = np.zeros((n, max(k, 0)), dtype=np.int64)
+    weights = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return neighbors, weights
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        block = matrix[start:end] @ matrix.T
+        block[np.arange(end - start), np.arange(start, end)] = 0.0
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        neighbors[start:end] = top
+        weights[start:end] = np.maximum(np.take_along_axis(block, top, axis=1), 0.0)
+    return neighbors, weights
+
+
+def textrank_scores(matrix: np.ndarray, damping: float = 0.85, iterations: int = 30, tol: float = 1e-6,
+                    top_k: int = TOP_K_SIMILAR) -> np.ndarray:
+    """TextRank：在稀疏的k近邻相似度图上做幂迭代"""
+    n = len(matrix)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    neighbors, weights = top_k_similarity(matrix, top_k)
+    row_sums = weights.sum(axis=1)
+    # 孤立节点均匀跳转，保证转移矩阵每行和为1
+    transition = weights / np.where(row_sums == 0, 1.0, row_sums)[:, None]
+    isolated = row_sums == 0
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        spread = np.bincount(neighbors.ravel(), weights=(transition * scores[:, None]).ravel(), minlength=n)
+        updated = ((1 - damping) / n + damping * (spread + scores[isolated].sum() / n)).astype(np.float32)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def sentence_scores(sentences: List[str], owners: Optional[List[int]] = None,
+                    max_sentences: int = MAX_RANKED_SENTENCES) -> np.ndarray:
+    """句子的TextRank得分；句子过多时只对前 max_sentences 个候选打分，其余为0
+
+    Args:
+        owners: 每个句子所属推文的下标，提供时按各推文内的句子顺序轮流选取候选，保证覆盖每条推文
+    """
+    scores = np.zeros(len(sentences), dtype=np.float32)
+    if not sentences:
+        return scores
+
+    candidates = list(range(len(sentences)))
+    if len(sentences) > max_sentences:
+        if owners is not None:
+            positions, seen = [], Counter()
+            for owner in owners:
+                positions.append(seen[owner])
+                seen[owner] += 1
+            candidates.sort(key=lambda i: positions[i])
+        candidates = sorted(candidates[:max_sentences])
+        print(f"✂️ 句子过多，只对 {max_sentences}/{len(sentences)} 个句子打分")
+
+    scores[candidates] = textrank_scores(tfidf_matrix([sentences[i] for i in candidates]))
+    return scores
+
+
+class ExtractiveSummarizer:
+    def __init__(self, max_sentences: int = 12):
+        """
+        初始化抽取式总结器
+
+        Args:
+            max_sentences: 总结中保留的句子数
+        """
+        self.max_sentences = max_sentences
+
+    def tweet_sentences(self, tweets: List[Dict]) -> List[Tuple[str, Dict]]:
+        """把推文切成 (句子, 所属推文) 列表，句子去重"""
+        seen = set()
+        sentences = []
+        for tweet in tweets:
+            for sentence in split_sentences(tweet_search_text(tweet)):
+                if sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append((sentence, tweet))
+        return sentences
+
+    def rank_sentences(self, sentences: List[str], owners: Optional[List[int]] = None) -> List[int]:
+        """返回得分最高的句子下标（按原文顺序）"""
+        if not sentences:
+            return []
+        scores = sentence_scores(sentences, owners)
+        k = min(self.max_sentences, len(sentences))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(top.tolist())
+
+    def summarize_tweets(self, tweets: List[Dict], user_info: Dict = None) -> str:
+        """对推文生成Markdown格式的抽取式总结"""
+        user_name = user_info.get('screen_name', 'unknown') if user_info else 'unknown'
+        sentences = self.tweet_sentences(tweets)
+        owner_ids = {id(tweet): index for index, tweet in enumerate(tweets)}
+        selected = self.rank_sentences([sentence for sentence, _ in sentences],
+                                       [owner_ids[id(tweet)] for _, tweet in sentences])
+
+        original_count = len([t for t in tweets if not t.get('retweet')])
+        lines = [
+            f"# @{user_name} 推文摘要（抽取式）",
+            "",
+            f"- 生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            f"- 推文总数：{len(tweets)}（原创 {original_count}，转推 {len(tweets) - original_count}）",
+            "",
+            "## 📝 要点",
+        ]
+        for i in selected:
+            sentence, tweet = sentences[i]
+            tweet_id = tweet.get('id')
+            link = f" ([原文](https://x.com/i/status/{tweet_id}))" if tweet_id else ""
+            lines.append(f"- {sentence}{link}")
+        if not selected:
+            lines.append("- 暂无可提取的内容")
+
+        lines += ["", "---", "*本总结由抽取式算法离线生成，未经过LLM改写*"]
+        return "\n".join(lines)
+
+    def summarize_text(self, text: str, title: str = "摘要") -> str:
+        """对任意文本做抽取式总结"""
+        sentences = split_sentences(text)
+        selected = self.rank_sentences(sentences)
+        body = "\n".join(f"- {sentences[i]}" for i in selected) or "- 暂无可提取的内容"
+        return f"# {title}（抽取式）\n\n{body}\n\n---\n*本总结由抽取式算法离线生成，未经过LLM改写*"
+
+
+class ExtractivePreSummarizer:
+    def __init__(self, token_budget: int = 48000, long_text_chars: int = 600):
+        """
+        初始化抽取式预筛选（在生成prompt前压缩重度用户的推文）
+
+        Args:
+            token_budget: 推文JSON的默认token预算，未超出时原样返回
+            long_text_chars: 超过该长度的推文正文只保留得分最高的句子
+        """
+        self.token_budget = token_budget
+        self.long_text_chars = long_text_chars
+
+    @staticmethod
+    def tweet_cost(tweet: Dict) -> int:
+        """推文写入prompt后的token估算（prompt中不含user字段）"""
+        return estimate_tokens(json.dumps({k: v for k, v in tweet.items() if k != 'user'}, ensure_ascii=False, indent=2))
+
+    def trim_text(self, tweet: Dict, sentence_ids: List[int], sentences: List[str], scores: np.ndarray) -> Dict:
+        """长推文只保留高分句子（按原文顺序）"""
+        text = tweet.get('text', '')
+        if len(text) <= self.long_text_chars or len(sentence_ids) < 2:
+            return tweet
+
+        kept, length = [], 0
+        for i in sorted(sentence_ids, key=lambda i: -scores[i]):
+            if length + len(sentences[i]) > self.long_text_chars and kept:
+                break
+            kept.append(i)
+            length += len(sentences[i])
+
+        trimmed = dict(tweet)
+        trimmed['text'] = " … ".join(sentences[i] for i in sorted(kept))
+        trimmed['text_trimmed'] = True
+        return trimmed
+
+    def select(self, tweets: List[Dict], token_budget: Optional[int] = None) -> List[Dict]:
+        """在token预算内保留信息量最高的推文（保持原有顺序）
+
+        Args:
+            token_budget: 本次使用的预算，None时使用初始化时的预算
+        """
+        token_budget = self.token_budget if token_budget is None else token_budget
+        if not token_budget or not tweets:
+            return tweets
+
+        costs = [self.tweet_cost(tweet) for tweet in tweets]
+        total_cost = sum(costs)
+        if total_cost <= token_budget:
+            return tweets
+
+        # 句子级TextRank，推文得分为其句子得分之和按句数开方归一（长推文不至于天然占优）
+        sentences, owners = [], []
+        own_sentence_ids: Dict[int, List[int]] = {}  # 推文下标 -> 正文句子（不含转推/引用原文）
+        for index, tweet in enumerate(tweets):
+            own_text = tweet.get('text', '')
+            for sentence in split_sentences(own_text, min_length=4):
+                own_sentence_ids.setdefault(index, []).append(len(sentences))
+                sentences.append(sentence)
+                owners.append(index)
+            nested_text = tweet_search_text(tweet)[len(own_text):]
+            for sentence in split_sentences(nested_text, min_length=4):
+                sentences.append(sentence)
+                owners.append(index)
+        scores = sentence_scores(sentences, owners)
+        owners_array = np.array(owners, dtype=np.int64)
+        tweet_scores = np.zeros(len(tweets), dtype=np.float64)
+        sentence_counts = np.bincount(owners_array, minlength=len(tweets))
+        np.add.at(tweet_scores, owners_array, scores)
+        tweet_scores /= np.sqrt(np.maximum(sentence_counts, 1))
+
+        selected: Dict[int, Dict] = {}
+        used = 0
+        for index in np.argsort(-tweet_scores, kind='stable'):
+            tweet = self.trim_text(tweets[index], own_sentence_ids.get(index, []), sentences, scores)
+            cost = self.tweet_cost(tweet) if tweet is not tweets[index] else costs[index]
+            if used + cost > token_budget:
+                continue
+            selected[int(index)] = tweet
+            used += cost
+
+        print(f"✂️ 抽取式预筛选: {len(tweets)} -> {len(selected)} 条推文, 约 {total_cost} -> {used} tokens")
+        return [selected[i] for i in sorted(selected)]
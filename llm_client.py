@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+LLM客户端管理 - 进程级共享的OpenAI兼容客户端
+复用同一个HTTP连接池（keep-alive），批量生成总结时只需建立一次连接
+"""
+
+import os
+import atexit
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+# 默认通过OpenRouter访问，可用 LLM_BASE_URL 指向其他OpenAI兼容服务
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+# 连接池配置
+POOL_CONFIG = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 300,  # 空闲连接保持5分钟
+    "connect_timeout": 10,
+    "read_timeout": 300
+}
+
+# 需要显式标记缓存断点的模型供应商（OpenAI/DeepSeek等会自动缓存公共前缀）
+CACHE_CONTROL_PROVIDERS = ("anthropic/", "google/")
+
+# (base_url, api_key) -> OpenAI 客户端
+_clients: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+# 事件循环 -> {(base_url, api_key): AsyncOpenAI 客户端}（异步连接池绑定在创建它的事件循环上）
+# 以循环对象本身为弱引用键：新循环不会拿到旧循环的客户端，已关闭的循环在下次获取时清理
+_async_clients: 'weakref.WeakKeyDictionary[Any, Dict[Tuple[str, str], Any]]' = weakref.WeakKeyDictionary()
+
+
+def get_base_url() -> str:
+    """获取LLM服务地址：环境变量 > 默认OpenRouter"""
+    return os.getenv('LLM_BASE_URL') or DEFAULT_BASE_URL
+
+
+def get_llm_client(api_key: str, base_url: Optional[str] = None):
+    """获取共享的OpenAI客户端（首次调用时才导入openai并创建连接池）
+
+    Raises:
+        ImportError: 未安装openai库
+    """
+    base_url = base_url or get_base_url()
+    key = (base_url, api_key)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # 延迟导入，避免不需要LLM的命令承担导入开销
+            from openai import OpenAI
+            import httpx
+
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=POOL_CONFIG["max_connections"],
+                    max_keepalive_connections=POOL_CONFIG["max_keepalive_connections"],
+                    keepalive_expiry=POOL_CONFIG["keepalive_expiry"]
+                ),
+                timeout=httpx.Timeout(POOL_CONFIG["read_timeout"], connect=POOL_CONFIG["connect_timeout"])
+            )
+            client = OpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+            _clients[key] = client
+            print(f"🔌 已创建LLM连接池: {base_url}")
+
+    return client
+
+
+def get_async_llm_client(api_key: str, base_url: Optional[str] = None):
+    """获取当前事件循环共享的AsyncOpenAI客户端
+
+    Raises:
+        ImportError: 未安装openai库
+        RuntimeError: 不在事件循环中调用
+    """
+    import asyncio
+
+    base_url = base_url or get_base_url()
+    loop = asyncio.get_running_loop()
+    key = (base_url, api_key)
+
+    with _lock:
+        # 客户端的连接引用着所属循环，弱引用键不会自动失效，已关闭循环的客户端在这里丢弃
+        for stale_loop in [stale for stale in _async_clients if stale.is_closed()]:
+            del _async_clients[stale_loop]
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            from openai import AsyncOpenAI
+            import httpx
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=POOL_CONFIG["max_connections"],
+                    max_keepalive_connections=POOL_CONFIG["max_keepalive_connections"],
+                    keepalive_expiry=POOL_CONFIG["keepalive_expiry"]
+                ),
+                timeout=httpx.Timeout(POOL_CONFIG["read_timeout"], connect=POOL_CONFIG["connect_timeout"])
+            )
+            client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+            loop_clients[key] = client
+            print(f"🔌 已创建异步LLM连接池: {base_url}")
+
+    return client
+
+
+async def aclose_llm_clients():
+    """关闭当前事件循环的异步客户端（事件循环结束前调用，如 asyncio.run 的主协程末尾）"""
+    import asyncio
+
+    with _lock:
+        loop_clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in loop_clients.values():
+        try:
+            await client.close()
+        except Exception:
+            pass
+
+
+def apply_prompt_cache(messages: List[Dict[str, Any]], model: str) -> List[Dict[str, Any]]:
+    """为固定的system消息加上缓存断点（仅对需要显式标记的供应商）"""
+    if not model.startswith(CACHE_CONTROL_PROVIDERS):
+        return messages
+    cached = []
+    for message in messages:
+        if message.get("role") == "system" and isinstance(message.get("content"), str):
+            message = {
+                "role": "system",
+                "content": [{"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}]
+            }
+        cached.append(message)
+    return cached
+
+
+def extract_usage(completion) -> Dict[str, int]:
+    """提取token用量，包括命中服务端缓存的prompt token数"""
+    usage = getattr(completion, 'usage', None)
+    if usage is None:
+        return {}
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        "prompt_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+        "cached_tokens": (getattr(details, 'cached_tokens', 0) or 0) if details else 0,
+        "completion_tokens": getattr(usage, 'completion_tokens', 0) or 0
+    }
+
+
+def close_llm_clients():
+    """关闭所有共享客户端，释放连接"""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
+
+
+atexit.register(close_llm_clients)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+分层(map-reduce)总结 - 处理推文量很大的用户日数据
+1. map: 按时间顺序把推文切分成若干块，并行总结每一块
+2. reduce: 把分块摘要填入用户模板，生成最终总结；摘要过多时逐层合并
+分块大小根据模型上下文窗口自动调整
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 各模型上下文窗口(token)，未列出的模型使用默认值
+MODEL_CONTEXT_WINDOWS = {
+    "openai/gpt-4o": 128000,
+    "openai/gpt-4o-mini": 128000,
+    "anthropic/claude-3-haiku": 200000,
+    "meta-llama/llama-3.1-8b-instruct": 131072
+}
+DEFAULT_CONTEXT_WINDOW = 32000
+
+MAP_PROMPT = """以下是 @{user_name} 在 {time_range} 发布的第 {index}/{total} 批推文（共{count}条）。
+请提炼这批推文中的关键事件、观点和值得关注的细节，保留具体的名称、数字和链接，用要点列表输出，不超过15行。
+
+推文数据：
+```json
+{tweet_content}
+```"""
+
+MERGE_PROMPT = """以下是 @{user_name} 同一天推文的多段摘要，请合并为一份要点列表，去掉重复内容，保留具体细节，不超过20行。
+
+{notes}"""
+
+
+def get_context_window(summarizer, model: Optional[str] = None) -> int:
+    """总结器当前模型的上下文窗口(token)：本地模型以加载时的上下文长度为准，在线模型按模型名查表"""
+    model = model or summarizer.custom_model or summarizer.llm_config["default_model"]
+    return summarizer.backend.context_window or MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符约1 token/字，其余约4字符/token"""
+    cjk_chars = sum(1 for ch in text if ch >= '⺀')
+    return cjk_chars + (len(text) - cjk_chars) // 4 + 1
+
+
+def parse_created_at(tweet: Dict) -> Optional[datetime]:
+    """解析X的时间格式: "Wed Oct 05 22:34:12 +0000 2011"，失败时返回None"""
+    try:
+        return datetime.strptime(tweet.get('created_at', ''), '%a %b %d %H:%M:%S %z %Y')
+    except (TypeError, ValueError):
+        return None
+
+
+def tweet_timestamp(tweet: Dict) -> float:
+    """推文时间戳，用于排序（无法解析的排在最前）"""
+    created_at = parse_created_at(tweet)
+    return created_at.timestamp() if created_at else 0.0
+
+
+class MapReduceSummarizer:
+    def __init__(self, summarizer, max_workers: int = 4, context_ratio: float = 0.4, max_chunk_tokens: int = 12000):
+        """
+        初始化分层总结器
+
+        Args:
+            summarizer: TwitterSummarizer 实例，复用其模板和LLM调用
+            max_workers: map阶段的并行数
+            context_ratio: 每块输入最多占用模型上下文窗口的比例
+            max_chunk_tokens: 每块输入的token上限（块越小并行越充分、越快）
+        """
+        self.summarizer = summarizer
+        self.max_workers = max_workers
+        self.context_ratio = context_ratio
+        self.max_chunk_tokens = max_chunk_tokens
+
+    def get_chunk_budget(self, model: Optional[str] = None) -> int:
+        """根据模型上下文窗口计算每块的token预算"""
+        return min(int(get_context_window(self.summarizer, model) * self.context_ratio), self.max_chunk_tokens)
+
+    def get_input_budget(self, model: Optional[str] = None) -> int:
+        """一轮并行map能处理的输入token数（单块预算 × 并行数），作为抽取式预筛选的默认预算"""
+        return self.get_chunk_budget(model) * self.max_workers
+
+    def needs_map_reduce(self, prompt: str, model: Optional[str] = None) -> bool:
+        """prompt超出单块预算时使用分层总结"""
+        return estimate_tokens(prompt) > self.get_chunk_budget(model)
+
+    def chunk_tweets(self, tweets: List[Dict], budget: int) -> List[List[Dict]]:
+        """按时间顺序贪心分块，每块的推文JSON不超过预算"""
+        chunks: List[List[Dict]] = []
+        current: List[Dict] = []
+        current_tokens = 0
+
+        for tweet in sorted(tweets, key=tweet_timestamp):
+            tweet_tokens = estimate_tokens(json.dumps(tweet, ensure_ascii=False, indent=2))
+            if current and current_tokens + tweet_tokens > budget:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(tweet)
+            current_tokens += tweet_tokens
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _time_range(self, chunk: List[Dict]) -> str:
+        start, end = parse_created_at(chunk[0]), parse_created_at(chunk[-1])
+        if start and end:
+            return f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')} (UTC)"
+        return "未知时间段"
+
+    def _map_chunk(self, user_name: str, index: int, total: int, chunk: List[Dict]) -> Optional[str]:
+        """总结一块推文，失败时返回None（失败的块不进入reduce）"""
+        prompt = MAP_PROMPT.format(
+            user_name=user_name,
+            time_range=self._time_range(chunk),
+            index=index,
+            total=total,
+            count=len(chunk),
+            tweet_content=json.dumps(chunk, ensure_ascii=False, indent=2)
+        )
+        try:
+            return self.summarizer.call_llm_api(prompt) or None
+        except Exception as e:
+            print(f"❌ 第 {index}/{total} 块 ({self._time_range(chunk)}) 总结失败: {e}")
+            return None
+
+    def _merge_notes(self, user_name: str, notes: List[str], budget: int) -> List[str]:
+        """摘要总量超出预算时，分组合并直到能放进一次reduce调用"""
+        while len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > budget:
+            groups: List[List[str]] = [[]]
+            group_tokens = 0
+            for note in notes:
+                note_tokens = estimate_tokens(note)
+                if groups[-1] and group_tokens + note_tokens > budget:
+                    groups.append([])
+                    group_tokens = 0
+                groups[-1].append(note)
+                group_tokens += note_tokens
+
+            if len(groups) == len(notes):
+                break  # 每条摘要都单独超预算，无法继续合并
+
+            print(f"🔁 合并 {len(notes)} 段摘要为 {len(groups)} 组...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                notes = list(executor.map(
+                    lambda group: self.summarizer.call_llm_api(
+                        MERGE_PROMPT.format(user_name=user_name, notes="\n\n".join(group))
+                    ),
+                    groups
+                ))
+        return notes
+
+    def summarize(self, tweets: List[Dict], user_info: Dict = None, model: Optional[str] = None) -> str:
+        """分层生成总结，返回最终总结文本
+
+        Args:
+            tweets: 已经过 TwitterSummarizer.select_prompt_tweets 折叠和预筛选的推文
+
+        Raises:
+            RuntimeError: 所有分块都总结失败
+        """
+        user_name = user_info.get('screen_name', '') if user_info else 'unknown'
+        budget = self.get_chunk_budget(model)
+
+        cleaned_tweets = self.summarizer.clean_tweets_for_prompt(tweets)
+        chunks = self.chunk_tweets(cleaned_tweets, budget)
+        print(f"🧩 分层总结 @{user_name}: {len(tweets)} 条推文 -> {len(chunks)} 块 (每块≤{budget} tokens)")
+
+        # map: 并行总结每一块
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._map_chunk, user_name, i, len(chunks), chunk)
+                for i, chunk in enumerate(chunks, 1)
+            ]
+            results = [future.result() for future in futures]
+
+        notes = [note for note in results if note]
+        failed_ranges = [self._time_range(chunk) for chunk, note in zip(chunks, results) if not note]
+        if not notes:
+            raise RuntimeError(f"分层总结失败: {len(chunks)} 块全部失败")
+        if failed_ranges:
+            print(f"⚠️ {len(failed_ranges)}/{len(chunks)} 块总结失败，最终总结不包含这些时间段")
+
+        notes = self._merge_notes(user_name, notes, budget)
+
+        # reduce: 用用户模板生成最终总结，保持输出格式一致
+        notes_content = "\n\n".join(
+            f"### 第{i}段摘要\n{note}" for i, note in enumerate(notes, 1)
+        )
+        tweet_content = f"（推文较多，以下为按时间分段提炼的摘要，共{len(tweets)}条推文）\n\n{notes_content}"
+        if failed_ranges:
+            tweet_content += f"\n\n（以下时间段的推文未能提炼，总结中不包含: {', '.join(failed_ranges)}）"
+        reduce_prompt = self.summarizer.render_user_prompt(
+            user_name, self.summarizer.build_user_info_str(user_info), tweet_content,
+            date=self.summarizer.prompt_date(tweets),
+            tweet_count=len(tweets)
+        )
+        return self.summarizer.call_llm_api(reduce_prompt, model)
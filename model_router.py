@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+模型路由器 - 记录每个模型的健康状况，智能安排备选模型顺序
+基于熔断器(circuit breaker)语义：连续失败的模型会被暂时跳过，冷却后再试探
+健康状态保存到 crawler_data/model_health.json，跨运行保持
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# 熔断器状态
+CLOSED = "closed"        # 正常
+OPEN = "open"            # 熔断，跳过该模型
+HALF_OPEN = "half_open"  # 冷却结束，允许一次试探调用
+
+# 这些错误说明模型本身不可用（不存在/无权限），一次失败即熔断
+FATAL_ERROR_CLASSES = {"NotFoundError", "PermissionDeniedError"}
+
+# 网络层错误（连接失败、超时），与限流(429)和服务端错误(5xx)一起计入模型健康度
+TRANSPORT_ERROR_CLASSES = {"APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout",
+                           "ReadTimeout", "RemoteProtocolError"}
+
+
+class ModelRouter:
+    def __init__(self, state_file: Optional[str] = None, window_size: int = 50,
+                 failure_threshold: int = 3, min_success_rate: float = 0.5,
+                 min_calls: int = 5, cooldown_seconds: int = 600):
+        """
+        初始化模型路由器
+
+        Args:
+            state_file: 健康状态文件路径，默认 DATA_DIR/model_health.json
+            window_size: 滚动窗口大小（最近N次调用）
+            failure_threshold: 连续失败多少次后熔断
+            min_success_rate: 窗口成功率低于该值时降级/熔断
+            min_calls: 计算成功率所需的最少调用次数
+            cooldown_seconds: 熔断后的冷却时间
+        """
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        self.state_file = Path(state_file) if state_file else data_dir / "model_health.json"
+        self.window_size = window_size
+        self.failure_threshold = failure_threshold
+        self.min_success_rate = min_success_rate
+        self.min_calls = min_calls
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self.models: Dict[str, Dict[str, Any]] = {}
+        # 半开状态下正在进行试探调用的模型（只在进程内有效，不保存）
+        self._probing: set = set()
+        self.load_state()
+
+    def _new_entry(self) -> Dict[str, Any]:
+        return {
+            "state": CLOSED,
+            "outcomes": [],           # 最近的调用结果: 1成功 0失败
+            "latencies": [],          # 最近成功调用的耗时(秒)
+            "failure_latencies": [],  # 最近计入健康度的失败调用耗时(秒)，超时会体现在这里
+            "errors": {},             # 错误类别 -> 次数
+            "consecutive_failures": 0,
+            "opened_at": None,
+            "last_error": None,
+            "total_calls": 0
+        }
+
+    def _entry(self, model: str) -> Dict[str, Any]:
+        if model not in self.models:
+            self.models[model] = self._new_entry()
+        return self.models[model]
+
+    def load_state(self):
+        """从文件加载健康状态"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            for model, entry in saved.get('models', {}).items():
+                merged = self._new_entry()
+                merged.update(entry)
+                self.models[model] = merged
+        except Exception as e:
+            print(f"⚠️ 加载模型健康状态失败: {e}")
+
+    def save_state(self):
+        """保存健康状态（先写临时文件再替换，避免写坏）
+
+        map阶段的多个线程会同时调用：写入和替换都在锁内完成，后保存的状态不会被先前的快照覆盖；
+        临时文件名唯一，共享状态文件的其他进程也不会写到同一个临时文件
+        """
+        try:
+            with self._lock:
+                payload = json.dumps({"updated_at": time.time(), "models": self.models}, ensure_ascii=False, indent=2)
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.state_file.parent,
+                                                 suffix='.tmp', delete=False) as f:
+                    f.write(payload)
+                os.replace(f.name, self.state_file)
+        except Exception as e:
+            print(f"⚠️ 保存模型健康状态失败: {e}")
+
+    @staticmethod
+    def classify_error(error: Exception) -> str:
+        """错误分类：异常类名 + HTTP状态码（如有）"""
+        error_class = type(error).__name__
+        status_code = getattr(error, 'status_code', None)
+        return f"{error_class}:{status_code}" if status_code else error_class
+
+    @staticmethod
+    def counts_against_health(error: Exception) -> bool:
+        """是否计入模型健康度：网络错误、限流(429)、服务端错误(5xx)和模型不可用
+
+        400、上下文超长等是请求本身的问题，换一个模型可能成功，但不说明该模型不健康
+        """
+        if type(error).__name__ in FATAL_ERROR_CLASSES:
+            return True
+        status_code = getattr(error, 'status_code', None)
+        if status_code is not None:
+            return status_code == 429 or status_code >= 500
+        return isinstance(error, (ConnectionError, TimeoutError)) or any(
+            cls.__name__ in TRANSPORT_ERROR_CLASSES for cls in type(error).__mro__
+        )
+
+    def success_rate(self, model: str) -> Optional[float]:
+        """窗口内成功率，调用次数不足时返回None"""
+        outcomes = self.models.get(model, {}).get('outcomes', [])
+        if len(outcomes) < self.min_calls:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+    def latency_percentiles(self, model: str) -> Dict[str, float]:
+        """成功调用耗时的p50/p90/p99"""
+        latencies = sorted(self.models.get(model, {}).get('latencies', []))
+        if not latencies:
+            return {}
+        def pick(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+        return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99)}
+
+    def _refresh_state(self, entry: Dict[str, Any], now: float):
+        """熔断冷却结束后转为半开，允许试探"""
+        if entry['state'] == OPEN and entry['opened_at'] and now - entry['opened_at'] >= self.cooldown_seconds:
+            entry['state'] = HALF_OPEN
+
+    def order_models(self, models: List[str]) -> List[str]:
+        """按健康状况排列候选模型
+
+        健康模型保持原有优先级在前，半开或成功率偏低的模型降级到后面，熔断中的模型跳过。
+        如果全部熔断，则保留最早熔断的一个作为最后尝试。
+        """
+        now = time.time()
+        healthy, degraded, skipped = [], [], []
+
+        with self._lock:
+            for model in dict.fromkeys(models):  # 去重并保持顺序
+                entry = self.models.get(model)
+                if not entry:
+                    healthy.append(model)
+                    continue
+
+                self._refresh_state(entry, now)
+                if entry['state'] == OPEN:
+                    skipped.append(model)
+                    continue
+
+                # 半开试探中或成功率偏低的模型降级
+                rate = self.success_rate(model)
+                if entry['state'] == HALF_OPEN or (rate is not None and rate < self.min_success_rate):
+                    degraded.append(model)
+                else:
+                    healthy.append(model)
+
+        ordered = healthy + degraded
+        if skipped:
+            print(f"⛔ 跳过熔断中的模型: {', '.join(skipped)}")
+            if not ordered:
+                ordered = [min(skipped, key=lambda m: self.models[m]['opened_at'] or 0)]
+        return ordered
+
+    def begin_call(self, model: str) -> bool:
+        """调用模型前检查：半开状态只放行一个试探调用，试探进行中时其他调用跳过该模型
+
+        Returns:
+            是否可以调用；返回True后必须以 record_success/record_failure/end_call 结束
+        """
+        with self._lock:
+            entry = self.models.get(model)
+            if not entry:
+                return True
+            self._refresh_state(entry, time.time())
+            if entry['state'] != HALF_OPEN:
+                return True
+            if model in self._probing:
+                return False
+            self._probing.add(model)
+            print(f"🔍 试探半开模型: {model}")
+            return True
+
+    def end_call(self, model: str):
+        """释放试探标记（调用被取消等没有结果的情况，可重复调用）"""
+        with self._lock:
+            self._probing.discard(model)
+
+    def record_success(self, model: str, latency: float):
+        """记录一次成功调用"""
+        with self._lock:
+            self._probing.discard(model)
+            entry = self._entry(model)
+            entry['outcomes'] = (entry['outcomes'] + [1])[-self.window_size:]
+            entry['latencies'] = (entry['latencies'] + [round(latency, 3)])[-self.window_size:]
+            entry['consecutive_failures'] = 0
+            entry['total_calls'] += 1
+            if entry['state'] != CLOSED:
+                print(f"✅ 模型 {model} 恢复正常")
+            entry['state'] = CLOSED
+            entry['opened_at'] = None
+        self.save_state()
+
+    def record_failure(self, model: str, error: Exception, latency: float = 0.0):
+        """记录一次失败调用，必要时熔断
+
+        不计入健康度的错误（见 counts_against_health）只记录错误类别，不影响成功率和熔断状态
+        """
+        error_class = self.classify_error(error)
+        with self._lock:
+            self._probing.discard(model)
+            entry = self._entry(model)
+            entry['errors'][error_class] = entry['errors'].get(error_class, 0) + 1
+            entry['last_error'] = error_class
+            if self.counts_against_health(error):
+                entry['outcomes'] = (entry['outcomes'] + [0])[-self.window_size:]
+                entry['failure_latencies'] = (entry['failure_latencies'] + [round(latency, 3)])[-self.window_size:]
+                entry['consecutive_failures'] += 1
+                entry['total_calls'] += 1
+
+                rate = self.success_rate(model)
+                should_open = (
+                    entry['state'] == HALF_OPEN or
+                    type(error).__name__ in FATAL_ERROR_CLASSES or
+                    entry['consecutive_failures'] >= self.failure_threshold or
+                    (rate is not None and rate < self.min_success_rate / 2)
+                )
+                if should_open and entry['state'] != OPEN:
+                    entry['state'] = OPEN
+                    entry['opened_at'] = time.time()
+                    print(f"⛔ 模型 {model} 已熔断 ({error_class})，{self.cooldown_seconds}秒后重试")
+        self.save_state()
+
+    def print_health_report(self):
+        """打印各模型健康状况"""
+        if not self.models:
+            return
+        print("\n🩺 模型健康状况:")
+        for model, entry in self.models.items():
+            rate = self.success_rate(model)
+            rate_text = f"{rate:.0%}" if rate is not None else "样本不足"
+            percentiles = self.latency_percentiles(model)
+            latency_text = f"p50={percentiles['p50']:.1f}s p90={percentiles['p90']:.1f}s" if percentiles else "无耗时数据"
+            failure_latencies = entry.get('failure_latencies') or []
+            if failure_latencies:
+                latency_text += f" | 失败平均耗时 {sum(failure_latencies) / len(failure_latencies):.1f}s"
+            print(f"  {model}: {entry['state']} | 成功率 {rate_text} | {latency_text} | 错误 {entry['errors']}")
+
+
+# 进程级单例
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """获取共享的模型路由器"""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Prompt归档 - 按内容哈希去重、压缩存储发送给LLM的prompt
+替代每次调用写一个完整txt文件的方式：
+- segments/: 追加写入的压缩数据段，相同prompt只存一份
+- index.jsonl: 小索引，记录 (用户, 日期, 模型, 哈希) 及数据位置，以及服务端prompt缓存命中的token数
+写入时持有 archive.lock 文件锁，常驻服务和命令行进程可以同时归档
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: 只有进程内的线程锁
+    fcntl = None
+
+
+class PromptArchive:
+    def __init__(self, archive_dir: Optional[str] = None, segment_max_bytes: int = 8 * 1024 * 1024):
+        """
+        初始化Prompt归档
+
+        Args:
+            archive_dir: 归档目录，默认 DATA_DIR/prompts/archive
+            segment_max_bytes: 单个数据段的最大字节数，超过后新开一个段
+        """
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        self.archive_dir = Path(archive_dir) if archive_dir else data_dir / "prompts" / "archive"
+        self.segments_dir = self.archive_dir / "segments"
+        self.index_file = self.archive_dir / "index.jsonl"
+        self.lock_file = self.archive_dir / "archive.lock"
+        self.segment_max_bytes = segment_max_bytes
+
+        self._lock = threading.Lock()
+        self._locations: Optional[Dict[str, Dict[str, Any]]] = None  # 哈希 -> 数据位置
+        self._index_offset = 0  # 索引文件已读取到的位置（其他进程追加的记录增量读取）
+        self._segment_number: Optional[int] = None  # 当前写入的数据段编号
+
+    @staticmethod
+    def hash_prompt(prompt: str) -> str:
+        return hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+
+    def iter_index(self) -> Iterator[Dict[str, Any]]:
+        """遍历索引记录"""
+        if not self.index_file.exists():
+            return
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _load_locations(self) -> Dict[str, Dict[str, Any]]:
+        """哈希 -> 数据位置，每次只读取索引中新追加的完整行"""
+        if self._locations is None:
+            self._locations = {}
+            self._index_offset = 0
+        if self.index_file.exists() and self.index_file.stat().st_size > self._index_offset:
+            with open(self.index_file, 'rb') as f:
+                f.seek(self._index_offset)
+                data = f.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._locations.setdefault(entry['hash'], {
+                        "segment": entry['segment'], "offset": entry['offset'], "length": entry['length']
+                    })
+            self._index_offset += len(complete)
+        return self._locations
+
+    def _segment_path(self, number: int) -> Path:
+        return self.segments_dir / f"segment_{number:05d}.bin"
+
+    def _current_segment(self) -> Path:
+        """当前可写入的数据段（首次调用时扫描目录，之后按写入后的大小切换）"""
+        if self._segment_number is None:
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+            segments = sorted(self.segments_dir.glob("segment_*.bin"))
+            self._segment_number = int(segments[-1].stem.split('_')[1]) if segments else 1
+            if segments and segments[-1].stat().st_size >= self.segment_max_bytes:
+                self._segment_number += 1
+        return self._segment_path(self._segment_number)
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        """进程内线程锁 + 跨进程文件锁"""
+        with self._lock:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def store(self, prompt: str, user: str, summary_type: str, model: Optional[str] = None,
+              data_hash: Optional[str] = None, tweet_count: int = 0, date: Optional[str] = None,
+              usage: Optional[Dict[str, int]] = None) -> str:
+        """归档一个prompt，返回其内容哈希（相同内容只写一次）
+
+        Args:
+            usage: LLM返回的token用量（prompt_tokens / cached_tokens），用于统计缓存命中率
+        """
+        prompt_hash = self.hash_prompt(prompt)
+
+        with self._write_lock():
+            # 持锁后再读取其他进程新写入的索引，避免重复存储
+            locations = self._load_locations()
+            location = locations.get(prompt_hash)
+            is_new = location is None
+
+            if is_new:
+                compressed = zlib.compress(prompt.encode('utf-8'), 9)
+                segment = self._current_segment()
+                with open(segment, 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(compressed)
+                if offset + len(compressed) >= self.segment_max_bytes:
+                    self._segment_number += 1
+                location = {"segment": segment.name, "offset": offset, "length": len(compressed)}
+                locations[prompt_hash] = location
+
+            entry = {
+                "hash": prompt_hash,
+                "user": user,
+                "date": date or datetime.now().strftime('%Y%m%d'),
+                "model": model,
+                "summary_type": summary_type,
+                "data_hash": data_hash,
+                "tweet_count": tweet_count,
+                "time": datetime.now().isoformat(timespec='seconds'),
+                **location
+            }
+            if usage and usage.get('prompt_tokens'):
+                entry["prompt_tokens"] = usage['prompt_tokens']
+                entry["cached_tokens"] = usage.get('cached_tokens', 0)
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        status = "新增" if is_new else "已存在，仅记录索引"
+        print(f"📝 Prompt已归档: {prompt_hash[:12]} ({status})")
+        return prompt_hash
+
+    def load(self, prompt_hash: str) -> Optional[str]:
+        """按哈希（或唯一前缀）读取prompt原文"""
+        locations = self._load_locations()
+        location = locations.get(prompt_hash)
+        if location is None:
+            matches = [h for h in locations if h.startswith(prompt_hash)]
+            if len(matches) != 1:
+                return None
+            location = locations[matches[0]]
+
+        with open(self.segments_dir / location['segment'], 'rb') as f:
+            f.seek(location['offset'])
+            compressed = f.read(location['length'])
+        return zlib.decompress(compressed).decode('utf-8')
+
+    def find(self, user: Optional[str] = None, date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按用户/日期查询索引"""
+        return [
+            entry for entry in self.iter_index()
+            if (user is None or entry.get('user') == user) and (date is None or entry.get('date') == date)
+        ]
+
+    def cache_stats(self, user: Optional[str] = None, date: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """按模型统计服务端prompt缓存命中率（只统计记录了用量的调用）"""
+        stats: Dict[str, Dict[str, Any]] = {}
+        for entry in self.find(user, date):
+            if not entry.get('prompt_tokens'):
+                continue
+            model_stats = stats.setdefault(entry.get('model') or '-', {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            model_stats["calls"] += 1
+            model_stats["prompt_tokens"] += entry['prompt_tokens']
+            model_stats["cached_tokens"] += entry.get('cached_tokens', 0)
+        for model_stats in stats.values():
+            model_stats["hit_rate"] = model_stats["cached_tokens"] / model_stats["prompt_tokens"]
+        return stats
+
+    def migrate_legacy_files(self, prompts_dir: Path, delete: bool = False) -> int:
+        """导入旧版 *_prompt.txt 文件"""
+        marker = "=" * 80
+        migrated = 0
+        for txt_file in sorted(prompts_dir.glob("*_prompt.txt")):
+            try:
+                content = txt_file.read_text(encoding='utf-8')
+                # 旧格式: 头部 / marker / 完整Prompt内容 / marker / prompt / marker / Prompt结束 / marker
+                parts = content.split(marker)
+                if len(parts) < 4:
+                    continue
+                prompt = parts[2].strip("\n")
+
+                header = {}
+                for line in parts[0].splitlines():
+                    if ": " in line:
+                        key, value = line.split(": ", 1)
+                        header[key.strip()] = value.strip()
+
+                stem_parts = txt_file.stem.split('_')  # {type}_{user}_{YYYYMMDD}_{HHMMSS}_prompt
+                date = stem_parts[-3] if len(stem_parts) >= 4 else None
+                self.store(
+                    prompt,
+                    user=header.get('用户', 'unknown').lstrip('@'),
+                    summary_type=header.get('总结类型', 'unknown'),
+                    data_hash=header.get('数据哈希'),
+                    tweet_count=int(header.get('推文数量', 0) or 0),
+                    date=date
+                )
+                migrated += 1
+                if delete:
+                    txt_file.unlink()
+            except Exception as e:
+                print(f"⚠️ 导入 {txt_file.name} 失败: {e}")
+        return migrated
+
+
+def main():
+    """Prompt归档命令行工具"""
+    parser = argparse.ArgumentParser(description='Prompt归档工具')
+    subparsers = parser.add_subparsers(dest='command')
+
+    list_parser = subparsers.add_parser('list', help='列出归档记录')
+    list_parser.add_argument('--user', help='按用户过滤')
+    list_parser.add_argument('--date', help='按日期过滤 (YYYYMMDD)')
+
+    stats_parser = subparsers.add_parser('stats', help='统计prompt缓存命中率')
+    stats_parser.add_argument('--user', help='按用户过滤')
+    stats_parser.add_argument('--date', help='按日期过滤 (YYYYMMDD)')
+
+    show_parser = subparsers.add_parser('show', help='输出prompt原文')
+    show_parser.add_argument('hash', help='prompt哈希或其前缀')
+
+    migrate_parser = subparsers.add_parser('migrate', help='导入旧版txt prompt文件')
+    migrate_parser.add_argument('--delete', action='store_true', help='导入后删除txt文件')
+
+    args = parser.parse_args()
+    archive = PromptArchive()
+
+    if args.command == 'list':
+        for entry in archive.find(args.user, args.date):
+            cache = f"  缓存 {entry['cached_tokens']}/{entry['prompt_tokens']}" if entry.get('prompt_tokens') else ""
+            print(f"{entry['hash'][:12]}  {entry['date']}  @{entry['user']:20}  {entry.get('model') or '-':30}  {entry['tweet_count']} 条推文{cache}")
+    elif args.command == 'stats':
+        stats = archive.cache_stats(args.user, args.date)
+        if not stats:
+            print("📭 没有记录token用量的调用")
+        for model, model_stats in sorted(stats.items()):
+            print(f"{model:30}  {model_stats['calls']:4} 次调用  "
+                  f"缓存 {model_stats['cached_tokens']}/{model_stats['prompt_tokens']} tokens ({model_stats['hit_rate']:.0%})")
+    elif args.command == 'show':
+        prompt = archive.load(args.hash)
+        print(prompt if prompt is not None else f"❌ 未找到prompt: {args.hash}")
+    elif args.command == 'migrate':
+        prompts_dir = archive.archive_dir.parent
+        count = archive.migrate_legacy_files(prompts_dir, delete=args.delete)
+        print(f"✅ 已导入 {count} 个旧版prompt文件")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
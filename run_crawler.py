@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """
 X爬虫命令行工具 - 支持灵活参数配置
+爬虫、总结器等模块只在对应命令中导入，status 等短命令不加载网络和LLM相关的库
 """
 
 import argparse
-import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
 
 def main():
     parser = argparse.ArgumentParser(description='X推文爬虫 - 生成每日报告')
@@ -51,6 +55,18 @@ def main():
         help='生成用户个人总结 - 如果指定--count则抓取新数据后生成总结，否则只处理已有数据'
     )
     
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='使用Batch API批量提交用户总结 (仅与--user-summaries配合使用，适合夜间任务)'
+    )
+    
+    parser.add_argument(
+        '--digest',
+        action='store_true',
+        help='基于昨天的用户总结生成全局日报 (可与--user-summaries配合，在总结完成后执行)'
+    )
+    
     parser.add_argument(
         '--force',
         action='store_true',
@@ -74,10 +90,20 @@ def main():
             mode_text = "生成昨天的个人总结"
             if args.force:
                 mode_text += " (强制覆盖模式)"
+            if args.batch:
+                mode_text += " (批量模式)"
             print(f"\n🤖 用户总结模式 - {mode_text}")
             from crawler import XCrawler
             crawler = XCrawler()
-            crawler.generate_user_summaries_for_yesterday(force_overwrite=args.force)
+            crawler.generate_user_summaries_for_yesterday(force_overwrite=args.force, batch_mode=args.batch)
+            if args.digest:
+                crawler.generate_daily_digest(force_overwrite=args.force)
+        elif args.digest and not args.count:
+            # 纯日报模式 - 只汇总已有的用户总结
+            print(f"\n📰 全局日报模式 - 汇总昨天的用户总结")
+            from crawler import XCrawler
+            crawler = XCrawler()
+            crawler.generate_daily_digest(force_overwrite=args.force)
         elif args.test:
             # 测试模式
             print("\n🧪 测试模式已废弃，请使用正常模式")
@@ -102,7 +128,9 @@ def main():
                     # 为前一天的数据生成用户总结
                     print(f"🔄 为前一天的数据生成用户总结...")
                     
-                    crawler.generate_user_summaries_for_yesterday(force_overwrite=args.force)
+                    crawler.generate_user_summaries_for_yesterday(force_overwrite=args.force, batch_mode=args.batch)
+                    if args.digest:
+                        crawler.generate_daily_digest(force_overwrite=args.force)
                 else:
                     print(f"\n❌ 数据抓取失败")
             else:
@@ -135,6 +163,116 @@ def main():
         print("   2. 验证认证信息是否有效")
         print("   3. 查看详细日志信息")
 
+def _format_age(timestamp: float) -> str:
+    seconds = max(time.time() - timestamp, 0)
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}分钟前"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}小时前"
+    return f"{seconds / 86400:.1f}天前"
+
+
+def _scan(directory: Path, suffix: str = ".json"):
+    """列出目录中的文件 (文件名, mtime)，目录不存在时为空"""
+    try:
+        with os.scandir(directory) as entries:
+            return [(entry.name, entry.stat().st_mtime) for entry in entries
+                    if entry.is_file() and entry.name.endswith(suffix)]
+    except OSError:
+        return []
+
+
+def show_status():
+    """显示认证和数据状态 - 只读取配置和文件元数据，不发起网络请求"""
+    from config_loader import ConfigLoader
+    from auth_cache import AuthCache
+    from account_pool import CredentialPool
+
+    loader = ConfigLoader()
+    data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+    today = datetime.now().strftime('%Y%m%d')
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+
+    print("📊 X爬虫状态")
+    print(f"📂 数据目录: {data_dir}")
+
+    accounts = CredentialPool.from_config(loader.config, session_factory=lambda auth_config: None).accounts
+    if accounts:
+        print(f"🔑 认证: 已配置 {len(accounts)} 个账号 ({', '.join(account.name for account in accounts)})")
+    else:
+        print("🔑 认证: 未配置 (运行 python auth_setup.py)")
+
+    auth_cache = AuthCache()
+    entry = auth_cache.load()
+    if entry:
+        if entry.get('validated_at'):
+            print(f"   最近验证: {_format_age(entry['validated_at'])} ({entry.get('probe_result')})")
+        expires_at = auth_cache.expires_at(entry)
+        if expires_at:
+            state = "已过期" if auth_cache.is_expired(entry) else "过期"
+            print(f"   cookie{state}: {datetime.fromtimestamp(expires_at).strftime('%Y-%m-%d %H:%M')}")
+
+    daily_posts = _scan(data_dir / "daily_posts")
+    if daily_posts:
+        name, mtime = max(daily_posts, key=lambda item: item[1])
+        print(f"🕐 最近抓取: {name} ({_format_age(mtime)})")
+    else:
+        print("🕐 最近抓取: 无")
+    print(f"📄 原始响应: {len(_scan(data_dir / 'raw_responses'))} 个")
+
+    users_daily = _scan(data_dir / "users_daily")
+    print(f"👥 用户数据: 今天 {sum(name.endswith(f'_{today}.json') for name, _ in users_daily)} 个, "
+          f"昨天 {sum(name.endswith(f'_{yesterday}.json') for name, _ in users_daily)} 个")
+    summaries = _scan(data_dir / "user_summaries", suffix=f"_{yesterday}_summary.md")
+    print(f"📝 昨天的用户总结: {len(summaries)} 个")
+    digest_file = data_dir / "daily_reports" / f"{yesterday}_digest.md"
+    print(f"📰 昨天的全局日报: {'已生成' if digest_file.exists() else '未生成'}")
+
+    drift_reports = _scan(data_dir / "schema_drift")
+    if drift_reports:
+        name, mtime = max(drift_reports, key=lambda item: item[1])
+        print(f"🧬 结构漂移报告: {len(drift_reports)} 个 (最近: {name}, {_format_age(mtime)})")
+
+    state_file = data_dir / "service_state.json"
+    if state_file.exists():
+        import json
+
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        print(f"🛰️ 常驻服务: {'运行中' if state.get('running') else '已停止'} (pid {state.get('pid')}, 更新于 {state.get('updated_at')})")
+        for name, job in state.get('jobs', {}).items():
+            print(f"   {name}: 上次 {job.get('last_run') or '-'} ({job.get('last_result') or '-'}), 下次 {job.get('next_run')}")
+
+
+def serve(argv):
+    """常驻服务模式: python run_crawler.py serve [选项]"""
+    parser = argparse.ArgumentParser(prog='run_crawler.py serve', description='常驻服务 - 进程内定时抓取和生成总结')
+    parser.add_argument('--interval', type=float, default=120, help='抓取间隔（分钟，默认: 120）')
+    parser.add_argument('--jitter', type=float, default=0.1, help='间隔随机抖动比例（默认: 0.1，即±10%%）')
+    parser.add_argument('-c', '--count', type=int, default=None, help='每次抓取的推文数量 (默认使用配置中的设置)')
+    parser.add_argument('--timeline', default='recommended', choices=['recommended', 'following'], help='时间线类型')
+    parser.add_argument('--max-pages', type=int, default=None, help='每次抓取的最大页数')
+    parser.add_argument('--summary-hour', type=int, default=9, choices=range(24), metavar='0-23',
+                        help='每天生成昨天用户总结的时间（小时，默认: 9）')
+    parser.add_argument('--no-summaries', action='store_true', help='只抓取，不生成用户总结')
+    parser.add_argument('--batch', action='store_true', help='用户总结使用Batch API')
+    parser.add_argument('--digest', action='store_true', help='用户总结完成后生成全局日报')
+    args = parser.parse_args(argv)
+
+    from crawl_service import CrawlService
+
+    CrawlService(
+        crawl_interval=args.interval * 60,
+        jitter=args.jitter,
+        tweet_count=args.count,
+        timeline_type=args.timeline,
+        max_pages=args.max_pages,
+        summary_hour=None if args.no_summaries else args.summary_hour,
+        batch_mode=args.batch,
+        digest=args.digest
+    ).run()
+
+
 def show_examples():
     """显示使用示例"""
     print("""
@@ -160,6 +298,16 @@ python run_crawler.py --user-summaries
 
 # 强制覆盖已存在的总结文件 (用于测试)
 python run_crawler.py --user-summaries --force
+
+# 使用Batch API批量生成昨天的用户总结 (延迟高但成本低)
+python run_crawler.py --user-summaries --batch
+
+# 生成用户总结后，再汇总为一份全局日报 (只需一次小规模LLM调用)
+python run_crawler.py --user-summaries --digest
+
+# 只基于已有的用户总结生成昨天的全局日报
+python run_crawler.py --digest
+
 # 生成用户总结（提示词完全由配置文件决定）
 python run_crawler.py --user-summaries
 
@@ -174,6 +322,12 @@ python run_crawler.py --count 500
 
 # 高级配置 - 限制最大页数
 python run_crawler.py --count 100 --max-pages 3
+
+# 查看认证和数据状态 (不发起网络请求)
+python run_crawler.py status
+
+# 常驻服务: 每2小时抓取一次，每天9点后生成昨天的用户总结和全局日报
+python run_crawler.py serve --interval 120 --summary-hour 9 --digest
 """)
 
 if __name__ == "__main__":
@@ -181,5 +335,9 @@ if __name__ == "__main__":
     
     if len(sys.argv) == 2 and sys.argv[1] in ['help']:
         show_examples()
+    elif len(sys.argv) == 2 and sys.argv[1] == 'status':
+        show_status()
+    elif len(sys.argv) >= 2 and sys.argv[1] == 'serve':
+        serve(sys.argv[2:])
     else:
         main()
\ No newline at end of file
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+GraphQL响应结构漂移检测 - 在解析前发现X接口的结构变化
+- 按 响应 / 指令类型 / 条目类型 / 推文类型 收集字段路径，路径集合的哈希即结构指纹
+- 基线从 raw_responses 归档构建，指纹命中基线时直接跳过（绝大多数页面只需计算哈希）
+- 未命中时逐路径对比：新增路径、基线中几乎总是出现却缺失的路径、解析器依赖的关键路径
+- 关键路径缺失说明解析器已无法正确提取，爬虫应立即停止，避免继续消耗请求额度
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# 解析器（tweet_parser）依赖的关键路径，缺失即无法提取推文
+REQUIRED_PATHS = {
+    "response": ["data.home.home_timeline_urt.instructions"],
+    "instruction:TimelineAddEntries": ["type", "entries"],
+    "entry:tweet": ["entryId", "content.itemContent.tweet_results.result.__typename"],
+    "entry:cursor-bottom": ["content.cursorType", "content.value"],
+    "tweet:Tweet": [
+        "rest_id",
+        "legacy.full_text",
+        "legacy.created_at",
+        "core.user_results.result.rest_id",
+        "core.user_results.result.core.screen_name",
+    ],
+}
+
+# 这些键下的内容由其他类别单独指纹，不在当前层展开
+NESTED_KEYS = {
+    "instructions", "entries", "items",
+    "tweet_results", "retweeted_status_result", "quoted_status_result",
+}
+
+# 基线中出现比例不低于该值的路径视为“常驻”，缺失时报告
+COMMON_PATH_RATIO = 0.98
+# 样本太少时不报告常驻路径缺失
+MIN_SAMPLES = 20
+# 每个类别最多保留的已知指纹数
+MAX_HASHES = 500
+
+ENTRY_ID_PATTERN = re.compile(r'-\d.*$')
+
+
+def collect_paths(node: Any, prefix: str = "", max_depth: int = 8) -> Set[str]:
+    """收集字段路径（列表下标统一为[]，嵌套结构只记录入口及其__typename）"""
+    paths: Set[str] = set()
+
+    def walk(value: Any, path: str, depth: int):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                child_path = f"{path}.{key}" if path else key
+                paths.add(child_path)
+                if key in NESTED_KEYS:
+                    # 只记录嵌套结构的类型字段
+                    result = child.get('result') if isinstance(child, dict) else None
+                    if isinstance(result, dict) and '__typename' in result:
+                        paths.add(f"{child_path}.result.__typename")
+                    continue
+                if depth < max_depth:
+                    walk(child, child_path, depth + 1)
+        elif isinstance(value, list) and depth < max_depth:
+            for item in value:
+                walk(item, f"{path}[]", depth + 1)
+
+    walk(node, prefix, 0)
+    return paths
+
+
+def entry_kind(entry_id: str) -> str:
+    """条目类别：去掉entryId中的数字id部分，如 tweet-123 -> tweet, cursor-bottom-123 -> cursor-bottom"""
+    return ENTRY_ID_PATTERN.sub('', entry_id or '') or 'unknown'
+
+
+def _nested_tweets(tweet: Dict) -> Iterator[Dict]:
+    """推文及其转推/引用推文（含TweetWithVisibilityResults包装）"""
+    yield tweet
+    for holder in (tweet.get('legacy', {}).get('retweeted_status_result'), tweet.get('quoted_status_result')):
+        result = holder.get('result') if isinstance(holder, dict) else None
+        if isinstance(result, dict):
+            if result.get('__typename') == 'TweetWithVisibilityResults':
+                result = result.get('tweet') or {}
+            yield from _nested_tweets(result)
+
+
+def iter_shapes(response_data: Dict) -> Iterator[Tuple[str, Set[str]]]:
+    """遍历响应中的结构单元，产出 (类别, 字段路径集合)"""
+    yield "response", collect_paths(response_data)
+
+    timeline = response_data.get('data', {}).get('home', {}).get('home_timeline_urt', {})
+    instructions = timeline.get('instructions', []) if isinstance(timeline, dict) else []
+    for instruction in instructions if isinstance(instructions, list) else []:
+        if not isinstance(instruction, dict):
+            continue
+        yield f"instruction:{instruction.get('type')}", collect_paths(instruction)
+
+        for entry in instruction.get('entries', []) or []:
+            yield f"entry:{entry_kind(entry.get('entryId', ''))}", collect_paths(entry)
+
+            content = entry.get('content', {})
+            item_contents = [content.get('itemContent', {})]
+            item_contents += [item.get('item', {}).get('itemContent', {}) for item in content.get('items', []) or []]
+            for item_content in item_contents:
+                tweet = item_content.get('tweet_results', {}).get('result') if isinstance(item_content, dict) else None
+                if isinstance(tweet, dict):
+                    for nested in _nested_tweets(tweet):
+                        yield f"tweet:{nested.get('__typename')}", collect_paths(nested)
+
+
+def shape_hash(paths: Set[str]) -> str:
+    return hashlib.sha1("\n".join(sorted(paths)).encode('utf-8')).hexdigest()[:16]
+
+
+class SchemaDriftDetector:
+    def __init__(self, baseline_file: Optional[str] = None, raw_responses_dir: Optional[str] = None):
+        """
+        初始化结构漂移检测器
+
+        Args:
+            baseline_file: 基线文件路径，默认 DATA_DIR/schema_baseline.json
+            raw_responses_dir: 构建基线用的原始响应目录，默认 DATA_DIR/raw_responses
+        """
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        self.baseline_file = Path(baseline_file) if baseline_file else data_dir / "schema_baseline.json"
+        self.raw_responses_dir = Path(raw_responses_dir) if raw_responses_dir else data_dir / "raw_responses"
+        # 类别 -> {"samples": 样本数, "paths": {路径: 出现次数}, "hashes": [已知指纹]}
+        self.kinds: Optional[Dict[str, Dict[str, Any]]] = None
+        self._known_hashes: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self._save_lock = threading.Lock()
+
+    # ---------- 基线 ----------
+
+    def _ensure_baseline(self):
+        """懒加载基线：优先读取基线文件，没有时从原始响应归档构建"""
+        if self.kinds is not None:
+            return
+        if self.baseline_file.exists():
+            try:
+                with open(self.baseline_file, 'r', encoding='utf-8') as f:
+                    self.kinds = json.load(f).get('kinds', {})
+                self._known_hashes = {kind: set(info.get('hashes', [])) for kind, info in self.kinds.items()}
+                return
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ 结构基线读取失败，将重新构建: {e}")
+        self.build_baseline()
+
+    def build_baseline(self, response_files: Optional[List[Path]] = None) -> int:
+        """从原始响应归档构建基线，返回使用的响应数"""
+        self.kinds, self._known_hashes = {}, {}
+        if response_files is None:
+            response_files = sorted(self.raw_responses_dir.glob("*.json")) if self.raw_responses_dir.exists() else []
+
+        used = 0
+        for response_file in response_files:
+            try:
+                with open(response_file, 'r', encoding='utf-8') as f:
+                    raw = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if raw.get('status', 200) != 200 or not isinstance(raw.get('data'), dict):
+                continue
+            self.learn(raw['data'])
+            used += 1
+
+        if used:
+            self.save()
+            print(f"🧬 已从 {used} 个原始响应构建结构基线: {len(self.kinds)} 个类别")
+        else:
+            print("🧬 没有可用的原始响应，结构基线将从本次爬取开始学习")
+        return used
+
+    def learn(self, response_data: Dict):
+        """把一个响应的结构并入基线"""
+        if self.kinds is None:
+            self.kinds = {}
+        for kind, paths in iter_shapes(response_data):
+            self._learn_shape(kind, paths)
+
+    def _learn_shape(self, kind: str, paths: Set[str], fingerprint: Optional[str] = None):
+        info = self.kinds.setdefault(kind, {"samples": 0, "paths": {}, "hashes": []})
+        info["samples"] += 1
+        for path in paths:
+            info["paths"][path] = info["paths"].get(path, 0) + 1
+        fingerprint = fingerprint or shape_hash(paths)
+        known = self._known_hashes.setdefault(kind, set(info["hashes"]))
+        if fingerprint not in known and len(known) < MAX_HASHES:
+            known.add(fingerprint)
+            info["hashes"].append(fingerprint)
+        self._dirty = True
+
+    def save(self):
+        if self.kinds is None or not self._dirty:
+            return
+        # 写入和替换在锁内完成；临时文件名唯一，多个爬虫进程共享基线文件时也不会互相写坏
+        with self._save_lock:
+            self.baseline_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.baseline_file.parent,
+                                             suffix='.tmp', delete=False) as f:
+                json.dump({"version": 1, "updated_at": datetime.now().isoformat(timespec='seconds'), "kinds": self.kinds},
+                          f, ensure_ascii=False)
+            os.replace(f.name, self.baseline_file)
+            self._dirty = False
+
+    # ---------- 检测 ----------
+
+    def check(self, response_data: Dict, learn: bool = True) -> Dict[str, Any]:
+        """检查一个响应的结构
+
+        Args:
+            response_data: 时间线API响应
+            learn: 没有关键路径缺失时，把新结构并入基线（同一变化只报告一次）
+
+        Returns:
+            {"critical": 是否关键路径缺失, "missing_required", "new_paths", "missing_paths", "new_kinds", "checked", "cache_hits"}
+        """
+        self._ensure_baseline()
+        bootstrapping = not self.kinds
+
+        report: Dict[str, Any] = {
+            "critical": False, "missing_required": {}, "new_paths": {}, "missing_paths": {},
+            "new_kinds": [], "checked": 0, "cache_hits": 0
+        }
+        unseen: List[Tuple[str, Set[str], str]] = []
+        # 同一页面内按类别合并路径：字段被移除时会从该类别的所有单元中消失，单条推文缺少可选字段不算漂移
+        page_paths: Dict[str, Set[str]] = {}
+
+        for kind, paths in iter_shapes(response_data):
+            report["checked"] += 1
+            page_paths.setdefault(kind, set()).update(paths)
+
+            fingerprint = shape_hash(paths)
+            if fingerprint in self._known_hashes.get(kind, ()):
+                report["cache_hits"] += 1
+            else:
+                unseen.append((kind, paths, fingerprint))
+
+        unseen_kinds = {kind for kind, _, _ in unseen}
+        for kind, paths in page_paths.items():
+            required = REQUIRED_PATHS.get(kind)
+            missing_required = [path for path in required if path not in paths] if required else []
+            if missing_required:
+                report["missing_required"][kind] = missing_required
+
+            # 所有单元的指纹都命中基线时无需逐路径对比
+            if kind not in unseen_kinds:
+                continue
+            info = (self.kinds or {}).get(kind)
+            if info is None:
+                if not bootstrapping:
+                    report["new_kinds"].append(kind)
+                continue
+
+            new_paths = paths - info["paths"].keys()
+            if new_paths:
+                report["new_paths"][kind] = sorted(new_paths)
+            if info["samples"] >= MIN_SAMPLES:
+                common = {path for path, count in info["paths"].items() if count / info["samples"] >= COMMON_PATH_RATIO}
+                missing = common - paths
+                if missing:
+                    report["missing_paths"][kind] = sorted(missing)
+
+        # 整个响应里连一条推文或时间线指令都没有时，也按关键缺失处理
+        if "response" in report["missing_required"] or not any(kind.startswith("instruction:") for kind in page_paths):
+            report["missing_required"].setdefault("response", REQUIRED_PATHS["response"])
+        report["critical"] = bool(report["missing_required"])
+
+        if learn and not report["critical"]:
+            for kind, paths, fingerprint in unseen:
+                self._learn_shape(kind, paths, fingerprint)
+
+        return report
+
+    @staticmethod
+    def has_drift(report: Dict[str, Any]) -> bool:
+        return bool(report["critical"] or report["new_paths"] or report["missing_paths"] or report["new_kinds"])
+
+    @staticmethod
+    def format_report(report: Dict[str, Any], max_paths: int = 8) -> List[str]:
+        """把检测结果格式化为便于阅读的行"""
+        lines = []
+        for kind, paths in report["missing_required"].items():
+            lines.append(f"❌ [{kind}] 缺失关键路径: {', '.join(paths[:max_paths])}")
+        for kind, paths in report["missing_paths"].items():
+            more = f" 等{len(paths)}个" if len(paths) > max_paths else ""
+            lines.append(f"⚠️ [{kind}] 缺失常驻路径: {', '.join(paths[:max_paths])}{more}")
+        for kind, paths in report["new_paths"].items():
+            more = f" 等{len(paths)}个" if len(paths) > max_paths else ""
+            lines.append(f"🆕 [{kind}] 新增路径: {', '.join(paths[:max_paths])}{more}")
+        if report["new_kinds"]:
+            lines.append(f"🆕 新的结构类别: {', '.join(report['new_kinds'])}")
+        return lines
+
+
+def save_drift_report(report: Dict[str, Any], crawl_stats: Dict[str, Any], data_dir: Optional[str] = None) -> Path:
+    """保存结构漂移报告到 DATA_DIR/schema_drift/"""
+    drift_dir = Path(data_dir or os.getenv('DATA_DIR', 'crawler_data')) / "schema_drift"
+    drift_dir.mkdir(parents=True, exist_ok=True)
+    report_file = drift_dir / f"drift_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({"detected_at": datetime.now().isoformat(), "crawl": crawl_stats, "drift": report},
+                  f, ensure_ascii=False, indent=2)
+    return report_file
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GraphQL响应结构漂移检测')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('build', help='从 DATA_DIR/raw_responses 重新构建结构基线')
+    check_parser = subparsers.add_parser('check', help='检查原始响应文件的结构')
+    check_parser.add_argument('files', nargs='+', help='原始响应文件（爬虫保存的 *_response.json）')
+    args = parser.parse_args()
+
+    detector = SchemaDriftDetector()
+    if args.command == 'build':
+        detector.build_baseline()
+    elif args.command == 'check':
+        for response_file in args.files:
+            with open(response_file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            report = detector.check(raw.get('data', {}), learn=False)
+            status = "❌ 关键结构变化" if report["critical"] else ("⚠️ 结构有变化" if detector.has_drift(report) else "✅ 结构一致")
+            print(f"{Path(response_file).name}: {status} (检查 {report['checked']} 个单元, 指纹命中 {report['cache_hits']})")
+            for line in detector.format_report(report):
+                print(f"  {line}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
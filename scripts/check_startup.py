@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+启动开销预算检查 - 用 python -X importtime 测量命令行的导入耗时
+- 导入耗时只统计解释器启动（site等）之外、命令自身引入的模块
+- 启动开销 = 命令总耗时 - 空解释器(python -c pass)耗时，各取多次运行的中位数
+- 短命令不允许加载网络、LLM和数值计算等重量级库
+超出预算或加载了禁止的模块时退出码为1，可在CI中使用
+
+用法:
+    python scripts/check_startup.py
+    python scripts/check_startup.py --runs 7 --budget-scale 2   # 较慢的机器上放宽预算
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# (说明, 命令参数, 导入耗时预算ms, 启动开销预算ms, 禁止加载的模块)
+COMMANDS = [
+    ("run_crawler.py status", ["run_crawler.py", "status"], 50, 100,
+     ["requests", "openai", "numpy", "dateutil", "playwright"]),
+    ("import crawler", ["-c", "import crawler"], 80, 150,
+     ["requests", "openai", "numpy", "playwright"]),
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """解析 -X importtime 输出: 模块名 -> (缩进层级, 累计耗时us)"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (depth, int(cumulative))
+    return modules
+
+
+def run_once(args: List[str]) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    start_time = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start_time
+    if result.returncode != 0:
+        raise RuntimeError(f"命令失败: {' '.join(args)}\n{result.stderr[-500:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def measure(args: List[str], baseline_modules: set, runs: int) -> Dict:
+    """多次运行取中位数，返回 总耗时、命令导入耗时、导入的模块"""
+    wall_times, import_times = [], []
+    modules: Dict[str, Tuple[int, int]] = {}
+    for _ in range(runs):
+        elapsed, modules = run_once(args)
+        wall_times.append(elapsed)
+        # 顶层模块的累计耗时已包含其子模块
+        import_times.append(sum(
+            cumulative for name, (depth, cumulative) in modules.items()
+            if depth == 0 and name not in baseline_modules
+        ))
+    top_modules = sorted(
+        ((cumulative, name) for name, (depth, cumulative) in modules.items()
+         if depth == 0 and name not in baseline_modules),
+        reverse=True
+    )
+    return {
+        "wall_ms": statistics.median(wall_times) * 1000,
+        "import_ms": statistics.median(import_times) / 1000,
+        "modules": set(modules),
+        "top_modules": top_modules[:5]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='命令行启动开销预算检查')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='预算放大倍数 (默认: 1.0)')
+    parser.add_argument('--runs', type=int, default=5, help='每个命令的运行次数 (默认: 5)')
+    args = parser.parse_args()
+
+    baseline_times, baseline_modules = [], set()
+    for _ in range(args.runs):
+        elapsed, modules = run_once(["-c", "pass"])
+        baseline_times.append(elapsed)
+        baseline_modules |= set(modules)
+    baseline_ms = statistics.median(baseline_times) * 1000
+    print(f"🐍 空解释器启动: {baseline_ms:.0f}ms")
+
+    failed = False
+    for label, command, import_budget_ms, overhead_budget_ms, forbidden in COMMANDS:
+        import_budget_ms *= args.budget_scale
+        overhead_budget_ms *= args.budget_scale
+        result = measure(command, baseline_modules, args.runs)
+        overhead_ms = result["wall_ms"] - baseline_ms
+        loaded = [name for name in forbidden if name in result["modules"]]
+        ok = result["import_ms"] <= import_budget_ms and overhead_ms <= overhead_budget_ms and not loaded
+
+        print(f"\n{'✅' if ok else '❌'} {label}")
+        print(f"  导入耗时: {result['import_ms']:.1f}ms (预算 {import_budget_ms:.0f}ms)")
+        print(f"  启动开销: {overhead_ms:.0f}ms (预算 {overhead_budget_ms:.0f}ms, 总耗时 {result['wall_ms']:.0f}ms)")
+        for cumulative, name in result["top_modules"]:
+            print(f"    {name:30} {cumulative / 1000:.1f}ms")
+        if loaded:
+            print(f"  ⚠️ 加载了不应加载的模块: {', '.join(loaded)}")
+        failed |= not ok
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,53 @@ LLM总结模块 - 基于推文数据生成智能总结
 支持多种总结方式和输出格式
 """
 
+import asyncio
+import contextlib
 import json
 import os
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 import hashlib
 
+from llm_client import get_llm_client, get_async_llm_client, apply_prompt_cache, extract_usage
+from model_router import get_model_router
+from prompt_archive import PromptArchive
+from map_reduce_summarizer import MapReduceSummarizer
+from tweet_index import TweetIndex, tweet_date
+from template_engine import get_template_engine
+from dedup import TweetDeduplicator
+from summary_backends import create_summary_backend
+from extractive import ExtractivePreSummarizer
+
+# 进程级配置文件缓存: 路径 -> (mtime, 数据)，多次实例化总结器时不重复读取
+_json_file_cache: Dict[str, Tuple[float, Any]] = {}
+
+
+def _load_json_cached(path: Path) -> Tuple[Optional[Any], bool]:
+    """读取JSON配置文件，文件未修改时直接返回缓存内容
+
+    Returns:
+        (数据, 是否来自缓存)；文件不存在时数据为None
+    """
+    if not path.exists():
+        return None, False
+    mtime = path.stat().st_mtime
+    cached = _json_file_cache.get(str(path))
+    if cached and cached[0] == mtime:
+        return cached[1], True
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    _json_file_cache[str(path)] = (mtime, data)
+    return data, False
+
+
 class TwitterSummarizer:
+    # API状态每个进程只检查一次
+    _api_status_checked = False
+
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         """
         初始化总结器
@@ -35,6 +74,8 @@ class TwitterSummarizer:
         # 总结配置
         self.config = {
             "max_tweets_per_summary": 100,
+            # 推文JSON超过该token数时先做抽取式预筛选（0为关闭）；未设置时为分层总结一轮并行map的输入量
+            "prompt_token_budget": int(os.environ['PROMPT_TOKEN_BUDGET']) if os.getenv('PROMPT_TOKEN_BUDGET') else None,
             "summary_types": ["daily", "trending", "category"],
             "languages": ["zh", "en"],
             "output_formats": ["markdown", "json", "html"]
@@ -77,6 +118,17 @@ class TwitterSummarizer:
             }
         }
         
+        # 分类关键词 - 用于 generate_category_summary 筛选推文
+        self.category_keywords = {
+            "tech": ["AI", "人工智能", "模型", "编程", "开源", "芯片", "算法", "GPT", "LLM", "software", "robot", "机器人"],
+            "business": ["投资", "创业", "市场", "融资", "股价", "营收", "IPO", "startup", "market", "revenue"],
+            "politics": ["政策", "选举", "政府", "总统", "关税", "election", "government", "policy", "tariff"],
+            "space": ["SpaceX", "Starship", "火箭", "卫星", "星舰", "rocket", "Mars", "火星", "orbit"]
+        }
+        
+        # 推文关键词索引（与爬虫共用 crawler_data/index）
+        self.tweet_index = TweetIndex()
+        
         # 启动时加载保存的用户配置
         self.load_user_profiles()
         
@@ -95,8 +147,28 @@ class TwitterSummarizer:
             "temperature": 0.7
         }
         
-        # 检查API状态
-        self.check_api_status()
+        # 每个线程最近一次在线调用的token用量（供prompt归档记录缓存命中）
+        self._call_state = threading.local()
+        
+        # 总结后端（在线服务 / 本地模型 / 抽取式），由 LLM_BACKEND 选择
+        self.backend = create_summary_backend(self)
+        
+        # 大量推文时的分层总结
+        self.map_reduce = MapReduceSummarizer(self)
+        
+        # Prompt归档（按内容去重压缩）
+        self.prompt_archive = PromptArchive()
+
+        # 构建prompt前折叠转推/引用链/复制文本等重复推文
+        self.deduplicator = TweetDeduplicator()
+        
+        # 重度用户的推文先按TextRank抽取到预算内，再交给LLM
+        self.pre_summarizer = ExtractivePreSummarizer()
+        
+        # 检查API状态（每个进程只输出一次）
+        if not TwitterSummarizer._api_status_checked:
+            self.check_api_status()
+            TwitterSummarizer._api_status_checked = True
     
     def check_api_status(self):
         """检查API密钥和依赖库状态"""
@@ -107,8 +179,9 @@ class TwitterSummarizer:
             masked_key = f"{self.api_key[:8]}...{self.api_key[-4:]}" if len(self.api_key) > 12 else "***"
             print(f"  ✅ API密钥: {masked_key}")
         else:
-            print(f"  ⚠️ API密钥: 未设置 (将使用模拟总结)")
+            print(f"  ⚠️ API密钥: 未设置")
             print(f"     💡 请设置环境变量: OPENROUTER_API_KEY")
+        print(f"  🧩 总结后端: {self.backend.name}")
         
         # 检查依赖库
         try:
@@ -153,40 +226,27 @@ class TwitterSummarizer:
         config_file = Path("user_analysis_profiles.json")
         if config_file.exists():
             try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    saved_profiles = json.load(f)
-                    # 合并保存的配置和默认配置
-                    self.user_analysis_profiles.update(saved_profiles)
-                print(f"📂 已从文件加载用户分析配置: {len(saved_profiles)} 个")
+                saved_profiles, from_cache = _load_json_cached(config_file)
+                # 合并保存的配置和默认配置
+                self.user_analysis_profiles.update(saved_profiles)
+                if not from_cache:
+                    print(f"📂 已从文件加载用户分析配置: {len(saved_profiles)} 个")
             except Exception as e:
                 error_msg = str(e).encode('utf-8', errors='ignore').decode('utf-8')
                 print(f"⚠️ 加载配置文件失败: {error_msg}")
     
     def load_user_prompt_templates(self):
-        """加载用户提示词模板配置"""
-        template_file = Path("user_prompt_templates.json")
-        if template_file.exists():
-            try:
-                with open(template_file, 'r', encoding='utf-8') as f:
-                    self.user_prompt_templates = json.load(f)
-                print(f"📝 已加载用户提示词模板: {len(self.user_prompt_templates)} 个")
-            except Exception as e:
-                error_msg = str(e).encode('utf-8', errors='ignore').decode('utf-8')
-                print(f"⚠️ 加载用户提示词模板失败: {error_msg}")
-                self.user_prompt_templates = {}
-        else:
-            print("📝 用户提示词模板文件不存在，使用默认模板")
-            self.user_prompt_templates = {}
+        """加载用户提示词模板配置（预编译，文件修改后自动重新加载）"""
+        self.template_engine = get_template_engine("user_prompt_templates.json")
+
+    @property
+    def user_prompt_templates(self) -> Dict[str, Dict[str, Any]]:
+        """用户提示词模板原始配置"""
+        return self.template_engine.configs
 
     def get_user_template(self, username: str) -> str:
-        """获取用户的提示词模板"""
-        if hasattr(self, 'user_prompt_templates') and username in self.user_prompt_templates:
-            return self.user_prompt_templates[username]['template']
-        elif hasattr(self, 'user_prompt_templates') and 'default' in self.user_prompt_templates:
-            return self.user_prompt_templates['default']['template']
-        else:
-            # 后备默认模板
-            return "请分析以下用户的推文：\n\n用户信息：{user_info}\n\n推文内容：\n{tweet_content}\n\n请用中文总结要点。"
+        """获取用户的提示词模板原文"""
+        return self.template_engine.get(username).source
     
     def set_model(self, model: str):
         """动态设置使用的模型"""
@@ -275,6 +335,10 @@ class TwitterSummarizer:
             optimized["quoted_content"]["type"] = "original"
         else:
             optimized["type"] = "original"
+
+        # 被折叠的重复推文数量
+        if tweet.get('duplicate_count'):
+            optimized["duplicate_count"] = tweet['duplicate_count']
             
         return optimized
     
@@ -323,8 +387,8 @@ class TwitterSummarizer:
         if user_info:
             self._current_user = user_info
         
-        # 按时间排序
-        sorted_tweets = sorted(tweets, key=lambda x: x.get('created_at', ''), reverse=True)
+        # 折叠重复推文后按时间排序
+        sorted_tweets = sorted(self.deduplicator.collapse(tweets), key=lambda x: x.get('created_at', ''), reverse=True)
         
         # 转换为优化的嵌套结构
         optimized_tweets = []
@@ -358,6 +422,7 @@ class TwitterSummarizer:
         prepared_text += "- original_content: 转推的原始内容\n"
         prepared_text += "- quoted_content: 引用的推文内容\n"
         prepared_text += "- media: 媒体类型列表 (photo/video等)\n"
+        prepared_text += "- duplicate_count: 内容相同的推文（转推/复制）已合并为一条，此为合并前的条数\n"
         prepared_text += "- 为节省空间，已省略详细的互动数据\n\n"
         
         # 添加统计摘要
@@ -411,13 +476,9 @@ class TwitterSummarizer:
         return "\n\n".join(simple_tweets)
 
     
-    def generate_simple_prompt(self, tweets: List[Dict], user_info: Dict = None) -> str:
-        """生成简洁的用户自定义提示词"""
-
-        # 获取用户信息
+    def build_user_info_str(self, user_info: Dict = None) -> str:
+        """准备用户信息字符串（去除重复的用户数据）"""
         user_name = user_info.get('screen_name', '') if user_info else 'unknown'
-
-        # 准备用户信息字符串（去除重复的用户数据）
         user_info_str = f"用户名: @{user_name}"
         if user_info:
             if user_info.get('name'):
@@ -426,8 +487,10 @@ class TwitterSummarizer:
                 user_info_str += f"\n简介: {user_info['description']}"
             if user_info.get('followers_count'):
                 user_info_str += f"\n关注者: {user_info['followers_count']}"
+        return user_info_str
 
-        # 清理推文数据中的重复用户信息
+    def clean_tweets_for_prompt(self, tweets: List[Dict]) -> List[Dict]:
+        """清理推文数据中的重复用户信息"""
         cleaned_tweets = []
         for tweet in tweets:
             cleaned_tweet = tweet.copy()
@@ -445,25 +508,93 @@ class TwitterSummarizer:
                 # 保留引用推文作者信息，因为这是必要的
                 pass
             cleaned_tweets.append(cleaned_tweet)
+        return cleaned_tweets
 
-        # 使用原始推文数据的JSON格式
-        tweet_content = json.dumps(cleaned_tweets, ensure_ascii=False, indent=2)
-
-        # 获取用户的模板
-        template = self.get_user_template(user_name)
+    def render_user_prompt(self, user_name: str, user_info_str: str, tweet_content: str, **extra_fields: Any) -> str:
+        """用用户的编译模板填充提示词
 
-        # 只使用两个基本变量填充模板
-        prompt = template.format(
+        Args:
+            extra_fields: 额外字段（如 date、tweet_count），模板中未使用的字段会被忽略
+        """
+        template = self.template_engine.get(user_name)
+        return template.render(
             user_info=user_info_str,
-            tweet_content=tweet_content
+            tweet_content=tweet_content,
+            user_name=user_name,
+            **extra_fields
         )
 
-        return prompt
+    @staticmethod
+    def prompt_date(tweets: List[Dict]) -> str:
+        """模板中的日期字段：推文中最新的日期，没有可解析的日期时为今天"""
+        dates = sorted(filter(None, (tweet_date(t) for t in tweets)))
+        date = datetime.strptime(dates[-1], '%Y%m%d') if dates else datetime.now()
+        return date.strftime('%Y-%m-%d')
+
+    def prompt_token_budget(self) -> int:
+        """抽取式预筛选的token预算：PROMPT_TOKEN_BUDGET，未设置时按当前模型的分层总结输入量计算"""
+        budget = self.config["prompt_token_budget"]
+        return self.map_reduce.get_input_budget() if budget is None else budget
+
+    def select_prompt_tweets(self, tweets: List[Dict]) -> List[Dict]:
+        """重复推文折叠为一条并带 duplicate_count，超出预算时抽取式预筛选"""
+        return self.pre_summarizer.select(self.deduplicator.collapse(tweets), token_budget=self.prompt_token_budget())
+
+    def prepare_prompt_fields(self, tweets: List[Dict], user_info: Dict = None,
+                              preselected: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """准备模板字段，返回 (用户名, 字段)
+
+        Args:
+            preselected: 推文已经过 select_prompt_tweets，不再重复折叠和筛选
+        """
+        # 获取用户信息
+        user_name = user_info.get('screen_name', '') if user_info else 'unknown'
+
+        # 使用原始推文数据的JSON格式
+        if not preselected:
+            tweets = self.select_prompt_tweets(tweets)
+        return user_name, {
+            "user_info": self.build_user_info_str(user_info),
+            "tweet_content": json.dumps(self.clean_tweets_for_prompt(tweets), ensure_ascii=False, indent=2),
+            "date": self.prompt_date(tweets),
+            "tweet_count": len(tweets)
+        }
+
+    def generate_simple_prompt(self, tweets: List[Dict], user_info: Dict = None) -> str:
+        """生成简洁的用户自定义提示词"""
+        user_name, fields = self.prepare_prompt_fields(tweets, user_info)
+        return self.render_user_prompt(user_name, fields.pop("user_info"), fields.pop("tweet_content"), **fields)
+
+    def generate_prompt_messages(self, tweets: List[Dict], user_info: Dict = None,
+                                 preselected: bool = False) -> List[Dict[str, str]]:
+        """生成拆分后的消息：固定的模板指令(system) + 可变的用户数据(user)
+
+        同一模板的所有请求system消息完全相同，可命中服务端的prompt前缀缓存
+        """
+        user_name, fields = self.prepare_prompt_fields(tweets, user_info, preselected)
+        instructions, data = self.template_engine.get(user_name).render_split(user_name=user_name, **fields)
+        return [{"role": "system", "content": instructions}, {"role": "user", "content": data}]
+
+    @staticmethod
+    def messages_to_prompt(messages: List[Dict[str, str]]) -> str:
+        """把消息列表合并为单个prompt文本（用于归档、token估算和不支持多消息的后端）"""
+        return "\n\n".join(message["content"] for message in messages)
+
+    def pop_last_usage(self) -> Dict[str, int]:
+        """取出当前线程最近一次在线调用的token用量"""
+        usage = getattr(self._call_state, 'usage', None) or {}
+        self._call_state.usage = None
+        return usage
     
-    def save_prompt_to_file(self, prompt: str, summary_type: str, tweets: List[Dict], user_info: Dict = None) -> str:
-        """保存完整的LLM prompt到文件"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
+    @staticmethod
+    def compute_data_hash(tweets: List[Dict]) -> str:
+        """计算推文数据哈希（每次总结只计算一次，供prompt归档和结果元数据共用）"""
+        return hashlib.md5(str(tweets).encode()).hexdigest()[:8]
+
+    def save_prompt_to_file(self, prompt: str, summary_type: str, tweets: List[Dict], user_info: Dict = None,
+                            data_hash: Optional[str] = None, model: Optional[str] = None,
+                            usage: Optional[Dict[str, int]] = None) -> str:
+        """归档完整的LLM prompt（按内容哈希去重压缩存储），返回prompt哈希"""
         # 确定用户名标识
         if user_info and user_info.get('screen_name'):
             user_name = user_info.get('screen_name')
@@ -472,117 +603,151 @@ class TwitterSummarizer:
         else:
             user_name = 'unknown'
         
-        # 创建prompts目录（在crawler_data下）
-        prompts_dir = Path("crawler_data/prompts")
-        prompts_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 生成文件名
-        filename = f"{summary_type}_{user_name}_{timestamp}_prompt.txt"
-        filepath = prompts_dir / filename
-        
-        # 构建完整的prompt信息
-        user_display = f"@{user_name}" if user_name != 'mixed_users' else "混合用户数据"
-        full_prompt_content = f"""# LLM Prompt 保存记录
-生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-总结类型: {summary_type}
-用户: {user_display}
-推文数量: {len(tweets)}
-数据哈希: {hashlib.md5(str(tweets).encode()).hexdigest()[:8]}
-
-{'='*80}
-完整Prompt内容:
-{'='*80}
-
-{prompt}
-
-{'='*80}
-Prompt结束
-{'='*80}
-
-# 使用说明
-这个文件包含了发送给LLM的完整prompt内容，你可以：
-1. 直接复制到其他LLM服务（Claude、ChatGPT等）
-2. 调试和优化prompt结构
-3. 作为训练数据或示例使用
-4. 分析LLM输入输出的对应关系
-
-# 数据来源信息
-- 原始推文数据来源: {user_display}的推文时间线
-- 数据处理: 经过优化嵌套结构转换，便于LLM理解
-- 结构特点: 支持复杂的转推、引用、多层嵌套关系分析
-"""
-        
-        # 保存到文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(full_prompt_content)
-        
-        print(f"📝 完整prompt已保存: {filepath}")
-        return str(filepath)
+        return self.prompt_archive.store(
+            prompt,
+            user=user_name,
+            summary_type=summary_type,
+            model=model or self.custom_model or self.llm_config["default_model"],
+            data_hash=data_hash or self.compute_data_hash(tweets),
+            tweet_count=len(tweets),
+            usage=usage
+        )
     
-    def call_llm_api(self, prompt: str, model: str = None) -> str:
-        """调用LLM API生成总结 - 通过OpenRouter访问"""
+    def call_llm_api(self, prompt: str, model: str = None, messages: Optional[List[Dict[str, str]]] = None) -> str:
+        """调用当前总结后端生成总结
+
+        Args:
+            messages: 拆分后的消息（见 generate_prompt_messages），提供时优先于prompt
+
+        Raises:
+            RuntimeError: 在线服务的所有候选模型都调用失败
+        """
+        return self.backend.generate(prompt, model, messages=messages)
+
+    def call_remote_api(self, prompt: str, model: str = None, messages: Optional[List[Dict[str, str]]] = None) -> str:
+        """调用LLM API生成总结 - 通过OpenRouter访问
+
+        Raises:
+            RuntimeError: 所有候选模型都调用失败（不会用模拟内容冒充总结）
+        """
         
         if not self.api_key:
             print("⚠️ 未找到API密钥，使用模拟总结")
             return self.generate_mock_summary()
         
-        # 确保prompt是UTF-8字符串
-        if isinstance(prompt, str):
-            prompt = prompt.encode('utf-8', errors='ignore').decode('utf-8')
-        
-        # 模型优先级：方法参数 > 实例自定义 > 默认配置
-        target_model = model or self.custom_model or self.llm_config["default_model"]
-        models_to_try = [target_model] + self.llm_config["fallback_models"]
-        
+        # 复用进程级共享客户端（连接池在多次调用间保持）
         try:
-            from openai import OpenAI
+            client = get_llm_client(self.api_key)
         except ImportError:
             print("❌ 缺少openai库，请安装: pip install openai")
             return self.generate_mock_summary()
-            
-        # 创建OpenRouter客户端
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.api_key,
-        )
         
+        router = get_model_router()
+        models_to_try = self._models_to_try(model)
         print(f"📝 Prompt长度: {len(prompt)} 字符")
         
         # 尝试多个模型
+        last_error = None
         for i, current_model in enumerate(models_to_try):
+            if not router.begin_call(current_model):
+                print(f"⏭️ 模型 {current_model} 正在试探中，跳过")
+                continue
+            start_time = time.time()
             try:
                 print(f"🤖 尝试模型 [{i+1}/{len(models_to_try)}]: {current_model}")
                 
                 # 调用API
-                completion = client.chat.completions.create(
-                    extra_headers={
-                        "HTTP-Referer": "https://github.com/anthropics/claude-code", 
-                        "X-Title": "X-Tweet-Analysis-System",
-                    },
-                    model=current_model,
-                    messages=[
-                        {
-                            "role": "user", 
-                            "content": prompt
-                        }
-                    ],
-                    max_tokens=self.llm_config["max_tokens"],
-                    temperature=self.llm_config["temperature"]
-                )
+                completion = client.chat.completions.create(**self._completion_request(current_model, prompt, messages))
                 
-                result = completion.choices[0].message.content
-                print(f"✅ LLM响应完成: {len(result)} 字符 (模型: {current_model})")
+                result, usage = self._handle_completion(completion, current_model, time.time() - start_time)
+                self._call_state.usage = usage
                 return result
                 
             except Exception as e:
+                router.record_failure(current_model, e, time.time() - start_time)
+                last_error = e
                 error_msg = str(e).encode('utf-8', errors='ignore').decode('utf-8')
                 print(f"❌ 模型 {current_model} 失败: {error_msg}")
                 if i < len(models_to_try) - 1:
                     print(f"🔄 尝试备选模型...")
-                    continue
-                else:
-                    print(f"🔄 所有模型都失败，降级到模拟总结")
-                    return self.generate_mock_summary()
+            finally:
+                router.end_call(current_model)
+
+        raise RuntimeError(f"所有模型都调用失败: {last_error or '没有可用的模型'}")
+
+    async def acall_remote_api(self, prompt: str, model: str = None,
+                               messages: Optional[List[Dict[str, str]]] = None) -> Tuple[str, Dict[str, int]]:
+        """异步调用LLM API，返回 (总结文本, token用量)
+
+        与 call_remote_api 使用相同的模型路由和降级策略；任务被取消时立即抛出 CancelledError，不计入模型失败
+
+        Raises:
+            RuntimeError: 所有候选模型都调用失败
+        """
+        if not self.api_key:
+            print("⚠️ 未找到API密钥，使用模拟总结")
+            return self.generate_mock_summary(), {}
+
+        try:
+            client = get_async_llm_client(self.api_key)
+        except ImportError:
+            print("❌ 缺少openai库，请安装: pip install openai")
+            return self.generate_mock_summary(), {}
+
+        router = get_model_router()
+        models_to_try = self._models_to_try(model)
+        last_error = None
+        for i, current_model in enumerate(models_to_try):
+            if not router.begin_call(current_model):
+                print(f"⏭️ 模型 {current_model} 正在试探中，跳过")
+                continue
+            start_time = time.time()
+            try:
+                print(f"🤖 [async] 尝试模型 [{i+1}/{len(models_to_try)}]: {current_model}")
+                completion = await client.chat.completions.create(**self._completion_request(current_model, prompt, messages))
+                return self._handle_completion(completion, current_model, time.time() - start_time)
+            except Exception as e:
+                router.record_failure(current_model, e, time.time() - start_time)
+                last_error = e
+                error_msg = str(e).encode('utf-8', errors='ignore').decode('utf-8')
+                print(f"❌ 模型 {current_model} 失败: {error_msg}")
+            finally:
+                router.end_call(current_model)
+
+        raise RuntimeError(f"所有模型都调用失败: {last_error or '没有可用的模型'}")
+
+    def _models_to_try(self, model: Optional[str] = None) -> List[str]:
+        """模型优先级：方法参数 > 实例自定义 > 默认配置，按健康状况排序并跳过熔断中的模型"""
+        target_model = model or self.custom_model or self.llm_config["default_model"]
+        return get_model_router().order_models([target_model] + self.llm_config["fallback_models"])
+
+    def _completion_request(self, model: str, prompt: str, messages: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """构建chat.completions请求参数（同步/异步共用）"""
+        # 确保prompt是UTF-8字符串
+        if isinstance(prompt, str):
+            prompt = prompt.encode('utf-8', errors='ignore').decode('utf-8')
+        return {
+            "extra_headers": {
+                "HTTP-Referer": "https://github.com/anthropics/claude-code",
+                "X-Title": "X-Tweet-Analysis-System",
+            },
+            "model": model,
+            "messages": apply_prompt_cache(messages, model) if messages else [{"role": "user", "content": prompt}],
+            "max_tokens": self.llm_config["max_tokens"],
+            "temperature": self.llm_config["temperature"]
+        }
+
+    def _handle_completion(self, completion, model: str, elapsed: float) -> Tuple[str, Dict[str, int]]:
+        """记录成功调用并提取结果和token用量"""
+        result = completion.choices[0].message.content
+        get_model_router().record_success(model, elapsed)
+        print(f"✅ LLM响应完成: {len(result)} 字符 (模型: {model})")
+
+        usage = extract_usage(completion)
+        if usage.get("prompt_tokens"):
+            hit_rate = usage["cached_tokens"] / usage["prompt_tokens"]
+            print(f"💾 Prompt缓存命中: {usage['cached_tokens']}/{usage['prompt_tokens']} tokens ({hit_rate:.0%})")
+        return result, usage
     
     def generate_mock_summary(self) -> str:
         """生成模拟总结（当API不可用时使用）"""
@@ -632,17 +797,85 @@ Prompt结束
                 "metadata": {"tweet_count": 0}
             }
         
-        # 直接生成用户自定义提示词
-        prompt = self.generate_simple_prompt(tweets, user_info)
+        # 生成用户自定义提示词：固定指令与可变数据拆为两条消息，便于服务端缓存前缀
+        # 折叠和预筛选只做一次，prompt、分层总结和抽取式后端使用同一批推文
+        selected = self.select_prompt_tweets(tweets)
+        messages = self.generate_prompt_messages(selected, user_info, preselected=True)
+        prompt = self.messages_to_prompt(messages)
+        data_hash = self.compute_data_hash(tweets)
+        
+        # 调用LLM - 超出单次上下文预算时使用分层(map-reduce)总结
+        self.pop_last_usage()
+        if self.backend.supports_map_reduce and self.map_reduce.needs_map_reduce(prompt):
+            summary_text = self.map_reduce.summarize(selected, user_info)
+        else:
+            summary_text = self.backend.summarize_tweets(prompt, selected, user_info, messages=messages)
+        
+        # 归档完整的prompt及缓存命中情况
+        prompt_hash = self.save_prompt_to_file(
+            prompt, summary_type, tweets, user_info, data_hash=data_hash, usage=self.pop_last_usage()
+        )
         
-        # 保存完整的prompt到文件
-        self.save_prompt_to_file(prompt, summary_type, tweets, user_info)
+        result = self.build_summary_result(tweets, summary_type, user_info, summary_text, data_hash, prompt_hash)
         
-        # 调用LLM
-        summary_text = self.call_llm_api(prompt)
+        # 保存总结
+        self.save_summary(result)
         
-        # 构建结果
-        result = {
+        print(f"✅ 总结生成完成，包含{len(tweets)}条推文")
+        return result
+
+    async def agenerate_summary(self, tweets: List[Dict], summary_type: str = "daily", user_info: Dict = None,
+                                semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """generate_summary 的异步版本，可在asyncio服务中运行而不阻塞事件循环
+
+        - 在线后端使用 AsyncOpenAI；本地/抽取式后端和分层总结在线程中执行
+        - prompt构建（去重、抽取式预筛选）和文件写入在线程中执行
+        - semaphore: 多个任务共享的并发上限，只在调用LLM期间占用
+        - 任务取消时 CancelledError 直接向上抛出，不会写入归档和总结文件
+        - AsyncOpenAI客户端按事件循环缓存，事件循环结束前调用 llm_client.aclose_llm_clients() 释放连接
+
+        Returns:
+            与 generate_summary 相同结构的结果字典
+        """
+        print(f"🤖 [async] 开始生成{summary_type}总结...")
+
+        if not tweets:
+            return {
+                "error": "没有推文数据可供总结",
+                "summary": "",
+                "metadata": {"tweet_count": 0}
+            }
+
+        selected = await asyncio.to_thread(self.select_prompt_tweets, tweets)
+        messages = await asyncio.to_thread(self.generate_prompt_messages, selected, user_info, True)
+        prompt = self.messages_to_prompt(messages)
+        data_hash = self.compute_data_hash(tweets)
+
+        async with (semaphore or contextlib.nullcontext()):
+            if self.backend.supports_map_reduce and self.map_reduce.needs_map_reduce(prompt):
+                summary_text = await asyncio.to_thread(self.map_reduce.summarize, selected, user_info)
+                usage = {}
+            elif self.backend.name == "openrouter":
+                summary_text, usage = await self.acall_remote_api(prompt, messages=messages)
+            else:
+                summary_text = await asyncio.to_thread(
+                    self.backend.summarize_tweets, prompt, selected, user_info, None, messages
+                )
+                usage = {}
+
+        prompt_hash = await asyncio.to_thread(
+            self.save_prompt_to_file, prompt, summary_type, tweets, user_info, data_hash, None, usage
+        )
+        result = self.build_summary_result(tweets, summary_type, user_info, summary_text, data_hash, prompt_hash)
+        await asyncio.to_thread(self.save_summary, result)
+
+        print(f"✅ [async] 总结生成完成，包含{len(tweets)}条推文")
+        return result
+
+    def build_summary_result(self, tweets: List[Dict], summary_type: str, user_info: Optional[Dict],
+                             summary_text: str, data_hash: str, prompt_hash: str) -> Dict[str, Any]:
+        """构建总结结果字典（同步/异步共用）"""
+        return {
             "summary_type": summary_type,
             "generation_time": datetime.now().isoformat(),
             "tweet_count": len(tweets),
@@ -651,16 +884,11 @@ Prompt结束
                 "original_tweets": len([t for t in tweets if not t.get('retweet')]),
                 "retweets": len([t for t in tweets if t.get('retweet')]),
                 "media_tweets": len([t for t in tweets if t.get('media')]),
-                "data_hash": hashlib.md5(str(tweets).encode()).hexdigest()[:8],
+                "data_hash": data_hash,
+                "prompt_hash": prompt_hash,
                 "user": user_info.get('screen_name') if user_info and user_info.get('screen_name') else ('mixed_users' if summary_type.endswith('_mixed') else 'unknown')
             }
         }
-        
-        # 保存总结
-        self.save_summary(result)
-        
-        print(f"✅ 总结生成完成，包含{len(tweets)}条推文")
-        return result
     
     def save_summary(self, summary_data: Dict[str, Any], format_type: str = "json") -> str:
         """保存总结到文件 - 仅用于测试"""
@@ -688,23 +916,40 @@ Prompt结束
         print(f"💾 总结已保存: {filepath}")
         return str(filepath)
     
-    def generate_trending_summary(self, tweets: List[Dict], user_info: Dict = None) -> Dict[str, Any]:
-        """生成热门话题总结"""
-        # 按互动数据排序
-        trending_tweets = sorted(
-            tweets, 
-            key=lambda x: x.get('stats', {}).get('favorite_count', 0) + 
-                         x.get('stats', {}).get('retweet_count', 0), 
-            reverse=True
-        )
+    def generate_trending_summary(self, tweets: List[Dict], user_info: Dict = None, top_k: int = 20) -> Dict[str, Any]:
+        """生成热门话题总结 - 按时间衰减、粉丝归一化后的互动热度选取top-k"""
+        from trending import TrendingEngine
         
-        return self.generate_summary(trending_tweets[:20], "trending", user_info)
+        trending_tweets = TrendingEngine().top_k(tweets, top_k, user=user_info)
+        return self.generate_summary(trending_tweets, "trending", user_info)
+    
+    def generate_window_trending_summary(self, end_date: str, days: int = 7, top_k: int = 20) -> Dict[str, Any]:
+        """生成滚动窗口（默认最近7天daily_posts）的热门话题总结（python trending.py --days 7 --summary）"""
+        from trending import TrendingEngine
+        
+        trending_tweets = TrendingEngine().top_k_window(end_date, days, top_k)
+        return self.generate_summary(trending_tweets, "trending_mixed")
+    
+    def get_category_keywords(self, category: str, user_info: Dict = None) -> List[str]:
+        """获取分类关键词：预置分类 > 同名/同类型的用户分析配置 > 当前用户的分析配置"""
+        if category in self.category_keywords:
+            return self.category_keywords[category]
+        
+        for name, profile in self.user_analysis_profiles.items():
+            if category in (name, profile.get('type')):
+                return profile.get('keywords', [])
+        
+        user_name = user_info.get('screen_name') if user_info else None
+        profile = self.user_analysis_profiles.get(user_name) or self.user_analysis_profiles['default']
+        return profile.get('keywords', [])
     
     def generate_category_summary(self, tweets: List[Dict], category: str = "tech", user_info: Dict = None) -> Dict[str, Any]:
-        """生成分类总结"""
-        # 这里可以添加分类逻辑，根据关键词或其他特征筛选推文
-        # 暂时使用全部推文
-        return self.generate_summary(tweets, f"{category}_category", user_info)
+        """生成分类总结 - 通过倒排索引只挑选命中分类关键词的推文"""
+        keywords = self.get_category_keywords(category, user_info)
+        selected_tweets = self.tweet_index.select_tweets(tweets, keywords)
+        print(f"🏷️ 分类 {category}: {len(selected_tweets)}/{len(tweets)} 条推文命中关键词")
+        
+        return self.generate_summary(selected_tweets, f"{category}_category", user_info)
 
 def main():
     """测试总结功能"""
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+总结后端 - 统一的LLM调用接口，支持在线与离线推理
+- openrouter: OpenAI兼容的在线服务（默认，需要API密钥）
+- llamacpp: 本地CPU推理GGUF模型（可选依赖 llama-cpp-python，见 requirements-local.txt）
+- extractive: 抽取式总结，无需模型，适合离线/无密钥环境
+通过环境变量 LLM_BACKEND 选择，默认 auto：有密钥用在线服务，配置了本地模型用llama.cpp，否则用抽取式
+"""
+
+import importlib.util
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from extractive import ExtractiveSummarizer
+
+# (模型路径, 上下文长度, 线程数) -> 已加载的 Llama 实例
+_loaded_models: Dict[Tuple[str, int, int], Any] = {}
+_models_lock = threading.Lock()
+
+
+def load_llama_model(model_path: str, n_ctx: int, n_threads: int):
+    """加载GGUF模型（进程内缓存，同一模型只加载一次）
+
+    Raises:
+        ImportError: 未安装llama-cpp-python
+    """
+    key = (model_path, n_ctx, n_threads)
+    with _models_lock:
+        model = _loaded_models.get(key)
+        if model is None:
+            from llama_cpp import Llama
+
+            start_time = time.time()
+            model = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+            _loaded_models[key] = model
+            print(f"📦 已加载本地模型: {os.path.basename(model_path)} ({time.time() - start_time:.1f}秒)")
+    return model
+
+
+class SummaryBackend:
+    """总结后端基类"""
+    name = "base"
+    # 模型上下文窗口(token)，None表示按模型名查表
+    context_window: Optional[int] = None
+
+    @property
+    def supports_map_reduce(self) -> bool:
+        """超长输入是否走分层总结"""
+        return True
+
+    def generate(self, prompt: str, model: Optional[str] = None, messages: Optional[List[Dict]] = None) -> str:
+        """生成总结；messages 为拆分后的消息（固定指令 + 可变数据），提供时优先使用"""
+        raise NotImplementedError
+
+    def generate_batch(self, prompts: List[str], model: Optional[str] = None) -> List[str]:
+        """批量生成，结果与输入顺序一致"""
+        return [self.generate(prompt, model) for prompt in prompts]
+
+    def summarize_tweets(self, prompt: str, tweets: List[Dict], user_info: Dict = None,
+                         model: Optional[str] = None, messages: Optional[List[Dict]] = None) -> str:
+        """总结一组推文，默认直接使用已渲染好的prompt"""
+        return self.generate(prompt, model, messages=messages)
+
+
+class OpenRouterBackend(SummaryBackend):
+    """OpenAI兼容的在线服务（OpenRouter等）"""
+    name = "openrouter"
+
+    def __init__(self, summarizer, max_workers: int = 4):
+        self.summarizer = summarizer
+        self.max_workers = max_workers
+
+    @property
+    def supports_map_reduce(self) -> bool:
+        # 没有密钥时只会返回模拟总结，分块没有意义
+        return bool(self.summarizer.api_key)
+
+    def generate(self, prompt: str, model: Optional[str] = None, messages: Optional[List[Dict]] = None) -> str:
+        return self.summarizer.call_remote_api(prompt, model, messages=messages)
+
+    def generate_batch(self, prompts: List[str], model: Optional[str] = None) -> List[str]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda prompt: self.generate(prompt, model), prompts))
+
+
+class LlamaCppBackend(SummaryBackend):
+    """本地CPU推理（llama.cpp / GGUF）"""
+    name = "llamacpp"
+
+    def __init__(self, model_path: str, n_ctx: int = 8192, n_threads: Optional[int] = None,
+                 max_tokens: int = 2000, temperature: float = 0.7):
+        """
+        初始化本地推理后端（模型在第一次生成时才加载）
+
+        Args:
+            model_path: GGUF模型文件路径
+            n_ctx: 上下文长度
+            n_threads: 推理线程数，默认使用全部CPU核心
+            max_tokens: 单次生成的最大token数
+            temperature: 采样温度
+        """
+        self.model_path = model_path
+        self.context_window = n_ctx
+        self.n_threads = n_threads or os.cpu_count() or 4
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        # llama.cpp 实例不是线程安全的，同一模型的调用串行执行
+        self._generate_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return load_llama_model(self.model_path, self.context_window, self.n_threads)
+
+    def generate(self, prompt: str, model: Optional[str] = None, messages: Optional[List[Dict]] = None) -> str:
+        llm = self.model
+        with self._generate_lock:
+            start_time = time.time()
+            completion = llm.create_chat_completion(
+                messages=messages or [{"role": "user", "content": prompt}],
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            )
+        result = completion["choices"][0]["message"]["content"]
+        generated_tokens = completion.get("usage", {}).get("completion_tokens", 0)
+        elapsed = time.time() - start_time
+        print(f"✅ 本地模型响应完成: {len(result)} 字符 ({generated_tokens / max(elapsed, 1e-6):.1f} tokens/秒)")
+        return result
+
+    def generate_batch(self, prompts: List[str], model: Optional[str] = None) -> List[str]:
+        """本地推理受CPU限制，按顺序复用同一个已加载模型"""
+        results = []
+        start_time = time.time()
+        for i, prompt in enumerate(prompts, 1):
+            print(f"🖥️ 本地批量生成 [{i}/{len(prompts)}]")
+            results.append(self.generate(prompt, model))
+        print(f"📊 本地批量完成: {len(prompts)} 个请求, 用时 {time.time() - start_time:.1f}秒")
+        return results
+
+
+class ExtractiveBackend(SummaryBackend):
+    """抽取式总结，不依赖任何模型"""
+    name = "extractive"
+    TEXT_FIELD_PATTERN = re.compile(r'"(?:text|full_text)":\s*("(?:[^"\\]|\\.)*")')
+
+    def __init__(self, max_sentences: int = 12):
+        self.extractor = ExtractiveSummarizer(max_sentences=max_sentences)
+
+    @property
+    def supports_map_reduce(self) -> bool:
+        return False
+
+    def generate(self, prompt: str, model: Optional[str] = None, messages: Optional[List[Dict]] = None) -> str:
+        """只有prompt时，优先抽取其中推文JSON的正文，否则对全文做抽取"""
+        texts = [json.loads(match) for match in self.TEXT_FIELD_PATTERN.findall(prompt)]
+        return self.extractor.summarize_text("\n".join(texts) if texts else prompt)
+
+    def summarize_tweets(self, prompt: str, tweets: List[Dict], user_info: Dict = None,
+                         model: Optional[str] = None, messages: Optional[List[Dict]] = None) -> str:
+        return self.extractor.summarize_tweets(tweets, user_info)
+
+
+def create_summary_backend(summarizer, name: Optional[str] = None) -> SummaryBackend:
+    """按名称（或环境变量 LLM_BACKEND）创建总结后端
+
+    Raises:
+        ValueError: 未知的后端名称，或llamacpp后端缺少模型路径
+    """
+    name = (name or os.getenv('LLM_BACKEND') or 'auto').lower()
+    model_path = os.getenv('LLM_LOCAL_MODEL_PATH')
+
+    if name == 'auto':
+        if summarizer.api_key:
+            name = 'openrouter'
+        elif model_path and os.path.exists(model_path) and importlib.util.find_spec('llama_cpp'):
+            name = 'llamacpp'
+        else:
+            name = 'extractive'
+
+    if name == 'openrouter':
+        return OpenRouterBackend(summarizer)
+    if name == 'llamacpp':
+        if not model_path:
+            raise ValueError("llamacpp后端需要设置 LLM_LOCAL_MODEL_PATH (GGUF模型文件路径)")
+        return LlamaCppBackend(
+            model_path,
+            n_ctx=int(os.getenv('LLM_LOCAL_CTX', '8192')),
+            n_threads=int(os.getenv('LLM_LOCAL_THREADS', '0')) or None,
+            max_tokens=summarizer.llm_config["max_tokens"],
+            temperature=summarizer.llm_config["temperature"]
+        )
+    if name == 'extractive':
+        return ExtractiveBackend()
+    raise ValueError(f"未知的总结后端: {name} (可选: auto, openrouter, llamacpp, extractive)")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+用户总结清单 - 记录每个 (用户, 日期) 总结的输入指纹
+指纹包括：推文id集合哈希、模板哈希、模型（及后端）
+只有输入发生变化的用户才需要重新生成总结；晚到的推文会改变id集合，从而精确触发重算
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class SummaryManifest:
+    def __init__(self, manifest_file: Optional[str] = None):
+        """
+        初始化总结清单
+
+        Args:
+            manifest_file: 清单文件路径，默认 DATA_DIR/user_summaries/manifest.json
+        """
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        self.manifest_file = Path(manifest_file) if manifest_file else data_dir / "user_summaries" / "manifest.json"
+        # "用户/日期" -> 指纹及生成信息
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    @staticmethod
+    def _key(user: str, date: str) -> str:
+        return f"{user}/{date}"
+
+    def load(self):
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('entries', {})
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"⚠️ 总结清单读取失败，将重新记录: {e}")
+                self.entries = {}
+
+    def save(self):
+        """原子写入清单"""
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "entries": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    @staticmethod
+    def fingerprint(tweets: List[Dict], template: str, model: str, backend: str = "openrouter") -> Dict[str, str]:
+        """计算总结输入的指纹"""
+        tweet_ids = sorted(str(t.get('id')) for t in tweets if t.get('id'))
+        return {
+            "tweet_ids_hash": hashlib.sha1("\n".join(tweet_ids).encode('utf-8')).hexdigest(),
+            "template_hash": hashlib.sha1(template.encode('utf-8')).hexdigest(),
+            "model": model,
+            "backend": backend
+        }
+
+    def changed_fields(self, user: str, date: str, fingerprint: Dict[str, str]) -> List[str]:
+        """与上次记录相比发生变化的指纹字段（无记录时返回 ['new']）"""
+        entry = self.entries.get(self._key(user, date))
+        if entry is None:
+            return ['new']
+        return [field for field, value in fingerprint.items() if entry.get(field) != value]
+
+    def record(self, user: str, date: str, fingerprint: Dict[str, str], tweet_count: int, summary_file: str):
+        self.entries[self._key(user, date)] = {
+            **fingerprint,
+            "tweet_count": tweet_count,
+            "summary_file": summary_file,
+            "generated_at": datetime.now().isoformat(timespec='seconds')
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+提示词模板引擎 - 加载时预编译模板，渲染时只做字符串拼接
+- 模板在加载时切分为 字面量/字段 片段，渲染不再调用 str.format
+- 只有 {标识符} 形式且属于可用字段的才会被替换，其余花括号（如JSON示例）按原样保留
+- {{ 和 }} 与 str.format 一致，表示字面量花括号
+- 模板配置中的 "fields" 为静态字段，编译时直接折叠进字面量
+- 模板文件修改后自动重新加载（按mtime检测），长期运行的进程无需重启
+- render_split 把模板拆为固定的指令消息和可变的数据消息，便于服务端缓存prompt前缀
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+# 渲染时由总结器提供的动态字段
+DYNAMIC_FIELDS = frozenset({"user_info", "tweet_content", "user_name", "date", "tweet_count"})
+
+# 拆分消息时字段在数据消息中的标题
+FIELD_LABELS = {
+    "user_info": "用户信息",
+    "tweet_content": "推文数据",
+    "user_name": "用户名",
+    "date": "日期",
+    "tweet_count": "推文数量"
+}
+
+FALLBACK_TEMPLATE = "请分析以下用户的推文：\n\n用户信息：{user_info}\n\n推文内容：\n{tweet_content}\n\n请用中文总结要点。"
+
+TOKEN_PATTERN = re.compile(r'\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+
+class CompiledTemplate:
+    def __init__(self, source: str, name: str = "default", static_fields: Optional[Dict[str, Any]] = None,
+                 dynamic_fields: FrozenSet[str] = DYNAMIC_FIELDS):
+        """
+        编译模板
+
+        Args:
+            source: 模板原文
+            name: 模板名（用户名或default）
+            static_fields: 静态字段值，编译时直接替换
+            dynamic_fields: 渲染时允许提供的字段
+        """
+        self.source = source
+        self.name = name
+        self.unknown_fields: List[str] = []
+        static_fields = {key: str(value) for key, value in (static_fields or {}).items()}
+
+        # 片段: str 为字面量，(字段名,) 为待填充字段；相邻字面量合并
+        segments: List[Union[str, Tuple[str]]] = []
+        literal: List[str] = []
+        position = 0
+        for match in TOKEN_PATTERN.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+            token, field = match.group(0), match.group(1)
+            if field is None:
+                literal.append(token[0])
+            elif field in static_fields:
+                literal.append(static_fields[field])
+            elif field in dynamic_fields:
+                segments.append("".join(literal))
+                literal = []
+                segments.append((field,))
+            else:
+                self.unknown_fields.append(field)
+                literal.append(token)
+        literal.append(source[position:])
+        segments.append("".join(literal))
+
+        self.segments = [segment for segment in segments if segment != ""]
+        self.fields = frozenset(segment[0] for segment in self.segments if isinstance(segment, tuple))
+        # 第一个字段之前的固定文本（不随输入变化）
+        self.static_prefix = self.segments[0] if self.segments and isinstance(self.segments[0], str) else ""
+        self._split_instructions: Optional[str] = None
+
+    def render(self, **values: Any) -> str:
+        """填充字段，缺少的字段渲染为空字符串"""
+        return "".join(
+            segment if isinstance(segment, str) else str(values.get(segment[0], ""))
+            for segment in self.segments
+        )
+
+    def render_split(self, **values: Any) -> Tuple[str, str]:
+        """拆分渲染: (固定指令, 可变数据)
+
+        指令部分中的字段替换为对数据部分的引用，因此同一模板的所有请求指令完全相同，
+        可被服务端作为公共前缀缓存；数据部分按字段在模板中出现的顺序排列。
+        """
+        if self._split_instructions is None:
+            self._split_instructions = "".join(
+                segment if isinstance(segment, str) else f"〔{FIELD_LABELS.get(segment[0], segment[0])}，见下方数据〕"
+                for segment in self.segments
+            )
+
+        ordered_fields = dict.fromkeys(segment[0] for segment in self.segments if isinstance(segment, tuple))
+        data = "\n\n".join(
+            f"## {FIELD_LABELS.get(field, field)}\n{values.get(field, '')}" for field in ordered_fields
+        )
+        return self._split_instructions, data
+
+
+class TemplateEngine:
+    def __init__(self, template_file: str = "user_prompt_templates.json", check_interval: float = 1.0):
+        """
+        初始化模板引擎
+
+        Args:
+            template_file: 用户模板配置文件
+            check_interval: 检查文件变化的最小间隔（秒）
+        """
+        self.template_file = Path(template_file)
+        self.check_interval = check_interval
+        self.configs: Dict[str, Dict[str, Any]] = {}
+        self.compiled: Dict[str, CompiledTemplate] = {}
+        self.fallback = CompiledTemplate(FALLBACK_TEMPLATE, name="fallback")
+
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return self.template_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """模板文件变化时重新加载并编译，返回是否重新加载"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+
+        with self._lock:
+            self._last_check = now
+            mtime = self._current_mtime()
+            if not force and mtime == self._mtime:
+                return False
+            self._mtime = mtime
+
+            if mtime is None:
+                print("📝 用户提示词模板文件不存在，使用默认模板")
+                self.configs, self.compiled = {}, {}
+                return True
+
+            try:
+                with open(self.template_file, 'r', encoding='utf-8') as f:
+                    configs = json.load(f)
+                # 跳过 "_comment" 等非模板条目
+                compiled = {
+                    name: CompiledTemplate(config['template'], name=name, static_fields=config.get('fields'))
+                    for name, config in configs.items()
+                    if isinstance(config, dict) and isinstance(config.get('template'), str)
+                }
+            except Exception as e:
+                error_msg = str(e).encode('utf-8', errors='ignore').decode('utf-8')
+                print(f"⚠️ 加载用户提示词模板失败，保留已加载的模板: {error_msg}")
+                return False
+
+            for template in compiled.values():
+                if template.unknown_fields:
+                    print(f"⚠️ 模板 {template.name} 包含未知字段 {template.unknown_fields}，将按原文保留")
+                if "tweet_content" not in template.fields:
+                    print(f"⚠️ 模板 {template.name} 缺少 {{tweet_content}} 字段，推文不会出现在prompt中")
+
+            self.configs, self.compiled = configs, compiled
+            print(f"📝 已加载用户提示词模板: {len(compiled)} 个")
+            return True
+
+    def get(self, username: str) -> CompiledTemplate:
+        """获取用户的编译模板：用户专属 > default > 内置后备"""
+        self.reload_if_changed()
+        compiled = self.compiled
+        return compiled.get(username) or compiled.get('default') or self.fallback
+
+
+# 模板文件路径 -> 模板引擎（进程内共享，多个总结器实例不重复加载）
+_engines: Dict[str, TemplateEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_template_engine(template_file: str = "user_prompt_templates.json") -> TemplateEngine:
+    key = os.path.abspath(template_file)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = TemplateEngine(template_file)
+            _engines[key] = engine
+    return engine
@@ -0,0 +1,28 @@
+"""凭据池：等待额度时响应停止信号"""
+
+import threading
+import time
+
+from account_pool import Account, CredentialPool
+
+
+def test_acquire_returns_none_when_stopped_while_waiting():
+    account = Account("a", {}, session=None, requests_per_hour=10)
+    account.cooldown_until = time.time() + 3600
+    pool = CredentialPool([account])
+    stop_event = threading.Event()
+    threading.Timer(0.1, stop_event.set).start()
+
+    start_time = time.time()
+    assert pool.acquire(stop_event=stop_event) is None
+    assert time.time() - start_time < 5
+
+
+def test_acquire_prefers_cursor_account():
+    first = Account("a", {}, session=None, requests_per_hour=10)
+    second = Account("b", {}, session=None, requests_per_hour=10)
+    pool = CredentialPool([first, second])
+
+    assert pool.acquire() is first
+    assert pool.acquire(preferred=first) is first
+    assert pool.acquire() is second
@@ -0,0 +1,101 @@
+"""Batch API 批量总结：用内存中的假供应商模拟 files/batches 接口"""
+
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from batch_summarizer import BatchSummaryRunner
+
+
+class FakeBatchProvider:
+    """按顺序返回预设状态的批处理供应商，完成后按custom_id生成输出文件"""
+
+    def __init__(self, statuses, failed_ids=()):
+        self.statuses = list(statuses)
+        self.failed_ids = set(failed_ids)
+        self.uploaded = []
+        self.cancelled = []
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve, cancel=self._cancel)
+
+    def _create_file(self, file, purpose):
+        self.uploaded = [json.loads(line) for line in file.read().decode().splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def _create_batch(self, input_file_id, endpoint, completion_window, metadata):
+        return SimpleNamespace(id="batch-1")
+
+    def _retrieve(self, batch_id):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        done = status == "completed"
+        return SimpleNamespace(
+            id=batch_id, status=status,
+            request_counts=SimpleNamespace(completed=len(self.uploaded) if done else 0, total=len(self.uploaded)),
+            output_file_id="file-out" if done else None,
+            error_file_id="file-err" if done and self.failed_ids else None
+        )
+
+    def _cancel(self, batch_id):
+        self.cancelled.append(batch_id)
+        return SimpleNamespace(id=batch_id, status="cancelling")
+
+    def _file_content(self, file_id):
+        lines = []
+        for line in self.uploaded:
+            failed = line["custom_id"] in self.failed_ids
+            if (file_id == "file-err") != failed:
+                continue
+            if failed:
+                response = {"status_code": 500, "body": {"error": {"message": "server error"}}}
+            else:
+                content = f"总结 {line['custom_id']} ({line['body']['model']})"
+                response = {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}
+            lines.append(json.dumps({"custom_id": line["custom_id"], "response": response}))
+        return SimpleNamespace(text="\n".join(lines))
+
+
+@pytest.fixture
+def summarizer():
+    return SimpleNamespace(api_key="sk-or-openrouter", custom_model=None,
+                           llm_config={"default_model": "openai/gpt-4o", "max_tokens": 100, "temperature": 0.7})
+
+
+def test_run_returns_results_and_marks_failed_requests(summarizer, tmp_path):
+    provider = FakeBatchProvider(["validating", "in_progress", "completed"], failed_ids={"bob"})
+    runner = BatchSummaryRunner(summarizer, client=provider, poll_interval=0, batch_dir=str(tmp_path))
+
+    results = runner.run({"alice": "prompt a", "bob": "prompt b"},
+                         {"alice": [{"role": "system", "content": "指令"}, {"role": "user", "content": "数据"}]})
+
+    assert results == {"alice": "总结 alice (gpt-4o)", "bob": None}
+    assert provider.uploaded[0]["body"]["messages"][0]["role"] == "system"
+    assert provider.uploaded[1]["body"]["messages"] == [{"role": "user", "content": "prompt b"}]
+
+
+def test_stop_event_cancels_batch(summarizer, tmp_path):
+    provider = FakeBatchProvider(["in_progress"])
+    stop_event = threading.Event()
+    stop_event.set()
+    runner = BatchSummaryRunner(summarizer, client=provider, poll_interval=3600, batch_dir=str(tmp_path),
+                                stop_event=stop_event)
+
+    assert runner.run({"alice": "prompt a"}) == {}
+    assert provider.cancelled == ["batch-1"]
+
+
+def test_timeout_cancels_batch(summarizer, tmp_path):
+    provider = FakeBatchProvider(["in_progress"])
+    runner = BatchSummaryRunner(summarizer, client=provider, poll_interval=3600, max_wait=0, batch_dir=str(tmp_path))
+
+    assert runner.run({"alice": "prompt a"}) == {}
+    assert provider.cancelled == ["batch-1"]
+
+
+def test_openrouter_key_is_not_used_for_batch_api(summarizer, monkeypatch):
+    monkeypatch.delenv("LLM_BATCH_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    with pytest.raises(RuntimeError, match="LLM_BATCH_API_KEY"):
+        BatchSummaryRunner(summarizer).client
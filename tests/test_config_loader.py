@@ -0,0 +1,23 @@
+"""配置加载器：局部写回配置文件时不泄露环境变量中的值"""
+
+import json
+
+from config_loader import ConfigLoader
+
+
+def test_save_section_keeps_env_values_out_of_config_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENROUTER_API_KEY", "sk-secret")
+    monkeypatch.setenv("X_AUTH_TOKEN_2", "second-token")
+    monkeypatch.setenv("X_CT0_TOKEN_2", "second-ct0")
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"settings": {"requests_per_hour": 100}}), encoding="utf-8")
+
+    loader = ConfigLoader(str(config_file))
+    auth = {"cookies": {"auth_token": "a", "ct0": "c"}, "headers": {"Authorization": "Bearer x"}}
+    loader.save_section("authentication", auth)
+
+    saved = json.loads(config_file.read_text(encoding="utf-8"))
+    assert saved == {"settings": {"requests_per_hour": 100}, "authentication": auth}
+    assert "sk-secret" not in config_file.read_text(encoding="utf-8")
+    assert loader.get("authentication") == auth
@@ -0,0 +1,18 @@
+"""常驻服务：推文id记录只保留今天和昨天"""
+
+from datetime import datetime, timedelta
+
+from crawl_service import CrawlService
+
+
+def test_seen_ids_keep_only_today_and_yesterday(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    service = CrawlService(summary_hour=None)
+    start = datetime(2025, 1, 1, 12)
+
+    service.remember_ids({"1", "2"}, start)
+    service.remember_ids({"3"}, start + timedelta(days=1))
+    assert set(service.seen_ids) == {"20250101", "20250102"}
+
+    service.remember_ids({"4"}, start + timedelta(days=2))
+    assert service.seen_ids == {"20250102": {"3"}, "20250103": {"4"}}
@@ -0,0 +1,53 @@
+"""全局日报：超出预算的用户总结按比例截断，预算按总结后端的上下文窗口计算"""
+
+from types import SimpleNamespace
+
+from daily_digest import DailyDigestBuilder
+from map_reduce_summarizer import estimate_tokens
+
+
+def make_builder(tmp_path, context_window=None, model="openai/gpt-4o"):
+    summarizer = SimpleNamespace(
+        custom_model=model, llm_config={"default_model": model},
+        backend=SimpleNamespace(context_window=context_window)
+    )
+    return DailyDigestBuilder(summarizer=summarizer, data_dir=str(tmp_path), context_ratio=0.5)
+
+
+def sections(prompt):
+    """prompt中各用户总结的正文（去掉标题和截断标记）"""
+    return {
+        section.split("\n", 1)[0][len("### @"):]: section.split("\n", 1)[1].removesuffix("\n...")
+        for section in prompt.split("\n\n") if section.startswith("### @")
+    }
+
+
+def test_summaries_within_budget_are_kept_whole(tmp_path):
+    summaries = {"alice": "a" * 400, "bob": "b" * 800}
+
+    assert sections(make_builder(tmp_path, context_window=8192).build_prompt("20250301", summaries)) == summaries
+
+
+def test_over_budget_summaries_are_trimmed_to_budget(tmp_path):
+    summaries = {"alice": "a" * 8000, "bob": "b" * 24000, "carol": "c" * 4000}
+    budget = 2000 * 0.5
+
+    kept = sections(make_builder(tmp_path, context_window=2000).build_prompt("20250301", summaries))
+
+    assert set(kept) == set(summaries)
+    assert all(summaries[user].startswith(text) for user, text in kept.items())
+    # 每段按字符比例截断，整数取整每段最多多出1 token
+    assert sum(estimate_tokens(text) for text in kept.values()) < budget + len(summaries)
+    # 各段保留相同的比例
+    ratios = [len(kept[user]) / len(summaries[user]) for user in summaries]
+    assert max(ratios) - min(ratios) < 0.001
+
+
+def test_budget_follows_local_backend_context_window(tmp_path):
+    summaries = {f"user{i}": "x" * 20000 for i in range(4)}
+
+    online_prompt = make_builder(tmp_path).build_prompt("20250301", summaries)
+    local_prompt = make_builder(tmp_path, context_window=8192).build_prompt("20250301", summaries)
+
+    assert estimate_tokens(online_prompt) > 20000
+    assert estimate_tokens(local_prompt) < 8192 * 0.5 + 200
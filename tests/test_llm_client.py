@@ -0,0 +1,31 @@
+"""异步LLM客户端按事件循环缓存"""
+
+import asyncio
+
+import pytest
+
+import llm_client
+
+pytest.importorskip("openai")
+pytest.importorskip("httpx")
+
+
+def test_async_clients_are_per_loop_and_closed_loops_are_dropped():
+    async def get_client():
+        return llm_client.get_async_llm_client("key", "http://127.0.0.1:9")
+
+    async def get_and_close():
+        client = llm_client.get_async_llm_client("key", "http://127.0.0.1:9")
+        same = llm_client.get_async_llm_client("key", "http://127.0.0.1:9")
+        await llm_client.aclose_llm_clients()
+        return client, same
+
+    first_loop = asyncio.new_event_loop()
+    first = first_loop.run_until_complete(get_client())
+    first_loop.close()
+
+    second, same = asyncio.run(get_and_close())
+    assert second is same
+    assert second is not first
+    assert first_loop not in llm_client._async_clients
+    assert len(llm_client._async_clients) == 0
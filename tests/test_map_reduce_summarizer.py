@@ -0,0 +1,97 @@
+"""分层总结：失败的分块不进入reduce，reduce提示词带日期和推文数，预筛选后超出单块预算的仍走分层总结"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from extractive import ExtractivePreSummarizer
+from map_reduce_summarizer import MapReduceSummarizer
+from summarizer import TwitterSummarizer
+
+
+def make_summarizer(fail_chunks):
+    rendered = {}
+
+    def call_llm_api(prompt, model=None):
+        if prompt.startswith("REDUCE"):
+            return "最终总结"
+        if any(f"第 {index}/" in prompt for index in fail_chunks):
+            raise RuntimeError("所有模型都调用失败")
+        return f"摘要 {prompt.split('第 ')[1].split('/')[0]}"
+
+    def render_user_prompt(user_name, user_info_str, tweet_content, **extra_fields):
+        rendered.update(tweet_content=tweet_content, **extra_fields)
+        return "REDUCE"
+
+    summarizer = SimpleNamespace(
+        custom_model="test/model", llm_config={"default_model": "test/model"},
+        backend=SimpleNamespace(context_window=None),
+        call_llm_api=call_llm_api, render_user_prompt=render_user_prompt,
+        clean_tweets_for_prompt=lambda tweets: tweets,
+        build_user_info_str=lambda user_info: "",
+        prompt_date=TwitterSummarizer.prompt_date
+    )
+    return summarizer, rendered
+
+
+def make_tweets(count):
+    return [{"id": str(i), "text": "x" * 200, "created_at": f"Sat Mar 01 {i:02d}:00:00 +0000 2025"} for i in range(count)]
+
+
+def test_failed_chunks_are_dropped_and_reduce_gets_date_and_count():
+    summarizer, rendered = make_summarizer(fail_chunks={2})
+    map_reduce = MapReduceSummarizer(summarizer, max_chunk_tokens=150)
+
+    assert map_reduce.summarize(make_tweets(6), {"screen_name": "u"}) == "最终总结"
+    assert "摘要 1" in rendered["tweet_content"] and "摘要 2" not in rendered["tweet_content"]
+    assert "未能提炼" in rendered["tweet_content"]
+    assert rendered["date"] == "2025-03-01"
+    assert rendered["tweet_count"] == 6
+
+
+def test_all_chunks_failing_raises():
+    summarizer, _ = make_summarizer(fail_chunks=range(1, 10))
+    map_reduce = MapReduceSummarizer(summarizer, max_chunk_tokens=150)
+
+    with pytest.raises(RuntimeError, match="全部失败"):
+        map_reduce.summarize(make_tweets(6), {"screen_name": "u"})
+
+
+@pytest.fixture
+def summarizer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("LLM_BACKEND", "openrouter")
+    monkeypatch.delenv("PROMPT_TOKEN_BUDGET", raising=False)
+    return TwitterSummarizer(api_key="test-key", model="test/model")
+
+
+def make_heavy_day(count, sentences=20):
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(3000)]
+    return [{
+        "id": str(i),
+        "text": " ".join(" ".join(rng.choices(vocabulary, k=12)) + "." for _ in range(sentences)),
+        "created_at": f"Sat Mar 01 {i % 24:02d}:{i % 60:02d}:00 +0000 2025"
+    } for i in range(count)]
+
+
+def test_day_over_prompt_budget_is_preselected_then_map_reduced(summarizer, monkeypatch):
+    calls = []
+    monkeypatch.setattr(summarizer.map_reduce, "summarize",
+                        lambda tweets, user_info=None: calls.append(tweets) or "分层总结")
+    monkeypatch.setattr(summarizer.backend, "summarize_tweets",
+                        lambda *args, **kwargs: pytest.fail("超出单块预算的prompt不应单次调用"))
+    tweets = make_heavy_day(200)
+    budget = summarizer.prompt_token_budget()
+    chunk_budget = summarizer.map_reduce.get_chunk_budget()
+    assert budget > chunk_budget
+    assert sum(ExtractivePreSummarizer.tweet_cost(t) for t in tweets) > budget
+
+    result = summarizer.generate_summary(tweets, user_info={"screen_name": "heavy"})
+
+    assert result["summary"] == "分层总结"
+    selected_cost = sum(ExtractivePreSummarizer.tweet_cost(t) for t in calls[0])
+    assert len(calls[0]) < len(tweets)
+    assert chunk_budget < selected_cost <= budget
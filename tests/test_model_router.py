@@ -0,0 +1,144 @@
+"""模型路由器：健康度统计、半开试探，以及通过本地假OpenAI接口的降级调用"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import model_router
+from model_router import CLOSED, HALF_OPEN, OPEN, ModelRouter
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def router(tmp_path):
+    return ModelRouter(state_file=str(tmp_path / "model_health.json"), failure_threshold=2, cooldown_seconds=60)
+
+
+def test_request_errors_do_not_count_against_health(router):
+    for _ in range(5):
+        router.record_failure("m", StatusError(400), 0.1)
+    entry = router.models["m"]
+    assert entry["state"] == CLOSED
+    assert entry["outcomes"] == []
+    assert entry["errors"] == {"StatusError:400": 5}
+
+
+@pytest.mark.parametrize("error", [StatusError(429), StatusError(503), ConnectionError("reset"), TimeoutError()])
+def test_transport_rate_limit_and_server_errors_open_circuit(router, error):
+    router.record_failure("m", error, 2.5)
+    router.record_failure("m", error, 3.5)
+    entry = router.models["m"]
+    assert entry["state"] == OPEN
+    assert entry["failure_latencies"] == [2.5, 3.5]
+
+
+def test_half_open_allows_single_probe(router):
+    router.record_failure("m", StatusError(500))
+    router.record_failure("m", StatusError(500))
+    assert router.models["m"]["state"] == OPEN
+
+    router.models["m"]["opened_at"] -= 61
+    assert router.begin_call("m")
+    assert router.models["m"]["state"] == HALF_OPEN
+    assert not router.begin_call("m")
+
+    router.end_call("m")
+    assert router.begin_call("m")
+    router.record_success("m", 0.2)
+    assert router.models["m"]["state"] == CLOSED
+    assert router.begin_call("m") and router.begin_call("m")
+
+
+def test_concurrent_saves_leave_a_complete_state_file(router, capsys):
+    def record(index):
+        for _ in range(20):
+            router.record_success(f"m{index}", 0.1)
+
+    threads = [threading.Thread(target=record, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert "保存模型健康状态失败" not in capsys.readouterr().out
+    with open(router.state_file, encoding='utf-8') as f:
+        saved = json.load(f)["models"]
+    assert {model: entry["outcomes"] for model, entry in saved.items()} == {f"m{i}": [1] * 20 for i in range(8)}
+    assert list(router.state_file.parent.glob("*.tmp")) == []
+
+
+class FakeCompletionsHandler(BaseHTTPRequestHandler):
+    """按请求中的模型名返回固定结果的OpenAI兼容接口"""
+    calls = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        model = body["model"]
+        self.calls.append(model)
+        if model == "test/good":
+            status, payload = 200, {
+                "id": "cmpl-1", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "真实总结"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+            }
+        elif model == "test/context":
+            status, payload = 400, {"error": {"message": "context length exceeded", "code": 400}}
+        else:
+            status, payload = 500, {"error": {"message": "upstream error", "code": 500}}
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def summarizer(tmp_path, monkeypatch):
+    pytest.importorskip("openai")
+    pytest.importorskip("httpx")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeCompletionsHandler.calls = []
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("LLM_BACKEND", "openrouter")
+    monkeypatch.setenv("LLM_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(model_router, "_router", ModelRouter(state_file=str(tmp_path / "model_health.json")))
+
+    from summarizer import TwitterSummarizer
+    instance = TwitterSummarizer(api_key="test-key", model="test/context")
+    yield instance
+    server.shutdown()
+
+
+def test_fallback_skips_request_errors_in_health(summarizer):
+    summarizer.llm_config["fallback_models"] = ["test/broken", "test/good"]
+
+    assert summarizer.call_remote_api("prompt") == "真实总结"
+
+    router = model_router.get_model_router()
+    assert router.models["test/context"]["outcomes"] == []
+    assert router.models["test/broken"]["outcomes"] == [0]
+    assert router.models["test/good"]["outcomes"] == [1]
+
+
+def test_all_models_failing_raises_instead_of_mock_summary(summarizer):
+    summarizer.llm_config["fallback_models"] = ["test/broken"]
+
+    with pytest.raises(RuntimeError, match="所有模型都调用失败"):
+        summarizer.call_remote_api("prompt")
+    assert set(FakeCompletionsHandler.calls) == {"test/context", "test/broken"}
@@ -0,0 +1,48 @@
+"""Prompt归档：多个进程同时写入时数据位置正确，相同prompt只存一份"""
+
+import multiprocessing
+
+from prompt_archive import PromptArchive
+
+
+def store_prompts(archive_dir, worker):
+    archive = PromptArchive(archive_dir, segment_max_bytes=2048)
+    for i in range(40):
+        archive.store(f"worker {worker} prompt {i} " + "内容" * (i * 7), user=f"w{worker}", summary_type="test")
+        archive.store(f"shared prompt {i}", user=f"w{worker}", summary_type="test")
+
+
+def test_concurrent_processes_store_consistently(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=store_prompts, args=(archive_dir, worker)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    archive = PromptArchive(archive_dir)
+    entries = list(archive.iter_index())
+    assert len(entries) == 4 * 80
+    for entry in entries:
+        assert archive.hash_prompt(archive.load(entry['hash'])) == entry['hash']
+
+    shared_locations = {
+        (entry['segment'], entry['offset']) for entry in entries if entry['hash'] == archive.hash_prompt("shared prompt 0")
+    }
+    assert len(shared_locations) == 1
+    assert len(list(archive.segments_dir.glob("segment_*.bin"))) > 1
+
+
+def test_segment_is_not_rescanned_on_every_store(tmp_path, monkeypatch):
+    archive = PromptArchive(str(tmp_path), segment_max_bytes=1)
+    archive.store("first prompt " * 20, user="u", summary_type="test")
+
+    def fail_glob(*args):
+        raise AssertionError("segments rescanned")
+    monkeypatch.setattr(type(archive.segments_dir), "glob", fail_glob)
+
+    archive.store("second prompt " * 20, user="u", summary_type="test")
+    assert archive.load(archive.hash_prompt("second prompt " * 20)) == "second prompt " * 20
+    assert archive._segment_number == 3
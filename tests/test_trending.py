@@ -0,0 +1,16 @@
+"""热门推文引擎：users_daily 推文没有 user 字段时使用文件的用户记录"""
+
+from trending import TrendingEngine
+
+
+def test_followers_come_from_user_record_when_tweets_lack_user():
+    engine = TrendingEngine()
+    tweets = [
+        {"id": "1", "stats": {"favorite_count": 10}, "created_at": "Sat Mar 01 08:00:00 +0000 2025"},
+        {"id": "2", "stats": {"favorite_count": 10}, "created_at": "Sat Mar 01 08:00:00 +0000 2025",
+         "user": {"followers_count": 5}},
+    ]
+
+    arrays = engine.tweets_to_arrays(tweets, user={"followers_count": 50000})
+    assert arrays["followers"].tolist() == [50000, 5]
+    assert [t["id"] for t in engine.top_k(tweets, 2, user={"followers_count": 50000})] == ["2", "1"]
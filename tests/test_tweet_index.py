@@ -0,0 +1,32 @@
+"""倒排索引：单字汉字查询，select_tweets 不修改索引"""
+
+from tweet_index import TweetIndex
+
+CREATED_AT = "Sat Mar 01 08:00:00 +0000 2025"
+
+
+def make_tweet(tweet_id, text):
+    return {"id": tweet_id, "text": text, "created_at": CREATED_AT}
+
+
+def test_single_cjk_character_matches_inside_longer_runs(tmp_path):
+    index = TweetIndex(str(tmp_path))
+    index.add_tweets([make_tweet("1", "今天发布了新芯片"), make_tweet("2", "火箭发射成功"), make_tweet("3", "芯")], "u")
+
+    assert index.search("芯", ["20250301"]) == {"1", "3"}
+    assert index.search("箭", ["20250301"]) == {"2"}
+    assert index.search("芯片", ["20250301"]) == {"1"}
+    assert index.search("鱼", ["20250301"]) == set()
+
+
+def test_select_tweets_does_not_mutate_index(tmp_path):
+    index = TweetIndex(str(tmp_path))
+    index.add_tweets([make_tweet("1", "AI芯片")], "u")
+    index.save()
+
+    tweets = [make_tweet("1", "AI芯片"), make_tweet("2", "新的芯片工厂"), make_tweet("3", "火箭"), {"text": "无id的芯片"}]
+    selected = index.select_tweets(tweets, ["芯"])
+
+    assert [t.get("id") for t in selected] == ["1", "2", None]
+    assert set(index.load_shard("20250301")["docs"]) == {"1"}
+    assert not index._dirty
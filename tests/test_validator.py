@@ -0,0 +1,138 @@
+"""媒体检查：通过本地HTTP服务验证缓存、单主机并发上限，以及HTTP错误与网络错误的区分"""
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from tools.validator import MediaChecker
+
+
+class FakeMediaHandler(BaseHTTPRequestHandler):
+    """/ok* 延迟后返回200并记录同时进行的请求数，其余路径返回404"""
+    lock = threading.Lock()
+    requests = 0
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_HEAD(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            if self.path.startswith("/ok"):
+                time.sleep(0.05)
+                self.send_response(200)
+            else:
+                self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeMediaHandler.requests = FakeMediaHandler.in_flight = FakeMediaHandler.max_in_flight = 0
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_per_host_limit_bounds_concurrent_requests(base_url, tmp_path):
+    checker = MediaChecker(max_workers=8, per_host_limit=2, timeout=2, cache_file=str(tmp_path / "cache.json"))
+    urls = [f"{base_url}/ok{i}.jpg" for i in range(12)]
+
+    results = checker.check_all(urls)
+    checker.close()
+
+    assert all(results[url]["ok"] for url in urls)
+    assert FakeMediaHandler.requests == 12
+    assert 1 < FakeMediaHandler.max_in_flight <= 2
+
+
+def test_repeated_urls_are_served_from_cache(base_url, tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    checker = MediaChecker(max_workers=4, per_host_limit=4, timeout=2, cache_file=cache_file)
+    urls = [f"{base_url}/ok{i}.jpg" for i in range(5)]
+
+    checker.check_all(urls + urls)
+    assert FakeMediaHandler.requests == 5
+    assert checker.last_cache_hits == 0
+
+    checker.check_all(urls)
+    assert FakeMediaHandler.requests == 5
+    assert checker.last_cache_hits == 5
+    checker.close()
+
+    # 缓存写入文件后，新实例同样不再请求
+    reloaded = MediaChecker(timeout=2, cache_file=cache_file)
+    assert all(reloaded.check_all(urls)[url]["ok"] for url in urls)
+    assert FakeMediaHandler.requests == 5
+    assert reloaded.last_cache_hits == 5
+
+    expired = MediaChecker(timeout=2, cache_ttl=0, cache_file=cache_file)
+    expired.check_all(urls[:1])
+    expired.close()
+    assert FakeMediaHandler.requests == 6
+
+
+def test_http_errors_are_broken_and_network_errors_unreachable(base_url):
+    checker = MediaChecker(timeout=2)
+    missing = f"{base_url}/missing.jpg"
+    unreachable = f"http://127.0.0.1:{closed_port()}/video.mp4"
+
+    results = checker.check_all([missing, unreachable])
+    checker.close()
+
+    assert results[missing]["status"] == 404
+    assert results[missing]["ok"] is False
+    assert results[missing]["error"] is None
+
+    assert results[unreachable]["status"] is None
+    assert results[unreachable]["ok"] is False
+    assert results[unreachable]["error"] == "ConnectionError"
+
+
+def test_concurrent_cache_saves_share_one_file(tmp_path):
+    cache_file = tmp_path / "cache.json"
+    checkers = [MediaChecker(cache_file=str(cache_file)) for _ in range(4)]
+    for index, checker in enumerate(checkers):
+        checker.cache = {f"http://media/{index}.jpg": {"checked_at": time.time(), "status": 200, "ok": True, "error": None}}
+
+    errors = []
+
+    def save_repeatedly(checker):
+        try:
+            for _ in range(20):
+                checker.save_cache()
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly, args=(checker,)) for checker in checkers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(MediaChecker(cache_file=str(cache_file)).cache) == 1
+    assert list(tmp_path.glob("*.tmp")) == []
@@ -6,239 +6,240 @@
 
 import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+# 作为脚本运行时加入项目根目录，复用爬虫的推文解析
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tweet_parser import iter_tweet_results, parse_tweet
+
+TIMELINE_ENDPOINTS = ('HomeTimeline', 'HomeLatestTimeline')
+
+
+def create_baseline_tweet(tweet_data: Dict) -> Dict:
+    """创建基准推文数据 - 使用爬虫的 parse_tweet 解析，保证与实际抓取结果同源"""
+    tweet = parse_tweet(tweet_data)
+    if not tweet:
+        return {}
+
+    # 记录文本来源路径，便于排查长文推文问题
+    note_text = tweet_data.get('note_tweet', {}).get('note_tweet_results', {}).get('result', {}).get('text')
+    baseline = {
+        "tweet_id": tweet['id'],
+        "source_data_path": "note_tweet.note_tweet_results.result.text" if note_text else "legacy.full_text",
+        "expected_text": tweet['text'],
+        "expected_created_at": tweet['created_at'],
+        "expected_lang": tweet['lang'],
+    }
+
+    if tweet['user']:
+        baseline["expected_user"] = tweet['user']
+
+    baseline["expected_stats"] = tweet['stats']
+
+    if tweet['media']:
+        baseline["expected_media"] = []
+        for media in tweet['media']:
+            media_info = {"type": media['type'], "id": media['id'], "expected_url": media['url']}
+            if 'bitrate' in media:
+                media_info["expected_bitrate"] = media['bitrate']
+            baseline["expected_media"].append(media_info)
+
+    # 转推数据
+    retweet = tweet['retweet']
+    baseline["is_retweet"] = bool(retweet)
+    if retweet:
+        baseline["expected_retweet_text"] = retweet['text']
+        if retweet['user']:
+            baseline["expected_retweet_user"] = {
+                "name": retweet['user']['name'],
+                "screen_name": retweet['user']['screen_name']
+            }
+
+    # 引用推文
+    baseline["is_quoted"] = bool(tweet['quoted'])
+    if tweet['quoted']:
+        baseline["expected_quoted_text"] = tweet['quoted']['text']
+
+    # 验证检查点
+    baseline["validation_checkpoints"] = {
+        "text_not_empty": len(baseline["expected_text"]) > 0,
+        "has_user_info": "expected_user" in baseline,
+        "timestamp_valid": baseline["expected_created_at"] is not None,
+        "media_urls_valid": all(
+            m.get("expected_url", "").startswith("https://")
+            for m in baseline.get("expected_media", [])
+        ),
+        "retweet_data_complete": (
+            not baseline["is_retweet"] or
+            (len(baseline.get("expected_retweet_text", "")) > 0)
+        )
+    }
+
+    return baseline
+
+
+def extract_baselines_from_file(response_file: str) -> Tuple[str, bool, List[Dict]]:
+    """处理单个响应文件（在子进程中运行），返回 (文件路径, 是否时间线响应, 基准推文)"""
+    try:
+        with open(response_file, 'r', encoding='utf-8') as f:
+            response_data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ 跳过无法读取的响应文件 {Path(response_file).name}: {e}")
+        return response_file, False, []
+
+    url = response_data.get('url', '')
+    if not any(endpoint in url for endpoint in TIMELINE_ENDPOINTS):
+        return response_file, False, []
+
+    source_name = Path(response_file).name
+    baselines = []
+    for kind, tweet_data in iter_tweet_results(response_data.get('data', {})):
+        if kind != "tweet":
+            continue
+        baseline = create_baseline_tweet(tweet_data)
+        if baseline:
+            baseline["source_file"] = source_name
+            baselines.append(baseline)
+    return response_file, True, baselines
+
 
 class GoldenDatasetBuilder:
-    def __init__(self, analysis_data_dir="analysis_data", golden_dir="golden_dataset"):
+    def __init__(self, analysis_data_dir="analysis_data", golden_dir="golden_dataset", raw_responses_dir: Optional[str] = None):
         self.analysis_data_dir = Path(analysis_data_dir)
         self.golden_dir = Path(golden_dir)
         self.golden_dir.mkdir(exist_ok=True)
+        # 爬虫保存的原始响应 (DATA_DIR/raw_responses)
+        self.raw_responses_dir = Path(raw_responses_dir) if raw_responses_dir else Path(os.getenv('DATA_DIR', 'crawler_data')) / "raw_responses"
         
         # 创建子目录
         for subdir in ["baseline_data", "verification_samples", "test_cases"]:
             (self.golden_dir / subdir).mkdir(exist_ok=True)
+        
+        # 增量构建状态：已处理的响应文件和累积的基准推文
+        self.state_file = self.golden_dir / "baseline_data" / "builder_state.json"
+        self.baselines_file = self.golden_dir / "baseline_data" / "baselines.jsonl"
     
     def extract_tweets_from_api_response(self, response_file: str) -> List[Dict]:
-        """从API响应中提取推文数据"""
+        """从API响应中提取原始推文数据"""
         try:
             with open(response_file, 'r', encoding='utf-8') as f:
                 response_data = json.load(f)
-            
-            data = response_data.get('data', {})
-            tweets = []
-            
-            # 修正数据路径 - 基于调试发现的结构
-            inner_data = data.get('data', {})
-            home_timeline = inner_data.get('home', {}).get('home_timeline_urt', {})
-            instructions = home_timeline.get('instructions', [])
-            
-            for instruction in instructions:
-                if instruction.get('type') == 'TimelineAddEntries':
-                    entries = instruction.get('entries', [])
-                    
-                    for entry in entries:
-                        entry_id = entry.get('entryId', '')
-                        
-                        if 'tweet-' in entry_id:
-                            content = entry.get('content', {})
-                            item_content = content.get('itemContent', {})
-                            tweet_results = item_content.get('tweet_results', {})
-                            tweet_data = tweet_results.get('result', {})
-                            
-                            if tweet_data.get('__typename') == 'Tweet':
-                                tweets.append(tweet_data)
-            
-            return tweets
-            
-        except Exception as e:
+        except (OSError, json.JSONDecodeError) as e:
             print(f"❌ 提取推文失败: {e}")
             return []
+        
+        return [tweet_data for kind, tweet_data in iter_tweet_results(response_data.get('data', {})) if kind == "tweet"]
     
     def create_baseline_tweet(self, tweet_data: Dict) -> Dict:
         """创建基准推文数据 - 正确的解析结果"""
-        try:
-            # 基础信息
-            baseline = {
-                "tweet_id": tweet_data.get('rest_id'),
-                "source_data_path": "",
-                "expected_text": "",
-                "expected_created_at": tweet_data.get('legacy', {}).get('created_at'),
-                "expected_lang": tweet_data.get('legacy', {}).get('lang'),
-            }
-            
-            # 提取文本内容 - 处理长文推文和普通推文
-            if 'note_tweet' in tweet_data:
-                # 长文推文
-                note_tweet_result = tweet_data.get('note_tweet', {}).get('note_tweet_results', {}).get('result', {})
-                if note_tweet_result:
-                    baseline["expected_text"] = note_tweet_result.get('text', '')
-                    baseline["source_data_path"] = "note_tweet.note_tweet_results.result.text"
-            
-            if not baseline["expected_text"]:
-                # 普通推文 - 使用 legacy.full_text
-                baseline["expected_text"] = tweet_data.get('legacy', {}).get('full_text', '')
-                baseline["source_data_path"] = "legacy.full_text"
-            
-            # 用户信息 - 修正字段路径
-            user_results = tweet_data.get('core', {}).get('user_results', {}).get('result', {})
-            if user_results:
-                baseline["expected_user"] = {
-                    "id": user_results.get('rest_id'),
-                    "name": user_results.get('core', {}).get('name'),  # 修正：从core获取
-                    "screen_name": user_results.get('core', {}).get('screen_name'),  # 修正：从core获取
-                    "description": user_results.get('legacy', {}).get('description'),
-                    "followers_count": user_results.get('legacy', {}).get('followers_count', 0),
-                    "friends_count": user_results.get('legacy', {}).get('friends_count', 0),
-                    "verified": user_results.get('verification', {}).get('verified', False),  # 修正路径
-                    "is_blue_verified": user_results.get('is_blue_verified', False)
-                }
-            
-            # 统计数据
-            legacy_data = tweet_data.get('legacy', {})
-            baseline["expected_stats"] = {
-                "retweet_count": legacy_data.get('retweet_count', 0),
-                "favorite_count": legacy_data.get('favorite_count', 0),
-                "reply_count": legacy_data.get('reply_count', 0),
-                "quote_count": legacy_data.get('quote_count', 0)
-            }
-            
-            # 媒体文件
-            extended_entities = legacy_data.get('extended_entities', {})
-            if 'media' in extended_entities:
-                baseline["expected_media"] = []
-                for media_item in extended_entities['media']:
-                    media_info = {
-                        "type": media_item.get('type'),
-                        "id": media_item.get('id_str'),
-                    }
-                    
-                    if media_item['type'] == 'video':
-                        variants = media_item.get('video_info', {}).get('variants', [])
-                        # 找到最高质量的视频
-                        best_variant = None
-                        highest_bitrate = 0
-                        for variant in variants:
-                            if variant.get('content_type') == 'video/mp4':
-                                bitrate = variant.get('bitrate', 0)
-                                if bitrate > highest_bitrate:
-                                    highest_bitrate = bitrate
-                                    best_variant = variant
-                        
-                        if best_variant:
-                            media_info["expected_url"] = best_variant['url']
-                            media_info["expected_bitrate"] = best_variant.get('bitrate')
-                    
-                    elif media_item['type'] in ['photo', 'animated_gif']:
-                        media_info["expected_url"] = media_item.get('media_url_https')
-                    
-                    baseline["expected_media"].append(media_info)
-            
-            # 转推数据
-            if 'retweeted_status_result' in legacy_data:
-                retweet_result = legacy_data['retweeted_status_result'].get('result', {})
-                if retweet_result:
-                    baseline["is_retweet"] = True
-                    baseline["expected_retweet_text"] = retweet_result.get('legacy', {}).get('full_text', '')
-                    
-                    # 转推用户信息
-                    retweet_user = retweet_result.get('core', {}).get('user_results', {}).get('result', {})
-                    if retweet_user:
-                        baseline["expected_retweet_user"] = {
-                            "name": retweet_user.get('legacy', {}).get('name'),
-                            "screen_name": retweet_user.get('legacy', {}).get('screen_name')
-                        }
-            else:
-                baseline["is_retweet"] = False
-            
-            # 引用推文
-            if 'quoted_status_result' in tweet_data:
-                quoted_result = tweet_data['quoted_status_result'].get('result', {})
-                if quoted_result:
-                    baseline["is_quoted"] = True
-                    baseline["expected_quoted_text"] = quoted_result.get('legacy', {}).get('full_text', '')
-            else:
-                baseline["is_quoted"] = False
-            
-            # 验证检查点
-            baseline["validation_checkpoints"] = {
-                "text_not_empty": len(baseline["expected_text"]) > 0,
-                "has_user_info": "expected_user" in baseline,
-                "timestamp_valid": baseline["expected_created_at"] is not None,
-                "media_urls_valid": all(
-                    m.get("expected_url", "").startswith("https://") 
-                    for m in baseline.get("expected_media", [])
-                ),
-                "retweet_data_complete": (
-                    not baseline["is_retweet"] or 
-                    (len(baseline.get("expected_retweet_text", "")) > 0)
-                )
-            }
-            
-            return baseline
-            
-        except Exception as e:
-            print(f"❌ 创建基准数据失败: {e}")
-            return {}
+        return create_baseline_tweet(tweet_data)
     
-    def build_golden_dataset_from_responses(self) -> str:
-        """从API响应文件构建黄金数据集"""
-        print("🏗️ 从API响应构建黄金数据集...")
-        
-        # 查找响应文件 - 检查多个可能位置
-        possible_dirs = [
-            self.analysis_data_dir / "api_responses",
-            Path("."),  # 当前目录
-            Path("analysis_data/api_responses")
+    def find_response_files(self) -> List[Path]:
+        """查找所有响应文件：爬虫原始响应 + 分析工具捕获的响应"""
+        sources = [
+            (self.raw_responses_dir, "*_response.json"),
+            (self.analysis_data_dir / "api_responses", "response_*.json"),
+            (Path("analysis_data/api_responses"), "response_*.json"),
         ]
         
-        response_files = []
-        for response_dir in possible_dirs:
-            if response_dir.exists():
-                found_files = list(response_dir.glob("response_*.json"))
+        response_files = {}
+        seen_dirs = set()
+        for response_dir, pattern in sources:
+            if response_dir.exists() and response_dir.resolve() not in seen_dirs:
+                seen_dirs.add(response_dir.resolve())
+                found_files = sorted(response_dir.glob(pattern))
                 if found_files:
-                    response_files.extend(found_files)
                     print(f"📂 在 {response_dir} 发现 {len(found_files)} 个响应文件")
-                    break
+                for response_file in found_files:
+                    response_files.setdefault(response_file.resolve(), response_file)
+        return list(response_files.values())
+    
+    def load_state(self) -> Dict[str, Any]:
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ 构建状态读取失败，将重新构建: {e}")
+        return {"processed_files": {}}
+    
+    def save_state(self, state: Dict[str, Any]):
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+    
+    def load_baselines(self) -> List[Dict]:
+        """读取已累积的基准推文"""
+        if not self.baselines_file.exists():
+            return []
+        with open(self.baselines_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    
+    @staticmethod
+    def _file_signature(response_file: Path) -> List[float]:
+        stat = response_file.stat()
+        return [stat.st_size, stat.st_mtime]
+    
+    def update_baselines(self, workers: Optional[int] = None, rebuild: bool = False) -> List[Dict]:
+        """增量更新基准推文：只用进程池处理新增或变化的响应文件，返回全部基准推文"""
+        if rebuild:
+            for path in (self.state_file, self.baselines_file):
+                if path.exists():
+                    path.unlink()
         
-        print(f"📂 总共发现 {len(response_files)} 个响应文件")
+        state = self.load_state()
+        processed = state["processed_files"]
+        all_baselines = self.load_baselines()
+        known_ids = {baseline["tweet_id"] for baseline in all_baselines}
         
-        all_baselines = []
-        processed_tweet_ids = set()  # 避免重复
+        response_files = self.find_response_files()
+        pending = [f for f in response_files if processed.get(str(f)) != self._file_signature(f)]
+        print(f"📂 总共发现 {len(response_files)} 个响应文件，需处理 {len(pending)} 个")
         
-        # 过滤出真正的时间线API文件
-        timeline_files = []
-        for response_file in response_files:
-            try:
-                with open(response_file, 'r', encoding='utf-8') as f:
-                    response_data = json.load(f)
-                url = response_data.get('url', '')
-                if 'HomeTimeline' in url or 'HomeLatestTimeline' in url:
-                    timeline_files.append(response_file)
-            except:
-                continue
+        if pending:
+            started = datetime.now()
+            timeline_count = 0
+            new_count = 0
+            workers = workers or os.cpu_count() or 1
+            # 结果按完成顺序流式写入，不在内存中保留所有响应
+            with ProcessPoolExecutor(max_workers=workers) as executor, \
+                    open(self.baselines_file, 'a', encoding='utf-8') as out:
+                results = executor.map(extract_baselines_from_file, [str(f) for f in pending], chunksize=4)
+                for response_file, is_timeline, baselines in results:
+                    timeline_count += is_timeline
+                    for baseline in baselines:
+                        # 避免重复：同一推文保留最早处理到的版本
+                        if baseline["tweet_id"] and baseline["tweet_id"] not in known_ids:
+                            known_ids.add(baseline["tweet_id"])
+                            out.write(json.dumps(baseline, ensure_ascii=False) + "\n")
+                            all_baselines.append(baseline)
+                            new_count += 1
+                    processed[response_file] = self._file_signature(Path(response_file))
+            
+            state["updated_at"] = datetime.now().isoformat()
+            self.save_state(state)
+            elapsed = (datetime.now() - started).total_seconds()
+            print(f"📍 处理 {timeline_count} 个时间线API文件, 新增 {new_count} 条基准推文 ({elapsed:.1f}秒, {workers} 个进程)")
         
-        print(f"📍 发现 {len(timeline_files)} 个时间线API文件")
+        return all_baselines
+    
+    def build_golden_dataset_from_responses(self, workers: Optional[int] = None, rebuild: bool = False) -> str:
+        """从API响应文件构建黄金数据集（增量处理新响应，输出完整数据集快照）"""
+        print("🏗️ 从API响应构建黄金数据集...")
         
-        for response_file in timeline_files[:3]:  # 处理前3个时间线文件
-            print(f"  处理: {response_file.name}")
-            tweets = self.extract_tweets_from_api_response(str(response_file))
-            
-            for tweet_data in tweets:
-                tweet_id = tweet_data.get('rest_id')
-                if tweet_id and tweet_id not in processed_tweet_ids:
-                    baseline = self.create_baseline_tweet(tweet_data)
-                    if baseline:
-                        baseline["source_file"] = response_file.name
-                        all_baselines.append(baseline)
-                        processed_tweet_ids.add(tweet_id)
+        all_baselines = self.update_baselines(workers=workers, rebuild=rebuild)
+        source_files = sorted({baseline.get("source_file") for baseline in all_baselines if baseline.get("source_file")})
         
         # 创建黄金数据集
         golden_dataset = {
             "creation_time": datetime.now().isoformat(),
             "description": "基于API响应数据自动生成的黄金数据集",
-            "source_files": [f.name for f in response_files[:5]],
+            "source_files": source_files,
             "total_tweets": len(all_baselines),
             "baseline_tweets": all_baselines,
             "validation_rules": {
@@ -357,12 +358,19 @@ class GoldenDatasetBuilder:
 
 def main():
     """主函数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='黄金数据集构建工具')
+    parser.add_argument('--workers', type=int, default=None, help='解析响应文件的进程数 (默认: CPU核心数)')
+    parser.add_argument('--rebuild', action='store_true', help='忽略增量状态，重新处理全部响应文件')
+    args = parser.parse_args()
+    
     print("🏗️ 黄金数据集构建工具")
     
     builder = GoldenDatasetBuilder()
     
-    # 构建黄金数据集
-    golden_file = builder.build_golden_dataset_from_responses()
+    # 构建黄金数据集（只处理新增的响应文件）
+    golden_file = builder.build_golden_dataset_from_responses(workers=args.workers, rebuild=args.rebuild)
     
     if golden_file:
         # 创建测试用例
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+推文解析回归对比工具 - 用归档的原始响应对比新旧解析器的输出
+- 旧解析器取自git历史中的指定版本（默认HEAD），新解析器为工作区中的 tweet_parser
+- 多进程并行处理每个响应文件，按推文id逐字段对比
+- 输出不一致统计、差异字段分布和解析吞吐量，存在差异时退出码为1
+
+用法:
+    python tools/parser_diff.py                    # 工作区 vs HEAD
+    python tools/parser_diff.py --base HEAD~3      # 工作区 vs 指定版本
+    python tools/parser_diff.py --report diff.json # 保存完整报告
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import types
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# 子进程中的解析器 (旧, 新)
+_extractors: Tuple[Optional[Callable], Optional[Callable]] = (None, None)
+
+
+def load_base_source(rev: str) -> Tuple[str, str]:
+    """从git历史读取旧解析器源码，返回 (模块名, 源码)
+
+    早期版本解析逻辑在 crawler.py 的 XCrawler 中，没有 tweet_parser.py 时回退到它
+    """
+    for module_name in ("tweet_parser", "crawler"):
+        result = subprocess.run(
+            ["git", "show", f"{rev}:{module_name}.py"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if result.returncode == 0:
+            return module_name, result.stdout
+    raise ValueError(f"版本 {rev} 中找不到 tweet_parser.py 或 crawler.py")
+
+
+def build_extractor(module_name: str, source: str) -> Callable[[Dict], List[Dict]]:
+    """把源码加载为独立模块，返回 响应数据 -> 推文列表 的函数"""
+    module = types.ModuleType(f"base_{module_name}")
+    module.__file__ = str(PROJECT_ROOT / f"{module_name}.py")
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+
+    if module_name == "tweet_parser":
+        return lambda data: module.extract_tweets_from_response(data)[0]
+
+    # 旧版本：解析方法挂在爬虫实例上，不需要初始化会话和认证
+    crawler = module.XCrawler.__new__(module.XCrawler)
+    return crawler.extract_tweets_from_response
+
+
+def _init_worker(module_name: str, source: str):
+    global _extractors
+    from tweet_parser import extract_tweets_from_response
+
+    _extractors = (build_extractor(module_name, source), lambda data: extract_tweets_from_response(data)[0])
+
+
+def diff_values(old: Any, new: Any, path: str = "") -> List[str]:
+    """递归对比，返回不一致的字段路径"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in dict.fromkeys(list(old) + list(new)):
+            paths += diff_values(old.get(key), new.get(key), f"{path}.{key}" if path else key)
+        return paths
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        paths = []
+        for i, (old_item, new_item) in enumerate(zip(old, new)):
+            paths += diff_values(old_item, new_item, f"{path}[{i}]")
+        return paths
+    return [] if old == new else [path or "<root>"]
+
+
+def _timed(extractor: Callable, data: Dict) -> Tuple[List[Dict], float]:
+    # 旧解析器会打印cursor等信息，计时时屏蔽输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        tweets = extractor(data)
+        elapsed = time.perf_counter() - start_time
+    return tweets, elapsed
+
+
+def diff_file(response_file: str, repeat: int = 3) -> Dict[str, Any]:
+    """在子进程中对比单个响应文件（计时取多次交替运行的最小值，减少顺序和缓存带来的偏差）"""
+    old_extractor, new_extractor = _extractors
+    try:
+        with open(response_file, 'r', encoding='utf-8') as f:
+            data = json.load(f).get('data', {})
+    except (OSError, json.JSONDecodeError) as e:
+        return {"file": response_file, "error": str(e)}
+
+    old_time = new_time = float('inf')
+    for i in range(repeat):
+        extractors = [(old_extractor, 'old'), (new_extractor, 'new')]
+        for extractor, side in (extractors if i % 2 == 0 else extractors[::-1]):
+            tweets, elapsed = _timed(extractor, data)
+            if side == 'old':
+                old_tweets, old_time = tweets, min(old_time, elapsed)
+            else:
+                new_tweets, new_time = tweets, min(new_time, elapsed)
+    old_by_id = {tweet.get('id'): tweet for tweet in old_tweets}
+    new_by_id = {tweet.get('id'): tweet for tweet in new_tweets}
+
+    mismatches = {}
+    for tweet_id in old_by_id.keys() & new_by_id.keys():
+        paths = diff_values(old_by_id[tweet_id], new_by_id[tweet_id])
+        if paths:
+            mismatches[tweet_id] = paths
+
+    return {
+        "file": response_file,
+        "old_count": len(old_tweets),
+        "new_count": len(new_tweets),
+        "old_time": old_time,
+        "new_time": new_time,
+        # 同一响应中推文顺序变化也视为回归
+        "order_changed": [t.get('id') for t in old_tweets] != [t.get('id') for t in new_tweets],
+        "only_old": sorted(old_by_id.keys() - new_by_id.keys(), key=str),
+        "only_new": sorted(new_by_id.keys() - old_by_id.keys(), key=str),
+        "mismatches": mismatches
+    }
+
+
+def run_diff(response_files: List[str], base_rev: str = "HEAD", workers: Optional[int] = None,
+             max_samples: int = 20) -> Dict[str, Any]:
+    """并行对比所有响应文件，返回汇总报告"""
+    module_name, source = load_base_source(base_rev)
+    workers = workers or os.cpu_count() or 1
+    print(f"🔬 对比解析器: 工作区 vs {base_rev} ({module_name}.py), {len(response_files)} 个响应文件, {workers} 个进程")
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(module_name, source)) as executor:
+        results = list(executor.map(diff_file, response_files, chunksize=4))
+    wall_time = time.time() - start_time
+
+    errors = [r for r in results if "error" in r]
+    results = [r for r in results if "error" not in r]
+    path_counter: Counter = Counter()
+    samples = []
+    for result in results:
+        for tweet_id, paths in result["mismatches"].items():
+            # 数组下标归一，便于按字段聚合
+            path_counter.update({re.sub(r'\[\d+\]', '[]', path) for path in paths})
+            if len(samples) < max_samples:
+                samples.append({"file": Path(result["file"]).name, "tweet_id": tweet_id, "paths": paths})
+
+    old_tweets = sum(r["old_count"] for r in results)
+    new_tweets = sum(r["new_count"] for r in results)
+    old_time = sum(r["old_time"] for r in results)
+    new_time = sum(r["new_time"] for r in results)
+    mismatched = sum(len(r["mismatches"]) for r in results)
+    only_old = sum(len(r["only_old"]) for r in results)
+    only_new = sum(len(r["only_new"]) for r in results)
+    order_changed = [Path(r["file"]).name for r in results if r["order_changed"]]
+
+    return {
+        "base_rev": base_rev,
+        "files": len(results),
+        "unreadable_files": [Path(r["file"]).name for r in errors],
+        "old_tweets": old_tweets,
+        "new_tweets": new_tweets,
+        "mismatched_tweets": mismatched,
+        "only_in_old": only_old,
+        "only_in_new": only_new,
+        "order_changed_files": order_changed,
+        "identical": mismatched == 0 and only_old == 0 and only_new == 0 and not order_changed,
+        "field_mismatch_counts": dict(path_counter.most_common()),
+        "mismatch_samples": samples,
+        "throughput": {
+            "old_tweets_per_sec": old_tweets / old_time if old_time else None,
+            "new_tweets_per_sec": new_tweets / new_time if new_time else None,
+            "old_parse_seconds": old_time,
+            "new_parse_seconds": new_time,
+            "speedup": old_time / new_time if new_time else None,
+            "wall_seconds": wall_time
+        }
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    throughput = report["throughput"]
+    print("\n📊 解析器对比结果:")
+    print("=" * 50)
+    print(f"响应文件: {report['files']}  (无法读取: {len(report['unreadable_files'])})")
+    print(f"推文数: 旧 {report['old_tweets']} / 新 {report['new_tweets']}")
+    print(f"字段不一致的推文: {report['mismatched_tweets']}")
+    print(f"只在旧解析结果中: {report['only_in_old']}  只在新解析结果中: {report['only_in_new']}")
+    if report["order_changed_files"]:
+        print(f"推文顺序变化的文件: {len(report['order_changed_files'])}")
+
+    if report["field_mismatch_counts"]:
+        print("\n🔍 差异字段分布:")
+        for path, count in list(report["field_mismatch_counts"].items())[:15]:
+            print(f"  {path:40} {count}")
+        print("\n📝 差异样例:")
+        for sample in report["mismatch_samples"][:5]:
+            print(f"  {sample['file']} #{sample['tweet_id']}: {', '.join(sample['paths'][:5])}")
+
+    print("\n⚡ 解析吞吐量 (不含JSON读取, 每个文件取3次运行的最小值):")
+    if throughput["old_tweets_per_sec"] and throughput["new_tweets_per_sec"]:
+        print(f"  旧: {throughput['old_tweets_per_sec']:,.0f} 条/秒 ({throughput['old_parse_seconds']:.2f}秒)")
+        print(f"  新: {throughput['new_tweets_per_sec']:,.0f} 条/秒 ({throughput['new_parse_seconds']:.2f}秒)")
+        print(f"  加速比: {throughput['speedup']:.2f}x")
+    print(f"  总耗时: {throughput['wall_seconds']:.1f}秒")
+
+    print("-" * 50)
+    print("✅ 输出完全一致" if report["identical"] else "❌ 输出存在差异")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='推文解析回归对比 - 工作区解析器 vs git历史版本')
+    parser.add_argument('--base', default='HEAD', help='对比的git版本 (默认: HEAD)')
+    parser.add_argument('--responses', default=None,
+                        help='原始响应目录 (默认: $DATA_DIR/raw_responses)')
+    parser.add_argument('--workers', type=int, default=None, help='进程数 (默认: CPU核心数)')
+    parser.add_argument('--report', default=None, help='保存完整JSON报告的路径')
+    args = parser.parse_args()
+
+    responses_dir = Path(args.responses) if args.responses else Path(os.getenv('DATA_DIR', 'crawler_data')) / "raw_responses"
+    response_files = sorted(str(f) for f in responses_dir.glob("*.json"))
+    if not response_files:
+        print(f"❌ 没有找到原始响应文件: {responses_dir}")
+        sys.exit(2)
+
+    report = run_diff(response_files, base_rev=args.base, workers=args.workers)
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 完整报告已保存: {args.report}")
+
+    sys.exit(0 if report["identical"] else 1)
+
+
+if __name__ == "__main__":
+    main()
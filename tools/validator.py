@@ -6,11 +6,18 @@
 
 import json
 import os
+import sys
 import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, FrozenSet, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
 from dataclasses import dataclass
 
 @dataclass
@@ -21,8 +28,561 @@ class ValidationResult:
     issues: List[str]
     details: Dict[str, Any]
 
+class MediaChecker:
+    def __init__(self, max_workers: int = 16, per_host_limit: int = 8, timeout: float = 5.0,
+                 cache_ttl: float = 6 * 3600, cache_file: Optional[str] = None):
+        """
+        并发检查媒体URL可访问性
+
+        Args:
+            max_workers: 线程池大小（总并发上限）
+            per_host_limit: 单个主机的并发上限，同一主机复用一个连接池
+            timeout: 单个请求超时（秒）
+            cache_ttl: 结果缓存有效期（秒），期内重复URL不再请求
+            cache_file: 缓存持久化文件，None表示只缓存在内存中
+        """
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_file = Path(cache_file) if cache_file else None
+
+        # 主机 -> (Session, 并发信号量)
+        self._hosts: Dict[str, Tuple[requests.Session, threading.BoundedSemaphore]] = {}
+        self._hosts_lock = threading.Lock()
+        # URL -> {"checked_at", "status", "ok", "error"}
+        self.cache: Dict[str, Dict[str, Any]] = {}
+        self._cache_lock = threading.Lock()
+        self.last_cache_hits = 0
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.cache = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ 媒体检查缓存读取失败，将重新检查: {e}")
+            self.cache = {}
+
+    def save_cache(self):
+        """写入未过期的缓存条目"""
+        if not self.cache_file:
+            return
+        now = time.time()
+        # 多个检查器可能同时保存：写入和替换在锁内完成，临时文件名唯一
+        with self._cache_lock:
+            entries = {url: entry for url, entry in self.cache.items() if now - entry["checked_at"] < self.cache_ttl}
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_file.parent,
+                                             suffix='.tmp', delete=False) as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(f.name, self.cache_file)
+
+    def _host(self, url: str) -> Tuple[requests.Session, threading.BoundedSemaphore]:
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_limit)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._hosts[host] = (session, threading.BoundedSemaphore(self.per_host_limit))
+            return self._hosts[host]
+
+    def cached(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            entry = self.cache.get(url)
+        if entry and time.time() - entry["checked_at"] < self.cache_ttl:
+            return entry
+        return None
+
+    def check(self, url: str) -> Dict[str, Any]:
+        """检查单个URL（HEAD请求，跟随重定向）"""
+        session, slots = self._host(url)
+        status, error = None, None
+        with slots:
+            try:
+                response = session.head(url, timeout=self.timeout, allow_redirects=True)
+                status = response.status_code
+            except requests.RequestException as e:
+                error = type(e).__name__
+
+        entry = {"checked_at": time.time(), "status": status, "ok": status == 200, "error": error}
+        with self._cache_lock:
+            self.cache[url] = entry
+        return entry
+
+    def check_all(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """检查全部URL（去重，命中缓存的跳过），返回 URL -> 检查结果"""
+        unique_urls = list(dict.fromkeys(urls))
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for url in unique_urls:
+            entry = self.cached(url)
+            if entry:
+                results[url] = entry
+            else:
+                pending.append(url)
+
+        self.last_cache_hits = len(unique_urls) - len(pending)
+        if pending:
+            start_time = time.time()
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                for url, entry in zip(pending, executor.map(self.check, pending)):
+                    results[url] = entry
+            print(f"🖼️ 媒体检查: {len(pending)} 个URL, 缓存命中 {self.last_cache_hits} 个, 用时 {time.time() - start_time:.1f}秒")
+            self.save_cache()
+        return results
+
+    def close(self):
+        with self._hosts_lock:
+            for session, _ in self._hosts.values():
+                session.close()
+            self._hosts = {}
+
+
+X_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def iter_daily_file_tweets(daily_file: str) -> Iterator[Dict]:
+    """逐条读取每日数据文件中的推文（只在内存中保留当前一条解析后的推文）"""
+    with open(daily_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    decoder = json.JSONDecoder()
+    key_position = content.find('"tweets"')
+    if key_position < 0:
+        return
+    position = content.index('[', key_position) + 1
+    length = len(content)
+    while True:
+        while position < length and content[position] in ' \t\r\n,':
+            position += 1
+        if position >= length or content[position] == ']':
+            return
+        tweet, position = decoder.raw_decode(content, position)
+        yield tweet
+
+
+class TextCompletenessCheck:
+    """文本完整性规则的流式计数器"""
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.rules = rules
+        self.total = 0
+        self.total_length = 0
+        self.min_length: Optional[int] = None
+        self.max_length: Optional[int] = None
+        self.empty_texts = 0
+        self.truncated_count = 0
+
+    def add(self, tweet: Dict):
+        length = len(tweet.get('text', ''))
+        self.total += 1
+        self.total_length += length
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+        self.max_length = length if self.max_length is None else max(self.max_length, length)
+        if length == 0:
+            self.empty_texts += 1
+        # 检查截断标识
+        if tweet.get('truncated', False):
+            self.truncated_count += 1
+
+    def result(self) -> ValidationResult:
+        if not self.total:
+            return ValidationResult(False, 0, ["没有推文数据"], {})
+
+        issues = []
+        avg_length = self.total_length / self.total
+        empty_ratio = self.empty_texts / self.total
+        truncated_ratio = self.truncated_count / self.total
+
+        details = {
+            "total_tweets": self.total,
+            "avg_text_length": avg_length,
+            "empty_text_count": self.empty_texts,
+            "empty_text_ratio": empty_ratio,
+            "truncated_count": self.truncated_count,
+            "truncated_ratio": truncated_ratio,
+            "min_length": self.min_length,
+            "max_length": self.max_length
+        }
+
+        score = 100
+
+        # 评分规则
+        if avg_length < self.rules["min_avg_length"]:
+            issues.append(f"平均文本长度过短: {avg_length:.1f}")
+            score -= 30
+
+        if empty_ratio > self.rules["empty_text_threshold"]:
+            issues.append(f"空文本比例过高: {empty_ratio:.3f}")
+            score -= 40
+
+        if truncated_ratio > self.rules["truncated_ratio_threshold"]:
+            issues.append(f"截断文本比例过高: {truncated_ratio:.3f}")
+            score -= 25
+
+        return ValidationResult(is_valid=len(issues) == 0, score=max(0, score), issues=issues, details=details)
+
+
+class RetweetIntegrityCheck:
+    """转推完整性规则的流式计数器"""
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.rules = rules
+        self.total = 0
+        self.retweets = 0
+        self.missing_original_text = 0
+        self.missing_original_user = 0
+        self.nested_retweets = 0
+
+    def add(self, tweet: Dict):
+        self.total += 1
+        retweet_data = tweet.get('retweet')
+        if not retweet_data:
+            return
+
+        self.retweets += 1
+        # 检查原文
+        if not retweet_data.get('text'):
+            self.missing_original_text += 1
+        # 检查原用户信息
+        if not retweet_data.get('user'):
+            self.missing_original_user += 1
+        # 检查嵌套转推
+        if retweet_data.get('retweet'):
+            self.nested_retweets += 1
+
+    def result(self) -> ValidationResult:
+        issues = []
+        details = {
+            "total_retweets": self.retweets,
+            "retweet_ratio": self.retweets / self.total if self.total else 0
+        }
+
+        if not self.retweets:
+            return ValidationResult(True, 100, [], details)
+
+        details.update({
+            "missing_original_text": self.missing_original_text,
+            "missing_original_user": self.missing_original_user,
+            "nested_retweets": self.nested_retweets
+        })
+
+        score = 100
+
+        if self.missing_original_text > 0:
+            issues.append(f"缺失转推原文: {self.missing_original_text} 条")
+            score -= (self.missing_original_text / self.retweets) * 50
+
+        if self.missing_original_user > 0:
+            issues.append(f"缺失转推原用户信息: {self.missing_original_user} 条")
+            score -= (self.missing_original_user / self.retweets) * 30
+
+        return ValidationResult(is_valid=len(issues) == 0, score=max(0, score), issues=issues, details=details)
+
+
+class MediaAccessibilityCheck:
+    """媒体完整性规则的流式计数器（URL在遍历时收集，结束后统一并发检查）"""
+
+    def __init__(self, rules: Dict[str, Any], media_checker: MediaChecker):
+        self.rules = rules
+        self.media_checker = media_checker
+        self.media_tweets = 0
+        self.total_media = 0
+        self.valid_urls = 0
+        self.invalid_urls = 0
+        self.video_files = 0
+        self.image_files = 0
+        self.urls_to_check: List[str] = []
+
+    def add(self, tweet: Dict):
+        media_list = tweet.get('media')
+        if not media_list:
+            return
+
+        self.media_tweets += 1
+        for media in media_list:
+            self.total_media += 1
+            url = media.get('url')
+            media_type = media.get('type')
+
+            if media_type == 'video':
+                self.video_files += 1
+            elif media_type in ['photo', 'animated_gif']:
+                self.image_files += 1
+
+            if not url:
+                self.invalid_urls += 1
+                continue
+
+            # 检查URL格式
+            if url.startswith('https://') and ('twimg.com' in url or 'twitter.com' in url):
+                self.valid_urls += 1
+                self.urls_to_check.append(url)
+            else:
+                self.invalid_urls += 1
+
+    def result(self) -> ValidationResult:
+        issues = []
+        details = {
+            "total_media_files": self.total_media,
+            "media_tweets": self.media_tweets
+        }
+
+        if not self.total_media:
+            return ValidationResult(True, 100, [], details)
+
+        # 测试可访问性（全部URL并发检查）
+        urls = self.urls_to_check
+        check_results = self.media_checker.check_all(urls) if self.rules["media_url_accessibility"] else {}
+        accessible_urls = sum(1 for url in urls if check_results.get(url, {}).get("ok"))
+        # 返回了HTTP错误码的URL（与网络错误区分，网络不通时不判定为数据问题）
+        broken_urls = [url for url in dict.fromkeys(urls) if check_results.get(url, {}).get("status") not in (None, 200)]
+        unreachable_urls = sum(1 for url in dict.fromkeys(urls) if url in check_results and check_results[url]["status"] is None)
+
+        details.update({
+            "valid_urls": self.valid_urls,
+            "invalid_urls": self.invalid_urls,
+            "accessible_urls": accessible_urls,
+            "checked_urls": len(check_results),
+            "broken_urls": len(broken_urls),
+            "broken_url_samples": broken_urls[:10],
+            "unreachable_urls": unreachable_urls,
+            "cache_hits": self.media_checker.last_cache_hits if check_results else 0,
+            "video_files": self.video_files,
+            "image_files": self.image_files
+        })
+
+        score = 100
+
+        if self.invalid_urls > 0:
+            invalid_ratio = self.invalid_urls / self.total_media
+            issues.append(f"无效媒体URL: {self.invalid_urls} 个 ({invalid_ratio:.2%})")
+            score -= invalid_ratio * 60
+
+        if broken_urls:
+            broken_ratio = len(broken_urls) / len(check_results)
+            issues.append(f"无法访问的媒体URL: {len(broken_urls)} 个 ({broken_ratio:.2%})")
+            score -= broken_ratio * 40
+
+        return ValidationResult(is_valid=len(issues) == 0, score=max(0, score), issues=issues, details=details)
+
+
+class DataStructureCheck:
+    """数据结构规则的流式计数器"""
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.rules = rules
+        self.required_fields = rules["required_fields"]
+        self.user_required_fields = rules["user_required_fields"]
+        self.total = 0
+        self.missing_field_counts = {field: 0 for field in self.required_fields}
+        self.missing_user_field_counts = {field: 0 for field in self.user_required_fields}
+        self.valid_timestamps = 0
+        try:
+            from dateutil.parser import parse
+            self._parse_time = parse
+        except ImportError:
+            # 缺少dateutil时所有时间戳都视为无效
+            self._parse_time = None
+
+    def add(self, tweet: Dict):
+        self.total += 1
+        # 检查必需字段
+        for field in self.required_fields:
+            if field not in tweet or tweet[field] is None:
+                self.missing_field_counts[field] += 1
+
+        # 检查用户字段
+        user = tweet.get('user', {})
+        if user:
+            for field in self.user_required_fields:
+                if field not in user or user[field] is None:
+                    self.missing_user_field_counts[field] += 1
+
+        # 检查时间戳格式 - X的时间格式: "Wed Oct 05 22:34:12 +0000 2011"
+        created_at = tweet.get('created_at')
+        if created_at and self._parse_time:
+            try:
+                # 先按X的固定格式快速解析，其他格式再交给dateutil
+                datetime.strptime(created_at, X_TIME_FORMAT)
+                self.valid_timestamps += 1
+            except (ValueError, TypeError):
+                try:
+                    self._parse_time(created_at)
+                    self.valid_timestamps += 1
+                except (ValueError, OverflowError, TypeError):
+                    pass
+
+    def result(self) -> ValidationResult:
+        if not self.total:
+            return ValidationResult(False, 0, ["没有推文数据"], {})
+
+        issues = []
+        details = {
+            "total_tweets": self.total,
+            "missing_fields": self.missing_field_counts,
+            "missing_user_fields": self.missing_user_field_counts,
+            "valid_timestamps": self.valid_timestamps,
+            "timestamp_validity_ratio": self.valid_timestamps / self.total
+        }
+
+        score = 100
+
+        # 评分
+        for field, count in self.missing_field_counts.items():
+            if count > 0:
+                ratio = count / self.total
+                issues.append(f"缺失{field}字段: {count} 条 ({ratio:.2%})")
+                score -= ratio * 30
+
+        for field, count in self.missing_user_field_counts.items():
+            if count > 0:
+                ratio = count / self.total
+                issues.append(f"缺失用户{field}字段: {count} 条 ({ratio:.2%})")
+                score -= ratio * 20
+
+        timestamp_invalid_ratio = 1 - (self.valid_timestamps / self.total)
+        if timestamp_invalid_ratio > 0.1:  # 超过10%的时间戳无效
+            issues.append(f"时间戳格式错误比例: {timestamp_invalid_ratio:.2%}")
+            score -= timestamp_invalid_ratio * 25
+
+        return ValidationResult(is_valid=len(issues) == 0, score=max(0, score), issues=issues, details=details)
+
+
+def _get_path(data: Any, path: str) -> Any:
+    """按点分路径取嵌套字段，中途缺失返回None"""
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _media_set(media_list: Any, url_key: str) -> Optional[FrozenSet[Tuple]]:
+    """媒体列表归一为 (类型, 媒体id, URL) 集合，与顺序无关"""
+    if not media_list:
+        return None
+    return frozenset((m.get('type'), m.get('id'), m.get(url_key)) for m in media_list if isinstance(m, dict))
+
+
+# (字段名, 黄金数据路径, 抓取数据路径, 是否关键字段)
+GOLDEN_FIELDS = [
+    ("text", "expected_text", "text", True),
+    ("created_at", "expected_created_at", "created_at", True),
+    ("lang", "expected_lang", "lang", False),
+    ("user.id", "expected_user.id", "user.id", True),
+    ("user.name", "expected_user.name", "user.name", True),
+    ("user.screen_name", "expected_user.screen_name", "user.screen_name", True),
+    ("stats.retweet_count", "expected_stats.retweet_count", "stats.retweet_count", False),
+    ("stats.favorite_count", "expected_stats.favorite_count", "stats.favorite_count", False),
+    ("stats.reply_count", "expected_stats.reply_count", "stats.reply_count", False),
+    ("stats.quote_count", "expected_stats.quote_count", "stats.quote_count", False),
+    ("media", "expected_media", "media", True),
+    ("retweet.text", "expected_retweet_text", "retweet.text", True),
+    ("retweet.user.screen_name", "expected_retweet_user.screen_name", "retweet.user.screen_name", False),
+    ("quoted.text", "expected_quoted_text", "quoted.text", False),
+]
+
+
+class GoldenComparison:
+    def __init__(self, golden_posts: List[Dict], fields: List[Tuple[str, str, str, bool]] = GOLDEN_FIELDS):
+        """
+        按tweet_id索引黄金数据集，逐字段对比抓取结果
+
+        Args:
+            golden_posts: 黄金数据集中的 baseline_tweets
+            fields: 对比字段定义 (字段名, 黄金数据路径, 抓取数据路径, 是否关键字段)
+        """
+        self.fields = fields
+        self.index: Dict[str, Dict] = {}
+        for post in golden_posts:
+            tweet_id = post.get('tweet_id')
+            if tweet_id:
+                self.index[str(tweet_id)] = post
+
+    @classmethod
+    def from_file(cls, golden_dataset_file: str) -> 'GoldenComparison':
+        with open(golden_dataset_file, 'r', encoding='utf-8') as f:
+            golden_data = json.load(f)
+        return cls(golden_data.get('baseline_tweets', []))
+
+    @staticmethod
+    def _normalize(field: str, value: Any, golden: bool) -> Any:
+        """空值统一为None；文本去掉首尾空白；媒体转为集合"""
+        if field == "media":
+            return _media_set(value, "expected_url" if golden else "url")
+        if isinstance(value, str):
+            value = value.strip()
+        return None if value in (None, "") else value
+
+    def compare(self, tweets: Iterable[Dict], max_samples: int = 5) -> Dict[str, Any]:
+        """对比所有与黄金数据集重叠的推文（单次遍历，按id查找）
+
+        每个字段以黄金数据为真值统计：
+        - 精确率 = 正确值 / 抓取到的值（抓取有值但黄金为空或不一致均为误报）
+        - 召回率 = 正确值 / 黄金中的值（抓取为空或不一致均为漏报）
+        """
+        counters = {name: {"tp": 0, "fp": 0, "fn": 0} for name, *_ in self.fields}
+        mismatch_samples: Dict[str, List[Dict]] = {name: [] for name, *_ in self.fields}
+        matched_ids = set()
+        crawled_count = 0
+
+        for tweet in tweets:
+            crawled_count += 1
+            tweet_id = str(tweet.get('id'))
+            golden = self.index.get(tweet_id)
+            if golden is None or tweet_id in matched_ids:
+                continue
+            matched_ids.add(tweet_id)
+
+            for name, golden_path, tweet_path, _ in self.fields:
+                expected = self._normalize(name, _get_path(golden, golden_path), golden=True)
+                actual = self._normalize(name, _get_path(tweet, tweet_path), golden=False)
+                counter = counters[name]
+                if expected is None and actual is None:
+                    continue
+                if actual == expected:
+                    counter["tp"] += 1
+                    continue
+                if actual is not None:
+                    counter["fp"] += 1
+                if expected is not None:
+                    counter["fn"] += 1
+                if len(mismatch_samples[name]) < max_samples:
+                    mismatch_samples[name].append({
+                        "tweet_id": tweet_id,
+                        "expected": sorted(map(list, expected)) if isinstance(expected, frozenset) else expected,
+                        "actual": sorted(map(list, actual)) if isinstance(actual, frozenset) else actual
+                    })
+
+        field_metrics = {}
+        for name, _, _, critical in self.fields:
+            counter = counters[name]
+            found, expected = counter["tp"] + counter["fp"], counter["tp"] + counter["fn"]
+            field_metrics[name] = {
+                **counter,
+                "precision": counter["tp"] / found if found else None,
+                "recall": counter["tp"] / expected if expected else None,
+                "critical": critical
+            }
+
+        return {
+            "golden_posts_count": len(self.index),
+            "current_posts_count": crawled_count,
+            "matched_count": len(matched_ids),
+            "golden_coverage": len(matched_ids) / len(self.index) if self.index else 0,
+            "fields": field_metrics,
+            "mismatch_samples": {name: samples for name, samples in mismatch_samples.items() if samples}
+        }
+
+
 class DataValidator:
-    def __init__(self, data_dir="analysis_data", golden_dataset_dir="golden_dataset"):
+    def __init__(self, data_dir="analysis_data", golden_dataset_dir="golden_dataset", media_checker: Optional[MediaChecker] = None):
         self.data_dir = Path(data_dir)
         self.golden_dir = Path(golden_dataset_dir)
         self.golden_dir.mkdir(exist_ok=True)
@@ -31,6 +591,9 @@ class DataValidator:
         for subdir in ["baseline_data", "validation_reports", "comparison_results"]:
             (self.golden_dir / subdir).mkdir(exist_ok=True)
         
+        # 媒体可访问性检查（结果按TTL缓存在黄金数据集目录下）
+        self.media_checker = media_checker or MediaChecker(cache_file=str(self.golden_dir / "media_check_cache.json"))
+        
         # 验证规则配置
         self.validation_rules = {
             "text_completeness": {
@@ -52,6 +615,9 @@ class DataValidator:
                 "required_fields": ["id", "text", "created_at", "user"],
                 "user_required_fields": ["name", "screen_name"],
                 "timestamp_format_check": True
+            },
+            "golden_comparison": {
+                "min_field_precision_recall": 0.95  # 关键字段精确率/召回率下限
             }
         }
     
@@ -100,312 +666,86 @@ class DataValidator:
         print(f"💾 黄金数据集已保存: {golden_file}")
         return str(golden_file)
     
+    def create_checks(self) -> Dict[str, Any]:
+        """创建各验证规则的流式计数器（键为验证类别）"""
+        return {
+            "text_completeness": TextCompletenessCheck(self.validation_rules["text_completeness"]),
+            "retweet_integrity": RetweetIntegrityCheck(self.validation_rules["retweet_integrity"]),
+            "media_accessibility": MediaAccessibilityCheck(self.validation_rules["media_completeness"], self.media_checker),
+            "data_structure": DataStructureCheck(self.validation_rules["data_structure"])
+        }
+    
+    @staticmethod
+    def _run_check(check, tweets: Iterable[Dict]) -> ValidationResult:
+        for tweet in tweets:
+            check.add(tweet)
+        return check.result()
+    
     def validate_text_completeness(self, tweets: List[Dict]) -> ValidationResult:
         """验证文本完整性"""
-        issues = []
-        details = {}
-        
-        if not tweets:
-            return ValidationResult(False, 0, ["没有推文数据"], {})
-        
-        # 统计文本长度
-        text_lengths = [len(tweet.get('text', '')) for tweet in tweets]
-        avg_length = sum(text_lengths) / len(text_lengths)
-        
-        empty_texts = sum(1 for length in text_lengths if length == 0)
-        empty_ratio = empty_texts / len(tweets)
-        
-        # 检查截断标识
-        truncated_count = sum(1 for tweet in tweets if tweet.get('truncated', False))
-        truncated_ratio = truncated_count / len(tweets)
-        
-        details = {
-            "total_tweets": len(tweets),
-            "avg_text_length": avg_length,
-            "empty_text_count": empty_texts,
-            "empty_text_ratio": empty_ratio,
-            "truncated_count": truncated_count,
-            "truncated_ratio": truncated_ratio,
-            "min_length": min(text_lengths) if text_lengths else 0,
-            "max_length": max(text_lengths) if text_lengths else 0
-        }
-        
-        score = 100
-        
-        # 评分规则
-        if avg_length < self.validation_rules["text_completeness"]["min_avg_length"]:
-            issues.append(f"平均文本长度过短: {avg_length:.1f}")
-            score -= 30
-        
-        if empty_ratio > self.validation_rules["text_completeness"]["empty_text_threshold"]:
-            issues.append(f"空文本比例过高: {empty_ratio:.3f}")
-            score -= 40
-        
-        if truncated_ratio > self.validation_rules["text_completeness"]["truncated_ratio_threshold"]:
-            issues.append(f"截断文本比例过高: {truncated_ratio:.3f}")
-            score -= 25
-        
-        return ValidationResult(
-            is_valid=len(issues) == 0,
-            score=max(0, score),
-            issues=issues,
-            details=details
-        )
+        return self._run_check(TextCompletenessCheck(self.validation_rules["text_completeness"]), tweets)
     
     def validate_retweet_integrity(self, tweets: List[Dict]) -> ValidationResult:
         """验证转推完整性"""
-        issues = []
-        details = {}
-        
-        retweets = [tweet for tweet in tweets if tweet.get('retweet')]
-        details['total_retweets'] = len(retweets)
-        details['retweet_ratio'] = len(retweets) / len(tweets) if tweets else 0
-        
-        if not retweets:
-            return ValidationResult(True, 100, [], details)
-        
-        # 检查转推原文完整性
-        missing_original_text = 0
-        missing_original_user = 0
-        nested_retweets = 0
-        
-        for tweet in retweets:
-            retweet_data = tweet.get('retweet', {})
-            
-            # 检查原文
-            if not retweet_data.get('text'):
-                missing_original_text += 1
-            
-            # 检查原用户信息
-            if not retweet_data.get('user'):
-                missing_original_user += 1
-            
-            # 检查嵌套转推
-            if retweet_data.get('retweet'):
-                nested_retweets += 1
-        
-        details.update({
-            "missing_original_text": missing_original_text,
-            "missing_original_user": missing_original_user,
-            "nested_retweets": nested_retweets
-        })
-        
-        score = 100
-        
-        if missing_original_text > 0:
-            issues.append(f"缺失转推原文: {missing_original_text} 条")
-            score -= (missing_original_text / len(retweets)) * 50
-        
-        if missing_original_user > 0:
-            issues.append(f"缺失转推原用户信息: {missing_original_user} 条")
-            score -= (missing_original_user / len(retweets)) * 30
-        
-        return ValidationResult(
-            is_valid=len(issues) == 0,
-            score=max(0, score),
-            issues=issues,
-            details=details
-        )
+        return self._run_check(RetweetIntegrityCheck(self.validation_rules["retweet_integrity"]), tweets)
     
     def validate_media_accessibility(self, tweets: List[Dict]) -> ValidationResult:
         """验证媒体文件可访问性"""
-        issues = []
-        details = {}
-        
-        media_tweets = [tweet for tweet in tweets if tweet.get('media')]
-        all_media = []
-        
-        for tweet in media_tweets:
-            all_media.extend(tweet.get('media', []))
-        
-        details['total_media_files'] = len(all_media)
-        details['media_tweets'] = len(media_tweets)
-        
-        if not all_media:
-            return ValidationResult(True, 100, [], details)
-        
-        # 检查媒体URL格式
-        valid_urls = 0
-        invalid_urls = 0
-        accessible_urls = 0
-        video_files = 0
-        image_files = 0
-        
-        for media in all_media:
-            url = media.get('url')
-            media_type = media.get('type')
-            
-            if media_type == 'video':
-                video_files += 1
-            elif media_type in ['photo', 'animated_gif']:
-                image_files += 1
-            
-            if not url:
-                invalid_urls += 1
-                continue
-            
-            # 检查URL格式
-            if url.startswith('https://') and ('twimg.com' in url or 'twitter.com' in url):
-                valid_urls += 1
-                
-                # 测试可访问性（采样检查，避免过多请求）
-                if len(all_media) <= 10 or valid_urls <= 3:
-                    try:
-                        response = requests.head(url, timeout=5)
-                        if response.status_code == 200:
-                            accessible_urls += 1
-                    except:
-                        pass
-            else:
-                invalid_urls += 1
-        
-        details.update({
-            "valid_urls": valid_urls,
-            "invalid_urls": invalid_urls,
-            "accessible_urls": accessible_urls,
-            "video_files": video_files,
-            "image_files": image_files
-        })
-        
-        score = 100
-        
-        if invalid_urls > 0:
-            invalid_ratio = invalid_urls / len(all_media)
-            issues.append(f"无效媒体URL: {invalid_urls} 个 ({invalid_ratio:.2%})")
-            score -= invalid_ratio * 60
-        
-        return ValidationResult(
-            is_valid=len(issues) == 0,
-            score=max(0, score),
-            issues=issues,
-            details=details
+        return self._run_check(
+            MediaAccessibilityCheck(self.validation_rules["media_completeness"], self.media_checker), tweets
         )
     
     def validate_data_structure(self, tweets: List[Dict]) -> ValidationResult:
         """验证数据结构完整性"""
-        issues = []
-        details = {}
-        
-        if not tweets:
-            return ValidationResult(False, 0, ["没有推文数据"], {})
-        
-        required_fields = self.validation_rules["data_structure"]["required_fields"]
-        user_required_fields = self.validation_rules["data_structure"]["user_required_fields"]
-        
-        missing_field_counts = {field: 0 for field in required_fields}
-        missing_user_field_counts = {field: 0 for field in user_required_fields}
-        
-        valid_timestamps = 0
-        
+        return self._run_check(DataStructureCheck(self.validation_rules["data_structure"]), tweets)
+    
+    def validate_stream(self, tweets: Iterable[Dict]) -> Dict[str, ValidationResult]:
+        """单次遍历同时计算所有规则，结果与逐项验证完全一致（tweets 可以是任意迭代器）"""
+        checks = list(self.create_checks().items())
         for tweet in tweets:
-            # 检查必需字段
-            for field in required_fields:
-                if field not in tweet or tweet[field] is None:
-                    missing_field_counts[field] += 1
-            
-            # 检查用户字段
-            user = tweet.get('user', {})
-            if user:
-                for field in user_required_fields:
-                    if field not in user or user[field] is None:
-                        missing_user_field_counts[field] += 1
-            
-            # 检查时间戳格式
-            created_at = tweet.get('created_at')
-            if created_at:
-                try:
-                    # X的时间格式: "Wed Oct 05 22:34:12 +0000 2011"
-                    from dateutil.parser import parse
-                    parse(created_at)
-                    valid_timestamps += 1
-                except:
-                    pass
-        
-        details = {
-            "total_tweets": len(tweets),
-            "missing_fields": missing_field_counts,
-            "missing_user_fields": missing_user_field_counts,
-            "valid_timestamps": valid_timestamps,
-            "timestamp_validity_ratio": valid_timestamps / len(tweets)
-        }
-        
-        score = 100
-        
-        # 评分
-        for field, count in missing_field_counts.items():
-            if count > 0:
-                ratio = count / len(tweets)
-                issues.append(f"缺失{field}字段: {count} 条 ({ratio:.2%})")
-                score -= ratio * 30
-        
-        for field, count in missing_user_field_counts.items():
-            if count > 0:
-                ratio = count / len(tweets)
-                issues.append(f"缺失用户{field}字段: {count} 条 ({ratio:.2%})")
-                score -= ratio * 20
-        
-        timestamp_invalid_ratio = 1 - (valid_timestamps / len(tweets))
-        if timestamp_invalid_ratio > 0.1:  # 超过10%的时间戳无效
-            issues.append(f"时间戳格式错误比例: {timestamp_invalid_ratio:.2%}")
-            score -= timestamp_invalid_ratio * 25
-        
-        return ValidationResult(
-            is_valid=len(issues) == 0,
-            score=max(0, score),
-            issues=issues,
-            details=details
-        )
+            for _, check in checks:
+                check.add(tweet)
+        return {category: check.result() for category, check in checks}
+    
+    def validate_daily_file(self, daily_file: str, golden_dataset_file: Optional[str] = None) -> Dict[str, ValidationResult]:
+        """直接流式验证每日数据文件（不把整个推文列表载入内存）"""
+        print(f"🔍 流式验证数据文件: {daily_file}")
+        results = self.validate_stream(iter_daily_file_tweets(daily_file))
+        if golden_dataset_file and os.path.exists(golden_dataset_file):
+            results['golden_comparison'] = self.compare_with_golden_dataset(iter_daily_file_tweets(daily_file), golden_dataset_file)
+        return results
     
-    def compare_with_golden_dataset(self, tweets: List[Dict], golden_dataset_file: str) -> ValidationResult:
-        """与黄金数据集对比"""
+    def compare_with_golden_dataset(self, tweets: Iterable[Dict], golden_dataset_file: str) -> ValidationResult:
+        """与黄金数据集对比 - 按tweet_id匹配，逐字段统计精确率和召回率"""
         issues = []
-        details = {}
         
         try:
-            with open(golden_dataset_file, 'r', encoding='utf-8') as f:
-                golden_data = json.load(f)
-        except:
-            return ValidationResult(False, 0, ["无法读取黄金数据集"], {})
-        
-        # 修正：我们的黄金数据集中字段名是baseline_tweets，不是posts
-        golden_posts = golden_data.get('baseline_tweets', [])
-        
-        if len(tweets) < len(golden_posts) * 0.8:  # 允许20%的数据差异
-            issues.append(f"推文数量显著减少: {len(tweets)} vs {len(golden_posts)}")
-        
-        # 文本相似度检查（采样前10条）
-        text_match_count = 0
-        sample_size = min(10, len(tweets), len(golden_posts))
-        
-        for i in range(sample_size):
-            tweet_text = tweets[i].get('text', '').strip()
-            # 修正：我们的黄金数据集中字段名是expected_text，不是browser_visible_text
-            golden_text = golden_posts[i].get('expected_text', '').strip()
-            
-            # 简单相似度检查
-            if tweet_text and golden_text:
-                if tweet_text == golden_text:
-                    text_match_count += 1
-                elif tweet_text in golden_text or golden_text in tweet_text:
-                    text_match_count += 0.5
-        
-        text_match_ratio = text_match_count / sample_size if sample_size > 0 else 0
-        
-        details = {
-            "golden_posts_count": len(golden_posts),
-            "current_posts_count": len(tweets),
-            "sample_text_match_ratio": text_match_ratio,
-            "sample_size": sample_size
-        }
-        
-        score = 100
+            comparison = GoldenComparison.from_file(golden_dataset_file)
+        except (OSError, json.JSONDecodeError) as e:
+            return ValidationResult(False, 0, [f"无法读取黄金数据集: {e}"], {})
+        
+        details = comparison.compare(tweets)
+        if not details["matched_count"]:
+            issues.append(f"没有与黄金数据集重叠的推文 (黄金 {details['golden_posts_count']} 条, 当前 {details['current_posts_count']} 条)")
+            return ValidationResult(False, 0, issues, details)
+        
+        # 关键字段的精确率和召回率都需达到阈值，分数为关键字段F1的平均值
+        # 黄金数据中没有值的字段（召回率为None）无法判断对错，不参与评分
+        min_ratio = self.validation_rules["golden_comparison"]["min_field_precision_recall"]
+        f1_scores = []
+        for field, metrics in details["fields"].items():
+            precision, recall = metrics["precision"], metrics["recall"]
+            if not metrics["critical"] or recall is None:
+                continue
+            precision = precision or 0.0
+            f1_scores.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+            if precision < min_ratio or recall < min_ratio:
+                issues.append(f"{field} 字段不一致: 精确率 {precision:.2%}, 召回率 {recall:.2%}")
         
-        if text_match_ratio < 0.8:
-            issues.append(f"文本匹配率过低: {text_match_ratio:.2%}")
-            score -= (1 - text_match_ratio) * 50
+        score = 100 * sum(f1_scores) / len(f1_scores) if f1_scores else 100
         
         return ValidationResult(
-            is_valid=text_match_ratio >= 0.8,
+            is_valid=len(issues) == 0,
             score=max(0, score),
             issues=issues,
             details=details
@@ -415,23 +755,9 @@ class DataValidator:
         """综合验证"""
         print("🔍 开始综合数据验证...")
         
-        results = {}
-        
-        # 文本完整性验证
-        print("  1. 验证文本完整性...")
-        results['text_completeness'] = self.validate_text_completeness(tweets)
-        
-        # 转推完整性验证
-        print("  2. 验证转推完整性...")
-        results['retweet_integrity'] = self.validate_retweet_integrity(tweets)
-        
-        # 媒体文件验证
-        print("  3. 验证媒体文件...")
-        results['media_accessibility'] = self.validate_media_accessibility(tweets)
-        
-        # 数据结构验证
-        print("  4. 验证数据结构...")
-        results['data_structure'] = self.validate_data_structure(tweets)
+        # 文本、转推、媒体、结构四项规则在一次遍历中完成
+        print("  1-4. 验证文本完整性/转推完整性/媒体文件/数据结构...")
+        results = self.validate_stream(tweets)
         
         # 黄金数据集对比
         if golden_dataset_file and os.path.exists(golden_dataset_file):
@@ -533,6 +859,22 @@ def main():
     """验证工具主函数"""
     print("🔍 数据完整性验证工具")
     
+    # 用法: python tools/validator.py <每日数据文件> [黄金数据集文件]
+    if len(sys.argv) >= 2:
+        validator = DataValidator()
+        golden_file = sys.argv[2] if len(sys.argv) >= 3 else None
+        results = validator.validate_daily_file(sys.argv[1], golden_file)
+        validator.print_validation_summary(results)
+        
+        golden_result = results.get('golden_comparison')
+        if golden_result and golden_result.details.get('fields'):
+            print(f"\n🏆 黄金数据集对比: 匹配 {golden_result.details['matched_count']}/{golden_result.details['golden_posts_count']} 条")
+            for field, metrics in golden_result.details['fields'].items():
+                precision = "-" if metrics['precision'] is None else f"{metrics['precision']:.1%}"
+                recall = "-" if metrics['recall'] is None else f"{metrics['recall']:.1%}"
+                print(f"  {field:26} 精确率 {precision:>7}  召回率 {recall:>7}")
+        return
+    
     validator = DataValidator()
     
     # 示例：创建黄金数据集
@@ -545,6 +887,7 @@ def main():
     print("\n2. 数据验证示例")
     print("使用方法:")
     print("validator.comprehensive_validation(tweets, golden_dataset_file)")
+    print("python tools/validator.py <每日数据文件> [黄金数据集文件]")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+热门推文引擎 - 基于NumPy向量化计算互动热度
+- 互动分: 点赞 + 转推 + 回复 + 引用 按权重加总
+- 粉丝归一化: 除以 (粉丝数 + 平滑项)^指数，避免大号永远霸榜
+- 时间衰减: 按半衰期指数衰减
+- 用 argpartition 取 top-k，不对全部推文排序
+每天的统计字段缓存为 npz，滚动窗口查询无需重新解析JSON
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MONTHS = {
+    "Jan": "01", "Feb": "02", "Mar": "03", "Apr": "04", "May": "05", "Jun": "06",
+    "Jul": "07", "Aug": "08", "Sep": "09", "Oct": "10", "Nov": "11", "Dec": "12"
+}
+
+STAT_FIELDS = ("favorite_count", "retweet_count", "reply_count", "quote_count")
+
+
+def to_iso(created_at: str) -> str:
+    """"Wed Oct 05 22:34:12 +0000 2011" -> "2011-10-05T22:34:12"（X的时间固定为UTC）"""
+    if not created_at or len(created_at) < 30:
+        return "NaT"
+    return f"{created_at[26:30]}-{MONTHS.get(created_at[4:7], '01')}-{created_at[8:10]}T{created_at[11:19]}"
+
+
+class TrendingEngine:
+    def __init__(self, data_dir: Optional[str] = None, half_life_hours: float = 6.0,
+                 weights: Optional[Dict[str, float]] = None, follower_smoothing: float = 1000.0,
+                 follower_exponent: float = 1.0):
+        """
+        初始化热门推文引擎
+
+        Args:
+            data_dir: 数据目录，默认 DATA_DIR
+            half_life_hours: 热度半衰期（小时）
+            weights: 各互动字段的权重
+            follower_smoothing: 粉丝归一化的平滑项，防止小号的少量互动被过度放大
+            follower_exponent: 粉丝归一化指数，1.0为互动率，越小越偏向大号
+        """
+        self.data_dir = Path(data_dir or os.getenv('DATA_DIR', 'crawler_data'))
+        self.cache_dir = self.data_dir / "index"
+        self.half_life_hours = half_life_hours
+        self.weights = weights or {"favorite_count": 1.0, "retweet_count": 2.0, "reply_count": 1.5, "quote_count": 2.5}
+        self.follower_smoothing = follower_smoothing
+        self.follower_exponent = follower_exponent
+
+    def tweets_to_arrays(self, tweets: List[Dict], user: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """把推文的统计字段转换为列式数组
+
+        Args:
+            user: 推文作者信息；users_daily 中的推文去掉了 user 字段，粉丝数从文件的用户记录中取
+        """
+        arrays = {
+            field: np.fromiter((t.get('stats', {}).get(field, 0) or 0 for t in tweets), dtype=np.float64, count=len(tweets))
+            for field in STAT_FIELDS
+        }
+        arrays["followers"] = np.fromiter(
+            ((t.get('user') or user or {}).get('followers_count', 0) or 0 for t in tweets), dtype=np.float64, count=len(tweets)
+        )
+        arrays["created_at"] = np.array([to_iso(t.get('created_at', '')) for t in tweets], dtype='datetime64[s]')
+        arrays["ids"] = np.array([str(t.get('id', '')) for t in tweets])
+        return arrays
+
+    def score(self, arrays: Dict[str, np.ndarray], now: Optional[np.datetime64] = None) -> np.ndarray:
+        """计算热度分（向量化）
+
+        Args:
+            now: 衰减参考时间，默认取数据中最新推文的时间（历史窗口同样适用）
+        """
+        engagement = sum(self.weights[field] * arrays[field] for field in STAT_FIELDS)
+        normalized = engagement / np.power(arrays["followers"] + self.follower_smoothing, self.follower_exponent)
+
+        created_at = arrays["created_at"]
+        valid = ~np.isnat(created_at)
+        if now is None:
+            now = created_at[valid].max() if valid.any() else np.datetime64('now', 's')
+        age_hours = (now - created_at).astype('timedelta64[s]').astype(np.float64) / 3600.0
+        age_hours = np.where(valid, np.clip(age_hours, 0, None), np.inf)
+
+        return normalized * np.exp2(-age_hours / self.half_life_hours)
+
+    def top_k_indices(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """取分数最高的k个下标（按分数降序）"""
+        if len(scores) == 0:
+            return np.array([], dtype=np.int64)
+        k = min(k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates])]
+
+    def top_k(self, tweets: List[Dict], k: int = 20, now: Optional[np.datetime64] = None,
+              user: Optional[Dict] = None) -> List[Dict]:
+        """从给定推文中选出热度最高的k条
+
+        Args:
+            user: 推文不带 user 字段时使用的作者信息（如 users_daily 文件的 user）
+        """
+        if not tweets:
+            return []
+        scores = self.score(self.tweets_to_arrays(tweets, user), now)
+        return [tweets[i] for i in self.top_k_indices(scores, k)]
+
+    def _posts_files(self, date: str) -> List[Path]:
+        return sorted((self.data_dir / "daily_posts").glob(f"{date}_*_posts.json"))
+
+    def load_day_arrays(self, date: str) -> Optional[Dict[str, np.ndarray]]:
+        """加载某天的统计数组，优先使用npz缓存（数据文件更新后自动失效）"""
+        posts_files = self._posts_files(date)
+        if not posts_files:
+            return None
+
+        cache_file = self.cache_dir / f"trending_{date}.npz"
+        newest_source = max(f.stat().st_mtime for f in posts_files)
+        if cache_file.exists() and cache_file.stat().st_mtime >= newest_source:
+            with np.load(cache_file) as cached:
+                return {key: cached[key] for key in cached.files}
+
+        tweets = {}
+        for posts_file in posts_files:
+            with open(posts_file, 'r', encoding='utf-8') as f:
+                for tweet in json.load(f).get('tweets', []):
+                    tweets.setdefault(tweet.get('id'), tweet)
+
+        arrays = self.tweets_to_arrays(list(tweets.values()))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_file, **arrays)
+        return arrays
+
+    def load_window(self, end_date: str, days: int = 1) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """加载截至end_date的滚动窗口，返回拼接后的数组和每条记录所属日期"""
+        end = datetime.strptime(end_date, '%Y%m%d')
+        parts, dates = [], []
+        for offset in range(days - 1, -1, -1):
+            date = (end - timedelta(days=offset)).strftime('%Y%m%d')
+            arrays = self.load_day_arrays(date)
+            if arrays is not None and len(arrays["ids"]):
+                parts.append(arrays)
+                dates.extend([date] * len(arrays["ids"]))
+
+        if not parts:
+            return {}, []
+
+        merged = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+        # 同一推文可能出现在相邻两天的文件中，保留第一次出现
+        _, first_index = np.unique(merged["ids"], return_index=True)
+        keep = np.sort(first_index)
+        return {key: value[keep] for key, value in merged.items()}, [dates[i] for i in keep]
+
+    def top_k_window(self, end_date: str, days: int = 7, k: int = 20) -> List[Dict]:
+        """滚动窗口内的热门推文（只回读被选中推文所在日期的原始数据）"""
+        arrays, dates = self.load_window(end_date, days)
+        if not dates:
+            return []
+
+        selected = self.top_k_indices(self.score(arrays), k)
+        wanted: Dict[str, List[str]] = {}
+        for i in selected:
+            wanted.setdefault(dates[i], []).append(str(arrays["ids"][i]))
+
+        found = {}
+        for date, ids in wanted.items():
+            id_set = set(ids)
+            for posts_file in self._posts_files(date):
+                with open(posts_file, 'r', encoding='utf-8') as f:
+                    for tweet in json.load(f).get('tweets', []):
+                        if tweet.get('id') in id_set:
+                            found.setdefault(tweet['id'], tweet)
+
+        return [found[str(arrays["ids"][i])] for i in selected if str(arrays["ids"][i]) in found]
+
+
+def main():
+    """热门推文命令行工具"""
+    parser = argparse.ArgumentParser(description='热门推文排行')
+    parser.add_argument('--date', default=datetime.now().strftime('%Y%m%d'), help='窗口结束日期 (YYYYMMDD)')
+    parser.add_argument('--days', type=int, default=1, help='窗口天数')
+    parser.add_argument('-k', type=int, default=10, help='返回条数')
+    parser.add_argument('--summary', action='store_true', help='用窗口内的热门推文生成LLM总结')
+    args = parser.parse_args()
+
+    if args.summary:
+        from summarizer import TwitterSummarizer
+        result = TwitterSummarizer().generate_window_trending_summary(args.date, args.days, args.k)
+        print(result.get('summary') or result.get('error'))
+        return
+
+    engine = TrendingEngine()
+    for i, tweet in enumerate(engine.top_k_window(args.date, args.days, args.k), 1):
+        stats = tweet.get('stats', {})
+        user = (tweet.get('user') or {}).get('screen_name', 'unknown')
+        text = tweet.get('text', '').replace('\n', ' ')[:80]
+        print(f"{i:2}. @{user} ❤️{stats.get('favorite_count', 0)} 🔁{stats.get('retweet_count', 0)} | {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+推文倒排索引 - 按关键词快速筛选推文
+- 英文/数字按单词切分（小写），中文按字符二元组(bigram)切分，无需分词词典
+- 按日期分片存储在 crawler_data/index/YYYYMMDD.json，爬虫保存推文时增量更新
+- 查询只做集合运算，单个关键词查询在亚毫秒级完成；单个汉字的关键词匹配所有包含该字的bigram
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+URL_PATTERN = re.compile(r'https?://\S+')
+WORD_PATTERN = re.compile(r'[a-z0-9][a-z0-9_+#]*')
+CJK_PATTERN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+
+
+def tokenize(text: str) -> Set[str]:
+    """把文本切分为索引词：英文单词 + 中文bigram（单字词保留单字）"""
+    if not text:
+        return set()
+    text = URL_PATTERN.sub(' ', text.lower())
+
+    tokens = set(WORD_PATTERN.findall(text))
+    for run in CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def tweet_search_text(tweet: Dict) -> str:
+    """推文的可检索文本：正文 + 转推原文 + 引用原文"""
+    parts = [tweet.get('text', '')]
+    for key in ('retweet', 'quoted'):
+        nested = tweet.get(key)
+        if nested:
+            parts.append(nested.get('text', ''))
+            if nested.get('quoted'):
+                parts.append(nested['quoted'].get('text', ''))
+    return "\n".join(p for p in parts if p)
+
+
+def tweet_date(tweet: Dict) -> Optional[str]:
+    """推文日期 YYYYMMDD（与 users_daily 文件名一致）"""
+    try:
+        return datetime.strptime(tweet.get('created_at', ''), '%a %b %d %H:%M:%S %z %Y').strftime('%Y%m%d')
+    except (TypeError, ValueError):
+        return None
+
+
+class TweetIndex:
+    def __init__(self, index_dir: Optional[str] = None):
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        self.index_dir = Path(index_dir) if index_dir else data_dir / "index"
+        # 日期 -> {"postings": {词: 推文id集合}, "docs": {推文id: 用户名}}
+        self.shards: Dict[str, Dict[str, Dict]] = {}
+        self._dirty: Set[str] = set()
+
+    def _shard_file(self, date: str) -> Path:
+        return self.index_dir / f"{date}.json"
+
+    def load_shard(self, date: str) -> Dict[str, Dict]:
+        """加载某一天的索引分片（已加载则直接返回）"""
+        if date in self.shards:
+            return self.shards[date]
+
+        shard = {"postings": {}, "docs": {}}
+        shard_file = self._shard_file(date)
+        if shard_file.exists():
+            try:
+                with open(shard_file, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                # 文件中以文档序号存储倒排表，加载时还原为推文id
+                doc_ids = [doc[0] for doc in saved.get("docs", [])]
+                shard["docs"] = {doc[0]: doc[1] for doc in saved.get("docs", [])}
+                shard["postings"] = {
+                    token: {doc_ids[n] for n in numbers}
+                    for token, numbers in saved.get("postings", {}).items()
+                }
+            except Exception as e:
+                print(f"⚠️ 加载索引分片失败 {shard_file.name}: {e}")
+        self.shards[date] = shard
+        return shard
+
+    def add_tweets(self, tweets: Iterable[Dict], screen_name: Optional[str] = None) -> int:
+        """增量添加推文（已索引的id跳过），返回新增数量"""
+        added = 0
+        for tweet in tweets:
+            tweet_id = tweet.get('id')
+            date = tweet_date(tweet)
+            if not tweet_id or not date:
+                continue
+
+            shard = self.load_shard(date)
+            if tweet_id in shard["docs"]:
+                continue
+
+            user = screen_name or (tweet.get('user') or {}).get('screen_name', 'unknown')
+            shard["docs"][tweet_id] = user
+            for token in tokenize(tweet_search_text(tweet)):
+                shard["postings"].setdefault(token, set()).add(tweet_id)
+            self._dirty.add(date)
+            added += 1
+        return added
+
+    def save(self):
+        """保存有变更的分片"""
+        if not self._dirty:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for date in sorted(self._dirty):
+            shard = self.shards[date]
+            doc_numbers = {tweet_id: n for n, tweet_id in enumerate(shard["docs"])}
+            with open(self._shard_file(date), 'w', encoding='utf-8') as f:
+                json.dump({
+                    "date": date,
+                    "doc_count": len(shard["docs"]),
+                    "docs": [[tweet_id, user] for tweet_id, user in shard["docs"].items()],
+                    "postings": {
+                        token: sorted(doc_numbers[tweet_id] for tweet_id in ids)
+                        for token, ids in shard["postings"].items()
+                    }
+                }, f, ensure_ascii=False, separators=(',', ':'))
+        print(f"🗂️ 索引已更新: {len(self._dirty)} 个日期分片")
+        self._dirty.clear()
+
+    @staticmethod
+    def _token_ids(token: str, postings: Dict[str, Set[str]]) -> Set[str]:
+        """单个查询词元命中的推文id；单个汉字（连续汉字只按bigram索引）匹配所有包含该字的词元"""
+        if len(token) == 1 and CJK_PATTERN.fullmatch(token):
+            ids: Set[str] = set()
+            for indexed_token, token_ids in postings.items():
+                if token in indexed_token:
+                    ids |= token_ids
+            return ids
+        return postings.get(token, set())
+
+    @classmethod
+    def _match_postings(cls, tokens: Set[str], postings: Dict[str, Set[str]]) -> Set[str]:
+        """所有词元都命中的推文id，从最短的倒排表开始求交集"""
+        matched: Optional[Set[str]] = None
+        for ids in sorted((cls._token_ids(token, postings) for token in tokens), key=len):
+            if not ids:
+                return set()
+            matched = set(ids) if matched is None else matched & ids
+            if not matched:
+                return set()
+        return matched or set()
+
+    def search(self, keyword: str, dates: Iterable[str]) -> Set[str]:
+        """查询包含关键词的推文id（关键词的所有词元都要命中）"""
+        tokens = tokenize(keyword)
+        if not tokens:
+            return set()
+
+        result: Set[str] = set()
+        for date in dates:
+            result |= self._match_postings(tokens, self.load_shard(date)["postings"])
+        return result
+
+    def search_any(self, keywords: Iterable[str], dates: Iterable[str]) -> Set[str]:
+        """查询命中任意关键词的推文id"""
+        dates = list(dates)
+        result: Set[str] = set()
+        for keyword in keywords:
+            result |= self.search(keyword, dates)
+        return result
+
+    def select_tweets(self, tweets: List[Dict], keywords: Iterable[str]) -> List[Dict]:
+        """从给定推文中筛选命中关键词的推文
+
+        已索引的推文查倒排表；未索引的推文在内存中直接切词匹配，不修改索引（索引只由爬虫写入并保存）
+        """
+        keywords = list(keywords)
+        indexed, unindexed = [], []
+        for tweet in tweets:
+            date = tweet_date(tweet)
+            if tweet.get('id') and date and tweet['id'] in self.load_shard(date)["docs"]:
+                indexed.append(tweet)
+            else:
+                unindexed.append(tweet)
+
+        matched_ids = self.search_any(keywords, {tweet_date(t) for t in indexed}) if indexed else set()
+        matched = {id(t) for t in indexed if t['id'] in matched_ids}
+        keyword_tokens = [tokens for tokens in map(tokenize, keywords) if tokens]
+        for tweet in unindexed:
+            postings = {token: {'_'} for token in tokenize(tweet_search_text(tweet))}
+            if any(self._match_postings(tokens, postings) for tokens in keyword_tokens):
+                matched.add(id(tweet))
+        return [t for t in tweets if id(t) in matched]
+
+    def rebuild_from_daily_posts(self, daily_posts_dir: Path) -> int:
+        """从 daily_posts 历史数据补建索引"""
+        total = 0
+        for posts_file in sorted(daily_posts_dir.glob("*_posts.json")):
+            try:
+                with open(posts_file, 'r', encoding='utf-8') as f:
+                    tweets = json.load(f).get('tweets', [])
+                total += self.add_tweets(tweets)
+            except Exception as e:
+                print(f"⚠️ 读取 {posts_file.name} 失败: {e}")
+        self.save()
+        return total
+
+
+def main():
+    """索引命令行工具"""
+    parser = argparse.ArgumentParser(description='推文倒排索引工具')
+    parser.add_argument('--rebuild', action='store_true', help='从daily_posts补建索引')
+    parser.add_argument('--search', nargs='+', help='查询关键词（命中任意一个）')
+    parser.add_argument('--date', help='查询日期 (YYYYMMDD)')
+    args = parser.parse_args()
+
+    index = TweetIndex()
+    if args.rebuild:
+        data_dir = Path(os.getenv('DATA_DIR', 'crawler_data'))
+        count = index.rebuild_from_daily_posts(data_dir / "daily_posts")
+        print(f"✅ 已索引 {count} 条推文")
+    if args.search:
+        if not args.date:
+            print("❌ 查询需要指定 --date")
+            return
+        ids = index.search_any(args.search, [args.date])
+        print(f"🔍 命中 {len(ids)} 条推文")
+        for tweet_id in sorted(ids):
+            print(f"  {tweet_id} @{index.load_shard(args.date)['docs'].get(tweet_id)}")
+
+
+if __name__ == "__main__":
+    main()
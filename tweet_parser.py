@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+推文解析 - 从X时间线API响应中提取推文
+爬虫、黄金数据集构建等工具共用同一份解析逻辑，保证解析结果一致
+纯函数实现，不依赖爬虫实例，可在子进程中使用
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def parse_tweet(tweet_data: Dict) -> Optional[Dict]:
+    """解析推文数据 - 基于分析结果的完整实现（转推和引用递归解析）"""
+    try:
+        # 基础推文信息
+        tweet = {
+            'id': tweet_data.get('rest_id'),
+            'text': '',
+            'created_at': tweet_data.get('legacy', {}).get('created_at'),
+            'lang': tweet_data.get('legacy', {}).get('lang'),
+            'media': [],
+            'retweet': None,
+            'quoted': None,
+            'user': None,
+            'stats': {
+                'retweet_count': tweet_data.get('legacy', {}).get('retweet_count', 0),
+                'favorite_count': tweet_data.get('legacy', {}).get('favorite_count', 0),
+                'reply_count': tweet_data.get('legacy', {}).get('reply_count', 0),
+                'quote_count': tweet_data.get('legacy', {}).get('quote_count', 0)
+            }
+        }
+
+        # 提取文本内容 - 处理长文推文和普通推文
+        if 'note_tweet' in tweet_data:
+            # 长文推文
+            note_tweet_result = tweet_data.get('note_tweet', {}).get('note_tweet_results', {}).get('result', {})
+            if note_tweet_result:
+                tweet['text'] = note_tweet_result.get('text', '')
+
+        if not tweet['text']:
+            # 普通推文 - 使用 legacy.full_text
+            tweet['text'] = tweet_data.get('legacy', {}).get('full_text', '')
+
+        # 解析用户信息 - 修正字段路径
+        user_results = tweet_data.get('core', {}).get('user_results', {}).get('result', {})
+        if user_results:
+            tweet['user'] = {
+                'id': user_results.get('rest_id'),
+                'name': user_results.get('core', {}).get('name'),  # 修正：从core获取
+                'screen_name': user_results.get('core', {}).get('screen_name'),  # 修正：从core获取
+                'description': user_results.get('legacy', {}).get('description'),
+                'followers_count': user_results.get('legacy', {}).get('followers_count', 0),
+                'friends_count': user_results.get('legacy', {}).get('friends_count', 0),
+                'verified': user_results.get('verification', {}).get('verified', False),  # 修正路径
+                'is_blue_verified': user_results.get('is_blue_verified', False)
+            }
+
+        # 解析媒体文件 - 基于分析结果
+        extended_entities = tweet_data.get('legacy', {}).get('extended_entities', {})
+        if 'media' in extended_entities:
+            for media_item in extended_entities['media']:
+                media_entry = {
+                    'type': media_item.get('type'),
+                    'id': media_item.get('id_str'),
+                    'url': None
+                }
+
+                if media_item['type'] == 'video':
+                    # 视频处理 - 选择最高质量
+                    variants = media_item.get('video_info', {}).get('variants', [])
+                    best_variant = None
+                    highest_bitrate = 0
+
+                    for variant in variants:
+                        if variant.get('content_type') == 'video/mp4':
+                            bitrate = variant.get('bitrate', 0)
+                            if bitrate > highest_bitrate:
+                                highest_bitrate = bitrate
+                                best_variant = variant
+
+                    if best_variant:
+                        media_entry['url'] = best_variant['url']
+                        media_entry['bitrate'] = best_variant.get('bitrate')
+
+                elif media_item['type'] in ['photo', 'animated_gif']:
+                    # 图片处理
+                    media_entry['url'] = media_item.get('media_url_https')
+
+                if media_entry['url']:
+                    tweet['media'].append(media_entry)
+
+        # 处理转推 - 基于分析结果，支持TweetWithVisibilityResults结构
+        if 'retweeted_status_result' in tweet_data.get('legacy', {}):
+            retweet_result = tweet_data['legacy']['retweeted_status_result'].get('result')
+            if retweet_result:
+                # 处理TweetWithVisibilityResults结构
+                if retweet_result.get('__typename') == 'TweetWithVisibilityResults':
+                    # 数据嵌套在tweet字段中
+                    actual_tweet = retweet_result.get('tweet')
+                    if actual_tweet:
+                        tweet['retweet'] = parse_tweet(actual_tweet)
+                else:
+                    # 普通Tweet结构
+                    tweet['retweet'] = parse_tweet(retweet_result)
+
+        # 处理引用推文
+        if 'quoted_status_result' in tweet_data:
+            quoted_result = tweet_data['quoted_status_result'].get('result')
+            if quoted_result:
+                tweet['quoted'] = parse_tweet(quoted_result)
+
+        return tweet
+
+    except Exception as e:
+        print(f"❌ 解析推文失败: {e}")
+        return None
+
+
+def iter_tweet_results(data: Dict) -> Iterator[Tuple[str, Dict]]:
+    """遍历时间线响应中的条目，依次产出 ("tweet", 原始推文数据) 和 ("cursor", 底部游标)"""
+    # 基于分析结果的数据路径
+    home_timeline = data.get('data', {}).get('home', {}).get('home_timeline_urt', {})
+    instructions = home_timeline.get('instructions', [])
+    
+    for instruction in instructions:
+        if instruction.get('type') != 'TimelineAddEntries':
+            continue
+        
+        for entry in instruction.get('entries', []):
+            entry_id = entry.get('entryId', '')
+            content = entry.get('content', {})
+            
+            # 推文条目 - 排除promoted-tweet广告
+            if entry_id.startswith('tweet-'):
+                tweet_data = content.get('itemContent', {}).get('tweet_results', {}).get('result', {})
+                if tweet_data.get('__typename') == 'Tweet':
+                    yield "tweet", tweet_data
+            
+            # 对话模块 - 包含多条相关推文
+            elif entry_id.startswith('home-conversation-'):
+                if content.get('entryType') == 'TimelineTimelineModule':
+                    for item in content.get('items', []):
+                        item_content = item.get('item', {}).get('itemContent', {})
+                        if item_content.get('itemType') == 'TimelineTweet':
+                            tweet_data = item_content.get('tweet_results', {}).get('result', {})
+                            if tweet_data.get('__typename') == 'Tweet':
+                                yield "tweet", tweet_data
+            
+            # 游标处理 - 用于分页
+            elif 'cursor-' in entry_id:
+                if content.get('cursorType') == 'Bottom':
+                    yield "cursor", content.get('value')
+
+
+def extract_tweets_from_response(data: Dict) -> Tuple[List[Dict], Optional[str]]:
+    """从响应中提取推文数据，返回 (解析后的推文列表, 下一页游标)"""
+    tweets = []
+    cursor = None
+    
+    try:
+        for kind, value in iter_tweet_results(data):
+            if kind == "cursor":
+                cursor = value
+                continue
+            parsed_tweet = parse_tweet(value)
+            if parsed_tweet:
+                tweets.append(parsed_tweet)
+    
+    except Exception as e:
+        print(f"❌ 提取推文数据失败: {e}")
+    
+    return tweets, cursor